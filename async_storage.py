@@ -0,0 +1,90 @@
+# async_storage.py
+"""
+Асинхронный фасад над синхронными хранилищами.
+
+Обработчики PTB работают в цикле событий, а хранилища (SQLite, JSON-файлы)
+блокируют поток. AsyncStorage выполняет методы хранилища в ограниченном
+пуле потоков и возвращает awaitable, поэтому медленный диск не останавливает
+обработку обновлений других пользователей.
+"""
+import os
+import time
+import asyncio
+import functools
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from lazy import LazyProxy, is_callable_attr
+from metrics import observe_storage_call
+
+logger = logging.getLogger(__name__)
+
+IO_THREADS = int(os.getenv('STORAGE_IO_THREADS', '4'))
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Возвращает общий пул потоков ввода-вывода"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=IO_THREADS, thread_name_prefix='storage-io')
+    return _executor
+
+
+async def run_io(func: Callable, *args, **kwargs) -> Any:
+    """Выполняет блокирующую функцию в пуле потоков ввода-вывода"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), functools.partial(func, *args, **kwargs))
+
+
+def shutdown_executor(wait: bool = True):
+    """Останавливает пул потоков (при остановке бота)"""
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=wait)
+
+
+class AsyncStorage:
+    """
+    Обёртка над хранилищем: `await async_db.get_user_by_telegram_id(1)`.
+
+    Вызовы выполняются параллельно в пуле потоков, поэтому хранилище должно
+    быть потокобезопасным само: у SQLite-хранилищ своё соединение на поток,
+    JSON-хранилища (RatingSystem, RequestManager, JsonRequestStore, ...)
+    берут собственную блокировку (@synchronized / @cross_process).
+    """
+
+    def __init__(self, target: Any):
+        self._target = target
+        # Имя для метрик (metrics.py)
+        self._name = target.lazy_name if isinstance(target, LazyProxy) else type(target).__name__
+
+    def _call(self, name: str, *args, **kwargs):
+        method = getattr(self._target, name)
+        started = time.perf_counter()
+        failed = True
+        try:
+            result = method(*args, **kwargs)
+            failed = False
+            return result
+        finally:
+            observe_storage_call(self._name, name, time.perf_counter() - started, failed)
+
+    def __getattr__(self, name: str):
+        # Ленивое хранилище (lazy.LazyProxy) создаётся при первом вызове — уже в пуле потоков
+        if not is_callable_attr(self._target, name):
+            return getattr(self._target, name)
+
+        async def wrapper(*args, **kwargs):
+            return await run_io(self._call, name, *args, **kwargs)
+
+        wrapper.__name__ = name
+        return wrapper
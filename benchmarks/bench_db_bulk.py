@@ -0,0 +1,81 @@
+# benchmarks/bench_db_bulk.py
+"""
+Сравнение одиночной и пакетной записи в DatabaseManager.
+
+Запуск из корня проекта:
+    python benchmarks/bench_db_bulk.py --rows 5000
+
+База создаётся во временном каталоге, рабочие данные в data/ не затрагиваются.
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _notification(i: int) -> dict:
+    return {
+        'notification_type': 'new_request',
+        'title': 'Новая заявка',
+        'message': f'Заявка #{i} в вашей категории',
+        'data': {'request_id': i}
+    }
+
+
+def _message(i: int) -> dict:
+    return {'request_id': i % 100, 'message_text': f'Сообщение {i}'}
+
+
+def _review(i: int) -> dict:
+    return {'request_id': i, 'rating': i % 5 + 1, 'comment': f'Отзыв {i}'}
+
+
+def _measure(func) -> float:
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def run(rows: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        # database_utils при импорте создаёт data/bot_database.db в текущем каталоге
+        os.chdir(tmp)
+        from database_utils import DatabaseManager
+        db = DatabaseManager(os.path.join(tmp, 'bench.db'))
+
+        cases = [
+            (
+                'notifications',
+                lambda: [db.create_notification(i, _notification(i)) for i in range(rows)],
+                lambda: db.create_notifications_bulk([(i, _notification(i)) for i in range(rows)]),
+            ),
+            (
+                'messages',
+                lambda: [db.create_message(1, 2, _message(i)) for i in range(rows)],
+                lambda: db.create_messages_bulk([(1, 2, _message(i)) for i in range(rows)]),
+            ),
+            (
+                # request_id у одиночных и пакетных отзывов не пересекаются
+                'reviews',
+                lambda: [db.create_review(1, 2, _review(i)) for i in range(rows)],
+                lambda: db.create_reviews_bulk([(1, 2, _review(rows + i)) for i in range(rows)]),
+            ),
+        ]
+
+        print(f"{'таблица':<15}{'одиночно, строк/с':>20}{'пакетом, строк/с':>20}{'ускорение':>12}")
+        for name, single, bulk in cases:
+            single_time = _measure(single)
+            bulk_time = _measure(bulk)
+            print(f"{name:<15}{rows / single_time:>20.0f}{rows / bulk_time:>20.0f}"
+                  f"{single_time / bulk_time:>11.1f}x")
+
+        db.pool.close_all()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=2000, help='строк на каждый вариант')
+    run(parser.parse_args().rows)
@@ -0,0 +1,237 @@
+# benchmarks/bench_webhook.py
+"""
+Сравнение приёма обновлений: long polling и webhook.
+
+Запуск из корня проекта:
+    python benchmarks/bench_webhook.py --updates 2000 --connections 40
+
+Вместо api.telegram.org используется локальная заглушка Bot API (FakeBotApi):
+getUpdates отдаёт синтетические обновления, sendMessage сразу отвечает.
+В режиме webhook те же обновления POST-запросами отправляются в
+webhook_server.WebhookServer, как это делает Telegram (до --connections
+одновременных соединений). Обработчик отвечает на каждое сообщение
+через Bot API, поэтому измеряется полный путь обновления.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+from urllib.parse import parse_qsl
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from telegram.ext import Application, MessageHandler, filters
+
+from http_util import read_http_request, write_http_response
+from webhook_server import WebhookServer
+
+TOKEN = '123:bench'
+SECRET = 'bench-secret'
+
+
+def make_update(update_id: int) -> dict:
+    chat_id = 1000 + update_id % 50
+    return {
+        'update_id': update_id,
+        'message': {
+            'message_id': update_id,
+            'date': int(time.time()),
+            'chat': {'id': chat_id, 'type': 'private'},
+            'from': {'id': chat_id, 'is_bot': False, 'first_name': 'Bench'},
+            'text': f'сообщение {update_id}',
+        },
+    }
+
+
+class FakeBotApi:
+    """Минимальная заглушка Bot API: getMe, getUpdates, sendMessage, (delete|set)Webhook"""
+
+    def __init__(self):
+        self.port = 0
+        self._server = None
+        self._updates = []
+        self._new_updates = asyncio.Condition()
+        self._message_id = 0
+        self.calls = {}
+
+    @property
+    def base_url(self) -> str:
+        return f'http://127.0.0.1:{self.port}/bot'
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle_connection, '127.0.0.1', 0)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def push(self, updates):
+        async with self._new_updates:
+            self._updates.extend(updates)
+            self._new_updates.notify_all()
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            while True:
+                request = await read_http_request(reader)
+                if request is None:
+                    break
+                _, path, headers, body = request
+                result = await self._call(path.rsplit('/', 1)[-1], self._params(headers, body))
+                payload = json.dumps({'ok': True, 'result': result}).encode()
+                write_http_response(writer, 200, payload, content_type='application/json')
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.CancelledError):
+            # CancelledError: незавершённый long poll при остановке
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    def _params(headers, body: bytes) -> dict:
+        if not body:
+            return {}
+        if headers.get('content-type', '').startswith('application/json'):
+            return json.loads(body)
+        return dict(parse_qsl(body.decode()))
+
+    async def _call(self, method: str, params: dict):
+        self.calls[method] = self.calls.get(method, 0) + 1
+        if method == 'getMe':
+            return {'id': 1, 'is_bot': True, 'first_name': 'Bench', 'username': 'bench_bot'}
+        if method == 'getUpdates':
+            return await self._get_updates(int(params.get('offset') or 0), int(params.get('limit') or 100),
+                                           float(params.get('timeout') or 0))
+        if method == 'sendMessage':
+            self._message_id += 1
+            return {'message_id': self._message_id, 'date': int(time.time()),
+                    'chat': {'id': int(params['chat_id']), 'type': 'private'}, 'text': params.get('text', '')}
+        return True
+
+    async def _get_updates(self, offset: int, limit: int, timeout: float):
+        def pending():
+            return [u for u in self._updates if u['update_id'] >= offset][:limit]
+
+        async with self._new_updates:
+            result = pending()
+            if not result and timeout:
+                try:
+                    await asyncio.wait_for(self._new_updates.wait_for(pending), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                result = pending()
+            # Подтверждённые (offset) обновления больше не нужны
+            self._updates = [u for u in self._updates if u['update_id'] >= offset]
+        return result
+
+
+def build_app(api: FakeBotApi, total: int, sent_at: dict, latencies: list, done: asyncio.Event, reply: bool):
+    app = Application.builder().token(TOKEN).base_url(api.base_url).build()
+
+    async def echo(update, context):
+        if reply:
+            await context.bot.send_message(update.effective_chat.id, 'ok')
+        latencies.append(time.perf_counter() - sent_at[update.update_id])
+        if len(latencies) >= total:
+            done.set()
+
+    app.add_handler(MessageHandler(filters.TEXT, echo))
+    return app
+
+
+async def bench_polling(total: int, reply: bool) -> tuple:
+    api = FakeBotApi()
+    await api.start()
+    sent_at, latencies, done = {}, [], asyncio.Event()
+    app = build_app(api, total, sent_at, latencies, done, reply)
+    await app.initialize()
+    await app.updater.start_polling(poll_interval=0, timeout=10)
+    await app.start()
+
+    start = time.perf_counter()
+    updates = [make_update(i) for i in range(1, total + 1)]
+    for u in updates:
+        sent_at[u['update_id']] = time.perf_counter()
+    await api.push(updates)
+    await done.wait()
+    elapsed = time.perf_counter() - start
+
+    await app.updater.stop()
+    await app.stop()
+    await app.shutdown()
+    await api.stop()
+    return elapsed, latencies, api.calls
+
+
+async def bench_webhook(total: int, connections: int, reply: bool) -> tuple:
+    api = FakeBotApi()
+    await api.start()
+    sent_at, latencies, done = {}, [], asyncio.Event()
+    app = build_app(api, total, sent_at, latencies, done, reply)
+    server = WebhookServer(app, '127.0.0.1', 0, '/telegram', SECRET)
+    await app.initialize()
+    await app.start()
+    await server.start()
+
+    queue = asyncio.Queue()
+    for i in range(1, total + 1):
+        queue.put_nowait(make_update(i))
+
+    async def sender():
+        # Постоянное соединение, как у Telegram; httpx-пул сам становится узким местом
+        reader, writer = await asyncio.open_connection('127.0.0.1', server.port)
+        while not queue.empty():
+            update = queue.get_nowait()
+            body = json.dumps(update).encode()
+            sent_at[update['update_id']] = time.perf_counter()
+            writer.write(
+                f"POST /telegram HTTP/1.1\r\nHost: 127.0.0.1\r\nContent-Type: application/json\r\n"
+                f"X-Telegram-Bot-Api-Secret-Token: {SECRET}\r\nContent-Length: {len(body)}\r\n\r\n".encode()
+                + body
+            )
+            await writer.drain()
+            status = await reader.readline()
+            if b' 200 ' not in status:
+                raise RuntimeError(f"webhook ответил {status!r}")
+            while await reader.readline() not in (b'\r\n', b''):
+                pass
+        writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(sender() for _ in range(connections)))
+    await done.wait()
+    elapsed = time.perf_counter() - start
+
+    await server.stop()
+    await app.stop()
+    await app.shutdown()
+    await api.stop()
+    return elapsed, latencies, api.calls
+
+
+def report(name: str, total: int, elapsed: float, latencies: list, calls: dict):
+    latencies = sorted(latencies)
+    p50 = latencies[len(latencies) // 2] * 1000
+    p95 = latencies[int(len(latencies) * 0.95) - 1] * 1000
+    print(f"{name:<10}{total / elapsed:>14.0f}{p50:>12.1f}{p95:>12.1f}{calls.get('getUpdates', 0):>14}")
+
+
+async def main(args):
+    print(f"{'режим':<10}{'обновл./с':>14}{'p50, мс':>12}{'p95, мс':>12}{'getUpdates':>14}")
+    elapsed, latencies, calls = await bench_polling(args.updates, args.reply)
+    report('polling', args.updates, elapsed, latencies, calls)
+    elapsed, latencies, calls = await bench_webhook(args.updates, args.connections, args.reply)
+    report('webhook', args.updates, elapsed, latencies, calls)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--updates', type=int, default=2000, help='синтетических обновлений')
+    parser.add_argument('--connections', type=int, default=40,
+                        help='одновременных webhook-соединений (max_connections Telegram)')
+    parser.add_argument('--no-reply', dest='reply', action='store_false',
+                        help='не отвечать на сообщения (только приём обновлений)')
+    asyncio.run(main(parser.parse_args()))
@@ -5,27 +5,35 @@
 import logging
 import sys
 import os
-import json
-from datetime import datetime
-
-os.makedirs('logs', exist_ok=True)
-os.makedirs('data', exist_ok=True)
-
-logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=logging.INFO,
-    handlers=[
-        logging.FileHandler('logs/bot.log'),
-        logging.StreamHandler()
-    ]
-)
-logger = logging.getLogger(__name__)
+import time
 
-# ===== КОНФИГУРАЦИЯ =====
+_STARTED = time.perf_counter()
+# Замер времени импорта модулей — до всех остальных импортов
+PROFILE_STARTUP = __name__ == '__main__' and '--profile-startup' in sys.argv
+if PROFILE_STARTUP:
+    import startup_profile
+    startup_profile.install()
+
+# .env читается до настройки логирования: LOG_* тоже берутся из него
 try:
     from dotenv import load_dotenv
     load_dotenv()
+except ImportError:
+    load_dotenv = None
+
+from logging_setup import setup_logging
+setup_logging()
+logger = logging.getLogger(__name__)
+# Записи на каждое обновление; их долю можно уменьшить через LOG_SAMPLING=bot.updates=0.1
+update_logger = logging.getLogger('bot.updates')
+
+# ===== КОНФИГУРАЦИЯ =====
+try:
+    if load_dotenv is None:
+        raise ImportError("python-dotenv не установлен")
     TOKEN = os.getenv('BOT_TOKEN')
+    # Например http://localhost:8081/bot для локального Bot API сервера
+    BOT_API_BASE_URL = os.getenv('BOT_API_BASE_URL', '')
     if not TOKEN:
         raise ValueError("BOT_TOKEN не найден в .env")
 except Exception as e:
@@ -55,93 +63,14 @@ from handlers.offer_help import (
 from personal import show_profile, handle_profile_callback, save_edited_field, cancel_edit
 from states import EDIT_NAME, EDIT_AGE, EDIT_EMAIL, EDIT_PHONE
 
-# Импортируем функционал "Попросить помощи" и дополнительные сущности
-# #region agent log
-import json
-try:
-    with open('/Users/macbook/Documents/Inai/tgbot/.cursor/debug.log', 'a', encoding='utf-8') as f:
-        f.write(json.dumps({"id":"log_import_start","timestamp":int(__import__('time').time()*1000),"location":"bot.py:59","message":"Starting need_help import","data":{"requested_functions":["show_need_help_menu","start_create_request","process_request_category","process_request_description","process_request_budget","process_request_deadline","process_request_contacts","cancel_request_flow","REQUEST_CATEGORY","REQUEST_DESCRIPTION","REQUEST_BUDGET","REQUEST_DEADLINE","REQUEST_CONTACTS","handle_request_callback","request_system","get_request_keyboard","search_requests","show_requests_in_category"]},"sessionId":"debug-session","runId":"run1","hypothesisId":"A"}) + '\n')
-except: pass
-# #endregion
-try:
-    import need_help
-    # #region agent log
-    try:
-        with open('/Users/macbook/Documents/Inai/tgbot/.cursor/debug.log', 'a', encoding='utf-8') as f:
-            f.write(json.dumps({"id":"log_need_help_loaded","timestamp":int(__import__('time').time()*1000),"location":"bot.py:59","message":"need_help module loaded successfully","data":{"available_attrs":list(dir(need_help))},"sessionId":"debug-session","runId":"run1","hypothesisId":"A"}) + '\n')
-    except: pass
-    # #endregion
-    # #region agent log
-    try:
-        with open('/Users/macbook/Documents/Inai/tgbot/.cursor/debug.log', 'a', encoding='utf-8') as f:
-            has_handle = hasattr(need_help, 'handle_request_callback')
-            has_show = hasattr(need_help, 'show_requests_in_category')
-            f.write(json.dumps({"id":"log_check_functions","timestamp":int(__import__('time').time()*1000),"location":"bot.py:59","message":"Checking if functions exist in need_help","data":{"has_handle_request_callback":has_handle,"has_show_requests_in_category":has_show},"sessionId":"debug-session","runId":"run1","hypothesisId":"A"}) + '\n')
-    except: pass
-    # #endregion
-    from need_help import (
-        show_need_help_menu, start_create_request, process_request_category, process_request_description,
-        process_request_budget, process_request_deadline, process_request_contacts, cancel_request_flow,
-        REQUEST_CATEGORY, REQUEST_DESCRIPTION, REQUEST_BUDGET, REQUEST_DEADLINE, REQUEST_CONTACTS,
-        request_system, get_request_keyboard,
-        search_requests
-    )
-    # #region agent log
-    try:
-        with open('/Users/macbook/Documents/Inai/tgbot/.cursor/debug.log', 'a', encoding='utf-8') as f:
-            f.write(json.dumps({"id":"log_partial_import_success","timestamp":int(__import__('time').time()*1000),"location":"bot.py:59","message":"Partial import from need_help succeeded","data":{"imported":["show_need_help_menu","start_create_request","process_request_category","process_request_description","process_request_budget","process_request_deadline","process_request_contacts","cancel_request_flow","REQUEST_CATEGORY","REQUEST_DESCRIPTION","REQUEST_BUDGET","REQUEST_DEADLINE","REQUEST_CONTACTS","request_system","get_request_keyboard","search_requests"]},"sessionId":"debug-session","runId":"run1","hypothesisId":"A"}) + '\n')
-    except: pass
-    # #endregion
-    # Try to import handle_request_callback from requests instead
-    # #region agent log
-    try:
-        with open('/Users/macbook/Documents/Inai/tgbot/.cursor/debug.log', 'a', encoding='utf-8') as f:
-            f.write(json.dumps({"id":"log_trying_requests_import","timestamp":int(__import__('time').time()*1000),"location":"bot.py:59","message":"Attempting to import handle_request_callback from requests","data":{},"sessionId":"debug-session","runId":"run1","hypothesisId":"A"}) + '\n')
-    except: pass
-    # #endregion
-    try:
-        import requests as requests_module
-        # #region agent log
-        try:
-            with open('/Users/macbook/Documents/Inai/tgbot/.cursor/debug.log', 'a', encoding='utf-8') as f:
-                has_handle_in_requests = hasattr(requests_module, 'handle_request_callback')
-                f.write(json.dumps({"id":"log_check_requests_module","timestamp":int(__import__('time').time()*1000),"location":"bot.py:59","message":"Checking requests module for handle_request_callback","data":{"has_handle_request_callback":has_handle_in_requests,"available_attrs":list(dir(requests_module))[:20]},"sessionId":"debug-session","runId":"run1","hypothesisId":"A"}) + '\n')
-        except: pass
-        # #endregion
-        if hasattr(requests_module, 'handle_request_callback'):
-            handle_request_callback = requests_module.handle_request_callback
-            # #region agent log
-            try:
-                with open('/Users/macbook/Documents/Inai/tgbot/.cursor/debug.log', 'a', encoding='utf-8') as f:
-                    f.write(json.dumps({"id":"log_import_success_requests","timestamp":int(__import__('time').time()*1000),"location":"bot.py:59","message":"Successfully imported handle_request_callback from requests","data":{},"sessionId":"debug-session","runId":"run1","hypothesisId":"A"}) + '\n')
-            except: pass
-            # #endregion
-        else:
-            # #region agent log
-            try:
-                with open('/Users/macbook/Documents/Inai/tgbot/.cursor/debug.log', 'a', encoding='utf-8') as f:
-                    f.write(json.dumps({"id":"log_handle_not_found","timestamp":int(__import__('time').time()*1000),"location":"bot.py:59","message":"handle_request_callback not found in requests module","data":{},"sessionId":"debug-session","runId":"run1","hypothesisId":"A"}) + '\n')
-            except: pass
-            # #endregion
-            handle_request_callback = None
-    except Exception as e:
-        # #region agent log
-        try:
-            with open('/Users/macbook/Documents/Inai/tgbot/.cursor/debug.log', 'a', encoding='utf-8') as f:
-                f.write(json.dumps({"id":"log_requests_import_error","timestamp":int(__import__('time').time()*1000),"location":"bot.py:59","message":"Error importing from requests","data":{"error":str(e)},"sessionId":"debug-session","runId":"run1","hypothesisId":"A"}) + '\n')
-        except: pass
-        # #endregion
-        handle_request_callback = None
-    # show_requests_in_category is not used, so we skip it
-    show_requests_in_category = None
-except ImportError as e:
-    # #region agent log
-    try:
-        with open('/Users/macbook/Documents/Inai/tgbot/.cursor/debug.log', 'a', encoding='utf-8') as f:
-            f.write(json.dumps({"id":"log_import_error","timestamp":int(__import__('time').time()*1000),"location":"bot.py:59","message":"ImportError from need_help","data":{"error":str(e),"error_type":type(e).__name__},"sessionId":"debug-session","runId":"run1","hypothesisId":"A"}) + '\n')
-    except: pass
-    # #endregion
-    raise
+# Функционал "Попросить помощи" и заявки
+from need_help import (
+    show_need_help_menu, start_create_request, process_request_category, process_request_description,
+    process_request_budget, process_request_deadline, process_request_contacts, cancel_request_flow,
+    REQUEST_CATEGORY, REQUEST_DESCRIPTION, REQUEST_BUDGET, REQUEST_DEADLINE, REQUEST_CONTACTS,
+    search_requests, handle_search_page, get_feed_page, handle_feed_page
+)
+from requests import handle_request_callback, handle_requests_callback, show_request_chat
 
 from states import (
     REGISTER_NAME, REGISTER_PHONE, REGISTER_CONFIRM_PHONE, REGISTER_VERIFY_PHONE_CODE,
@@ -151,7 +80,40 @@ from states import (
 )
 
 from keyboards import get_start_keyboard, get_main_menu_keyboard
-from rating import rating_system
+from rating import async_rating_system
+from write_behind import flush_on_shutdown
+from send_queue import rate_limiter, start_send_queue, stop_send_queue
+from update_processor import update_processor
+from lazy import start_warm_up, stop_warm_up
+from metrics import start_metrics_server, stop_metrics_server
+from bot_metrics import InstrumentedRequest, instrument_handlers
+from persistence import session_persistence, start_session_cleanup, stop_session_cleanup
+from webhook_server import BOT_MODE, run_webhook
+from sharding import SHARD_WORKERS, run_sharded
+from broadcast import (
+    resume_broadcasts, stop_broadcasts, start_broadcast_command, process_broadcast_text,
+    cancel_broadcast_input, broadcast_status_command, broadcast_cancel_command
+)
+from states import ADMIN_SEND_NOTIFICATION
+
+
+async def on_startup(application):
+    """Запуск: прогрев хранилищ, очередь исходящих сообщений и незавершённые рассылки"""
+    await start_warm_up(application)
+    await start_send_queue(application)
+    await resume_broadcasts(application)
+    await start_session_cleanup(application)
+    await start_metrics_server(application)
+
+
+async def on_shutdown(application):
+    """Остановка: рассылки (с контрольной точкой), очередь сообщений, затем хранилища"""
+    await stop_metrics_server(application)
+    await stop_session_cleanup(application)
+    await stop_warm_up(application)
+    await stop_broadcasts(application)
+    await stop_send_queue(application)
+    await flush_on_shutdown(application)
 
 
 async def error_handler(update, context):
@@ -161,27 +123,31 @@ async def error_handler(update, context):
 
 # ===== ОБРАБОТЧИКИ ГЛАВНОГО МЕНЮ =====
 
+def _user_id(update):
+    return update.effective_user.id if update.effective_user else 'unknown'
+
+
 async def handle_offer_help(update, context):
     """🙋‍♂️ Предложить помощь — запускает процесс создания предложения помощи"""
-    logger.info(f"handle_offer_help вызван для пользователя {update.effective_user.id if update.effective_user else 'unknown'}")
+    update_logger.info("handle_offer_help вызван для пользователя %s", _user_id(update))
     # Запускаем процесс создания предложения помощи
     return await start_offer_help(update, context)
 
 
 async def handle_need_help(update, context):
     """🙏 Попросить помощи — показывает меню или запускает создание запроса"""
-    logger.info(f"handle_need_help вызван для пользователя {update.effective_user.id if update.effective_user else 'unknown'}")
+    update_logger.info("handle_need_help вызван для пользователя %s", _user_id(update))
     await show_need_help_menu(update, context)
-    logger.info(f"Пользователь {update.effective_user.id} открыл меню 'Нужна помощь'")
+    update_logger.debug("Пользователь %s открыл меню 'Нужна помощь'", _user_id(update))
 
 
 async def handle_profile(update, context):
     """👤 Личный кабинет"""
-    logger.info(f"handle_profile вызван для пользователя {update.effective_user.id if update.effective_user else 'unknown'}")
+    update_logger.info("handle_profile вызван для пользователя %s", _user_id(update))
     user_id = update.effective_user.id
-    from database import db
+    from repository import async_repo
     
-    user_data = db.get_user_by_telegram_id(user_id)
+    user_data = await async_repo.users.get(user_id)
     
     if not user_data:
         await update.message.reply_text(
@@ -206,21 +172,17 @@ async def handle_profile(update, context):
         profile_text,
         reply_markup=get_main_menu_keyboard()
     )
-    logger.info(f"Пользователь {user_id} открыл профиль")
+    update_logger.debug("Пользователь %s открыл профиль", user_id)
 
 
 async def handle_rating(update, context):
     """⭐ Общий рейтинг волонтёров (топ и статистика)"""
-    logger.info(f"handle_rating вызван для пользователя {update.effective_user.id if update.effective_user else 'unknown'}")
+    update_logger.info("handle_rating вызван для пользователя %s", _user_id(update))
     try:
-        top_users = rating_system.get_top_users(limit=10)
+        top_users = await async_rating_system.get_top_users(limit=10)
         # Подсчёт средней оценки по всем пользователям (если есть данные)
         try:
-            with open(rating_system.ratings_file, 'r', encoding='utf-8') as f:
-                all_ratings = json.load(f)
-            ratings_values = [v['current_rating'] for v in all_ratings.values() if v.get('total_reviews', 0) > 0]
-            avg_rating = round(sum(ratings_values) / len(ratings_values), 2) if ratings_values else 0.0
-            rated_users_count = len([1 for v in all_ratings.values() if v.get('total_reviews', 0) > 0])
+            avg_rating, rated_users_count = await async_rating_system.get_average_rating()
         except Exception:
             avg_rating = 0.0
             rated_users_count = 0
@@ -250,47 +212,23 @@ async def handle_rating(update, context):
 
 async def handle_requests(update, context):
     """📋 Показать последние активные заявки"""
-    logger.info(f"handle_requests вызван для пользователя {update.effective_user.id if update.effective_user else 'unknown'}")
+    update_logger.info("handle_requests вызван для пользователя %s", _user_id(update))
     user = update.effective_user
     if not user:
         return await update.message.reply_text("❌ Ошибка пользователя")
 
-    # Получаем последние активные заявки
-    requests = request_system.get_all_active_requests(limit=10)
+    # Вся страница ленты — одно сообщение, дальше оно только редактируется
+    page = await get_feed_page()
 
-    if not requests:
+    if page is None:
         await update.message.reply_text(
             "📭 Пока нет активных заявок. Попробуйте позже или создайте свою.",
             reply_markup=get_main_menu_keyboard()
         )
         return
 
-    await update.message.reply_text(
-        f"📋 Найдено {len(requests)} активных заявок (показаны последние):",
-        reply_markup=get_main_menu_keyboard()
-    )
-
-    for req in requests:
-        created = req.get('created_at', '')
-        try:
-            created_str = datetime.fromisoformat(created).strftime('%d.%m.%Y %H:%M') if created else ''
-        except Exception:
-            created_str = created
-
-        text = (
-            f"🆔 Запрос #{req['id']}\n"
-            f"👤 Автор: {req.get('username', '—')}\n"
-            f"🎯 Категория: {req.get('category', '—')}\n"
-            f"💰 Бюджет: {req.get('budget', 'Не указан')}\n"
-            f"⏰ Срок: {req.get('deadline', 'Не указан')}\n\n"
-            f"{(req.get('description') or '')[:400]}{('...' if len(req.get('description',''))>400 else '')}\n\n"
-            f"📅 Создан: {created_str}"
-        )
-
-        await update.message.reply_text(
-            text,
-            reply_markup=get_request_keyboard(req['id'], is_owner=(user.id == req.get('user_id')))
-        )
+    text, markup = page
+    await update.message.reply_text(text, reply_markup=markup)
 
 
 async def main_menu_handler(update, context):
@@ -301,7 +239,7 @@ async def main_menu_handler(update, context):
     text = update.message.text
     user_id = update.effective_user.id if update.effective_user else None
     
-    logger.info(f"Обработка сообщения от пользователя {user_id}: '{text}'")
+    update_logger.info("Обработка сообщения от пользователя %s: '%s'", user_id, text)
     
     if text == "🙋‍♂️ Предложить помощь":
         await handle_offer_help(update, context)
@@ -317,13 +255,10 @@ async def main_menu_handler(update, context):
         await contact_support_command(update, context)
     else:
         # Если ничего не совпадает, показываем справку
-        logger.debug(f"Неизвестная команда: '{text}', показываем справку")
+        update_logger.debug("Неизвестная команда: '%s', показываем справку", text)
         await help_command(update, context)
 
 
-# Импортируем обработчики для сообщений/заявок (без in-bot chat)
-from requests import handle_requests_callback
-
 def register_handlers(app):
     """Регистрирует все обработчики в приложении"""
     
@@ -334,10 +269,26 @@ def register_handlers(app):
     app.add_handler(CommandHandler("help", help_command))
     app.add_handler(CommandHandler("menu", menu_command))
     app.add_handler(CommandHandler("cancel", cancel_command))
+
+    # Рассылки администратора
+    broadcast_conv = ConversationHandler(
+        name='broadcast',
+        persistent=True,
+        entry_points=[CommandHandler("broadcast", start_broadcast_command)],
+        states={
+            ADMIN_SEND_NOTIFICATION: [MessageHandler(filters.TEXT & ~filters.COMMAND, process_broadcast_text)]
+        },
+        fallbacks=[CommandHandler('cancel', cancel_broadcast_input)],
+    )
+    app.add_handler(broadcast_conv)
+    app.add_handler(CommandHandler("broadcast_status", broadcast_status_command))
+    app.add_handler(CommandHandler("broadcast_cancel", broadcast_cancel_command))
     
     # ===== ПРОФИЛЬ (Conversation + Callback) =====
     # Используем handle_profile вместо show_profile для entry point, чтобы показывать главное меню
     profile_conv = ConversationHandler(
+        name='profile',
+        persistent=True,
         entry_points=[
             CallbackQueryHandler(handle_profile_callback, pattern="^(edit_|profile_settings|back_to_profile|back_to_menu|toggle_notifications)")
         ],
@@ -359,6 +310,8 @@ def register_handlers(app):
     
     # ===== РЕГИСТРАЦИЯ =====
     registration_conv = ConversationHandler(
+        name='registration',
+        persistent=True,
         entry_points=[
             MessageHandler(filters.Regex("^🚀 Регистрация$"), start_registration),
             CommandHandler("register", start_registration)
@@ -385,6 +338,8 @@ def register_handlers(app):
     
     # ===== ВХОД =====
     login_conv = ConversationHandler(
+        name='login',
+        persistent=True,
         entry_points=[
             MessageHandler(filters.Regex("^🔐 Вход$"), start_login),
             CommandHandler("login", start_login)
@@ -410,11 +365,17 @@ def register_handlers(app):
     logger.info("  ✅ Информационные команды зарегистрированы")
     
     # ===== КОМАНДЫ ЗАЯВОК =====
+    # Страницы поиска регистрируются раньше общего обработчика callback'ов
+    app.add_handler(CallbackQueryHandler(handle_search_page, pattern=r"^reqsearch_\d+$"))
+    app.add_handler(CallbackQueryHandler(handle_feed_page, pattern=r"^feed_(prev|next)_\d+$"))
+    app.add_handler(CallbackQueryHandler(show_request_chat, pattern=r"^(view_chat_|chat_older_)"))
     app.add_handler(CallbackQueryHandler(handle_request_callback))
     logger.info("  ✅ CallbackQueryHandler для запросов зарегистрирован")
 
     # ===== ПОПРОСИТЬ ПОМОЩИ =====
     need_help_conv = ConversationHandler(
+        name='need_help',
+        persistent=True,
         entry_points=[
             MessageHandler(filters.Regex("^🙏 Попросить помощи$"), start_create_request),
             MessageHandler(filters.Regex("^➕ Создать запрос$"), start_create_request),
@@ -434,6 +395,8 @@ def register_handlers(app):
     
     # ===== ПРЕДЛОЖИТЬ ПОМОЩЬ =====
     offer_help_conv = ConversationHandler(
+        name='offer_help',
+        persistent=True,
         entry_points=[
             MessageHandler(filters.Regex("^🙋‍♂️ Предложить помощь$"), start_offer_help),
         ],
@@ -477,6 +440,34 @@ def register_handlers(app):
     logger.info("✅ Все обработчики успешно зарегистрированы!")
 
 
+def build_application():
+    """Application со всеми обработчиками (в том числе для процессов-шардов)"""
+    # post_init запускает очередь исходящих сообщений и рассылки,
+    # post_shutdown останавливает их и сбрасывает отложенные записи JSON-хранилищ
+    builder = (
+        Application.builder()
+        .token(TOKEN)
+        .post_init(on_startup)
+        .post_shutdown(on_shutdown)
+        # Разные пользователи — параллельно, обновления одного пользователя — по очереди
+        .concurrent_updates(update_processor)
+        # Время и коды ответов Bot API по методам (bot_metrics.py), в том числе getUpdates
+        .request(InstrumentedRequest(connection_pool_size=256))
+        .get_updates_request(InstrumentedRequest())
+        # Лимиты Telegram для всех вызовов Bot API, включая ответы в обработчиках
+        .rate_limiter(rate_limiter)
+        # user_data и шаги диалогов переживают перезапуск (таблица user_sessions)
+        .persistence(session_persistence)
+    )
+    if BOT_API_BASE_URL:
+        # Локальный Bot API сервер или заглушка для бенчмарков
+        builder = builder.base_url(BOT_API_BASE_URL)
+    app = builder.build()
+    register_handlers(app)
+    instrument_handlers(app)
+    return app
+
+
 def main():
     """Главная функция запуска бота"""
     try:
@@ -484,19 +475,26 @@ def main():
         logger.info("🤖 ДоброБот запускается...")
         logger.info("=" * 70)
         
-        # Создаем приложение
-        app = Application.builder().token(TOKEN).build()
+        # Запускаем бота
+        if SHARD_WORKERS > 1:
+            # Главный процесс только принимает обновления, обработчики работают в шардах
+            logger.info(f"🧩 Шардов: {SHARD_WORKERS}")
+            run_sharded(build_application, TOKEN, BOT_API_BASE_URL or None,
+                        allowed_updates=['message', 'callback_query'])
+            return
         
-        # Регистрируем все обработчики
-        register_handlers(app)
+        app = build_application()
         
         logger.info("=" * 70)
         logger.info("✅ ДоброБот готов к работе!")
         logger.info("⏰ Ожидание входящих сообщений...")
         logger.info("=" * 70)
         
-        # Запускаем бота
-        app.run_polling(allowed_updates=['message', 'callback_query'])
+        if BOT_MODE == 'webhook':
+            logger.info("🌐 Режим webhook")
+            run_webhook(app, allowed_updates=['message', 'callback_query'])
+        else:
+            app.run_polling(allowed_updates=['message', 'callback_query'])
         
     except KeyboardInterrupt:
         logger.info("⏹️  Бот остановлен пользователем")
@@ -512,5 +510,37 @@ def main():
         sys.exit(1)
 
 
+def profile_startup():
+    """--profile-startup: время импорта, сборки приложения, создания хранилищ и загрузки сессий"""
+    import asyncio
+    from lazy import preload
+
+    phases = [('импорт модулей', time.perf_counter() - _STARTED)]
+    started = time.perf_counter()
+    app = build_application()
+    phases.append(('build_application', time.perf_counter() - started))
+
+    started = time.perf_counter()
+    preload()
+    phases.append(('создание хранилищ', time.perf_counter() - started))
+
+    async def load_sessions():
+        await app.persistence.get_user_data()
+        for group in app.handlers.values():
+            for handler in group:
+                if isinstance(handler, ConversationHandler) and handler.persistent:
+                    await app.persistence.get_conversations(handler.name)
+
+    started = time.perf_counter()
+    asyncio.run(load_sessions())
+    phases.append(('загрузка сессий (persistence)', time.perf_counter() - started))
+
+    startup_profile.uninstall()
+    print(startup_profile.report(phases))
+
+
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    if PROFILE_STARTUP:
+        profile_startup()
+    else:
+        main()
\ No newline at end of file
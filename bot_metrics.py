@@ -0,0 +1,125 @@
+# bot_metrics.py
+"""
+Замеры, которым нужен PTB: обработчики приложения и запросы к Bot API.
+Сами метрики и HTTP-эндпоинт — в metrics.py.
+
+    instrument_handlers(app)                      # после register_handlers
+    Application.builder().request(InstrumentedRequest())
+                         .get_updates_request(InstrumentedRequest())
+"""
+import os
+import sys
+import time
+import functools
+from typing import Dict
+
+from telegram.ext import ApplicationHandlerStop, ConversationHandler
+from telegram.request import HTTPXRequest
+
+from metrics import api_duration, api_responses, handler_calls, handler_duration, handler_errors
+
+
+# ===== ОБРАБОТЧИКИ =====
+
+def _state_names() -> Dict[object, str]:
+    """Номер шага диалога -> имя константы (states.py, need_help); неоднозначные номера пропускаются"""
+    import states
+    import need_help
+    names: Dict[object, set] = {}
+    for module in (states, need_help):
+        for name, value in vars(module).items():
+            if name.isupper() and type(value) is int:
+                names.setdefault(value, set()).add(name)
+    return {value: next(iter(found)) for value, found in names.items() if len(found) == 1}
+
+
+def _state_name(key, handler, state_names: Dict[object, str]) -> str:
+    # Номера шагов в states.py пересекаются, поэтому сначала ищем константу в модуле обработчика
+    module = sys.modules.get(getattr(handler.callback, '__module__', None) or '')
+    if module is not None:
+        found = {name for name, value in vars(module).items()
+                 if name.isupper() and type(value) is int and value == key}
+        if len(found) == 1:
+            return found.pop()
+    return state_names.get(key, str(key))
+
+
+def _callback_name(callback) -> str:
+    module = getattr(callback, '__module__', '') or ''
+    if module in ('__main__', '__mp_main__'):
+        # bot.py, запущенный как скрипт (и он же в процессах-шардах)
+        path = getattr(sys.modules.get(module), '__file__', None) or module
+        module = os.path.splitext(os.path.basename(path))[0]
+    name = getattr(callback, '__qualname__', None) or repr(callback)
+    return f'{module}.{name}' if module else name
+
+
+def _wrap(handler, state: str):
+    callback = handler.callback
+    if getattr(callback, '__metrics_wrapped__', False):
+        return
+    name = _callback_name(callback)
+
+    @functools.wraps(callback)
+    async def timed(update, context):
+        started = time.perf_counter()
+        handler_calls.inc(name, state)
+        try:
+            return await callback(update, context)
+        except ApplicationHandlerStop:
+            raise
+        except Exception:
+            handler_errors.inc(name, state)
+            raise
+        finally:
+            handler_duration.observe(time.perf_counter() - started, name, state)
+
+    timed.__metrics_wrapped__ = True
+    handler.callback = timed
+
+
+def instrument_handlers(application) -> int:
+    """Оборачивает все обработчики приложения (и внутри ConversationHandler); возвращает их число"""
+    state_names = _state_names()
+    count = 0
+
+    def visit(handler, state: str):
+        nonlocal count
+        if isinstance(handler, ConversationHandler):
+            # Метка state: <имя диалога>:<шаг | entry | fallback>
+            prefix = f'{handler.name or "conversation"}:'
+            for entry in handler.entry_points:
+                visit(entry, prefix + 'entry')
+            for key, handlers in handler.states.items():
+                for inner in handlers:
+                    visit(inner, prefix + _state_name(key, inner, state_names))
+            for fallback in handler.fallbacks:
+                visit(fallback, prefix + 'fallback')
+            return
+        if getattr(handler, 'callback', None) is not None:
+            _wrap(handler, state)
+            count += 1
+
+    for handlers in application.handlers.values():
+        for handler in handlers:
+            visit(handler, '-')
+    return count
+
+
+# ===== BOT API =====
+
+class InstrumentedRequest(HTTPXRequest):
+    """HTTPXRequest с замером времени и кодов ответа по методам Bot API"""
+
+    async def do_request(self, url: str, method: str, request_data=None, *args, **kwargs):
+        api_method = url.rsplit('/', 1)[-1]
+        started = time.perf_counter()
+        try:
+            code, payload = await super().do_request(url, method, request_data, *args, **kwargs)
+        except Exception as e:
+            api_responses.inc(api_method, type(e).__name__)
+            raise
+        finally:
+            api_duration.observe(time.perf_counter() - started, api_method)
+        api_responses.inc(api_method, str(code))
+        return code, payload
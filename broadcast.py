@@ -0,0 +1,342 @@
+# broadcast.py
+"""
+Рассылки: объявления администратора и уведомления помощникам категории.
+
+Получатели читаются из хранилища порциями по BROADCAST_CHUNK_SIZE с курсором
+по id (всех пользователей не держим в памяти), сообщения уходят через
+send_queue в полосе уведомлений. Лимит Telegram соблюдает BotRateLimiter бота,
+общий для рассылки и ответов в обработчиках, и ответы пользователям он
+пропускает вперёд рассылки. После каждой порции курсор
+и счётчики (доставлено / ошибок) сохраняются в таблицу broadcasts, поэтому
+после перезапуска рассылка продолжается с последней сохранённой порции
+(сообщения незавершённой порции могут уйти повторно).
+
+При нескольких процессах рассылку ведёт шард, в котором она запущена
+(столбец shard), и после перезапуска он же её продолжает; если число шардов
+изменилось, рассылки распределяются по номеру шарда по модулю SHARD_WORKERS.
+Отмена меняет статус в таблице, и шард-владелец останавливается на следующей
+контрольной точке.
+"""
+import os
+import asyncio
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from telegram import Update
+from telegram.ext import ContextTypes, ConversationHandler
+
+from db_pool import get_pool
+from interprocess import SHARD_INDEX, SHARD_WORKERS
+from async_storage import AsyncStorage, run_io
+from request_store import STORAGE_DB_PATH
+from repository import repository
+from send_queue import send_queue, PRIORITY_INTERACTIVE, PRIORITY_NOTIFICATION
+from states import ADMIN_SEND_NOTIFICATION
+
+logger = logging.getLogger(__name__)
+
+ADMIN_ID = int(os.getenv('ADMIN_ID', '0') or 0)
+BROADCAST_CHUNK_SIZE = int(os.getenv('BROADCAST_CHUNK_SIZE', '200'))
+# Уведомлять помощников категории о новых заявках
+BROADCAST_NEW_REQUESTS = os.getenv('BROADCAST_NEW_REQUESTS', 'true').lower() == 'true'
+
+AUDIENCE_ALL = 'all'
+AUDIENCE_CATEGORY = 'category'
+
+
+class BroadcastStore:
+    """Рассылки и их контрольные точки в SQLite"""
+
+    TABLE = 'broadcasts'
+
+    def __init__(self, db_path: str = STORAGE_DB_PATH):
+        self.pool = get_pool(db_path)
+        conn = self.pool.get_connection()
+        with conn:
+            conn.execute(f'''
+                CREATE TABLE IF NOT EXISTS {self.TABLE} (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    audience TEXT NOT NULL,
+                    category TEXT,
+                    text TEXT NOT NULL,
+                    exclude_user_id INTEGER,
+                    created_by INTEGER,
+                    status TEXT NOT NULL DEFAULT 'running',
+                    cursor INTEGER NOT NULL DEFAULT 0,
+                    sent INTEGER NOT NULL DEFAULT 0,
+                    failed INTEGER NOT NULL DEFAULT 0,
+                    shard INTEGER NOT NULL DEFAULT 0,
+                    created_at TEXT NOT NULL,
+                    updated_at TEXT NOT NULL
+                )
+            ''')
+            columns = {row['name'] for row in conn.execute(f'PRAGMA table_info({self.TABLE})')}
+            if 'shard' not in columns:
+                conn.execute(f'ALTER TABLE {self.TABLE} ADD COLUMN shard INTEGER NOT NULL DEFAULT 0')
+            conn.execute(f'CREATE INDEX IF NOT EXISTS idx_broadcasts_status ON {self.TABLE}(status)')
+
+    def create(self, audience: str, text: str, category: Optional[str] = None,
+               exclude_user_id: Optional[int] = None, created_by: Optional[int] = None,
+               shard: int = SHARD_INDEX) -> dict:
+        now = datetime.now().isoformat()
+        conn = self.pool.get_connection()
+        with conn:
+            cur = conn.execute(
+                f'INSERT INTO {self.TABLE} (audience, category, text, exclude_user_id, created_by, '
+                f'shard, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (audience, category, text, exclude_user_id, created_by, shard, now, now)
+            )
+        return self.get(cur.lastrowid)
+
+    def get(self, broadcast_id: int) -> Optional[dict]:
+        row = self.pool.get_connection().execute(
+            f'SELECT * FROM {self.TABLE} WHERE id = ?', (broadcast_id,)
+        ).fetchone()
+        return dict(row) if row else None
+
+    def checkpoint(self, broadcast_id: int, cursor: int, sent: int, failed: int) -> bool:
+        """
+        Сохраняет прогресс после порции: курсор и прирост счётчиков.
+        False — рассылка уже не выполняется (отменена), продолжать не нужно.
+        """
+        conn = self.pool.get_connection()
+        with conn:
+            cur = conn.execute(
+                f'UPDATE {self.TABLE} SET cursor = ?, sent = sent + ?, failed = failed + ?, updated_at = ? '
+                f"WHERE id = ? AND status = 'running'",
+                (cursor, sent, failed, datetime.now().isoformat(), broadcast_id)
+            )
+        return cur.rowcount > 0
+
+    def finish(self, broadcast_id: int, status: str = 'done') -> Optional[dict]:
+        """Завершает выполняющуюся рассылку; завершённую или отменённую не меняет"""
+        conn = self.pool.get_connection()
+        with conn:
+            conn.execute(
+                f"UPDATE {self.TABLE} SET status = ?, updated_at = ? WHERE id = ? AND status = 'running'",
+                (status, datetime.now().isoformat(), broadcast_id)
+            )
+        return self.get(broadcast_id)
+
+    def list_running(self, shard: int = 0, workers: int = 1) -> List[dict]:
+        """Незавершённые рассылки шарда shard из workers"""
+        rows = self.pool.get_connection().execute(
+            f"SELECT * FROM {self.TABLE} WHERE status = 'running' AND shard % ? = ? ORDER BY id",
+            (max(1, workers), shard)
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def list_recent(self, limit: int = 5) -> List[dict]:
+        rows = self.pool.get_connection().execute(
+            f'SELECT * FROM {self.TABLE} ORDER BY id DESC LIMIT ?', (limit,)
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+
+def next_recipients(b: dict, after_id: int, limit: int = BROADCAST_CHUNK_SIZE) -> List[int]:
+    """Следующая порция получателей рассылки после after_id"""
+    if b['audience'] == AUDIENCE_CATEGORY:
+        return repository.offers.list_user_ids_by_category(b['category'], after_id, limit)
+    return repository.users.list_ids(after_id, limit)
+
+
+class BroadcastEngine:
+    """Выполняет рассылки фоновыми задачами asyncio"""
+
+    def __init__(self, store: Optional[BroadcastStore] = None, chunk_size: int = BROADCAST_CHUNK_SIZE):
+        self._store = store
+        self.chunk_size = chunk_size
+        self._tasks: Dict[int, asyncio.Task] = {}
+
+    @property
+    def store(self) -> AsyncStorage:
+        # Таблица создаётся при первой рассылке, а не при импорте модуля
+        if self._store is None:
+            self._store = AsyncStorage(BroadcastStore())
+        return self._store
+
+    async def start(self, text: str, audience: str = AUDIENCE_ALL, category: Optional[str] = None,
+                    exclude_user_id: Optional[int] = None, created_by: Optional[int] = None) -> dict:
+        """Создаёт рассылку и запускает её; возвращает запись рассылки"""
+        b = await self.store.create(audience, text, category, exclude_user_id, created_by)
+        self._spawn(b)
+        logger.info("Рассылка #%s запущена (%s %s)", b['id'], audience, category or '')
+        return b
+
+    async def resume(self, shard: int = SHARD_INDEX, workers: int = SHARD_WORKERS):
+        """Продолжает незавершённые рассылки этого шарда (при запуске бота или шарда)"""
+        for b in await self.store.list_running(shard, workers):
+            if b['id'] in self._tasks:
+                continue
+            logger.info("Рассылка #%s продолжается с id %s", b['id'], b['cursor'])
+            self._spawn(b)
+
+    async def stop(self):
+        """Останавливает задачи; рассылки остаются 'running' и продолжатся после запуска"""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def cancel(self, broadcast_id: int) -> Optional[dict]:
+        """
+        Отменяет рассылку; возвращает её запись или None, если такой нет.
+        Задача другого шарда остановится на ближайшем checkpoint.
+        """
+        task = self._tasks.get(broadcast_id)
+        if task is not None:
+            task.cancel()
+        return await self.store.finish(broadcast_id, 'cancelled')
+
+    def _spawn(self, b: dict):
+        task = asyncio.create_task(self._run(b), name=f"broadcast-{b['id']}")
+        self._tasks[b['id']] = task
+        task.add_done_callback(lambda _: self._tasks.pop(b['id'], None))
+
+    async def _run(self, b: dict):
+        cursor = b['cursor']
+        exclude = b.get('exclude_user_id')
+        try:
+            chunk = await run_io(next_recipients, b, cursor, self.chunk_size)
+            while chunk:
+                futures = [
+                    send_queue.enqueue(user_id, b['text'], priority=PRIORITY_NOTIFICATION)
+                    for user_id in chunk if user_id != exclude
+                ]
+                # Следующая порция читается, пока текущая отправляется
+                next_chunk = asyncio.ensure_future(run_io(next_recipients, b, chunk[-1], self.chunk_size))
+                results = await asyncio.gather(*futures, return_exceptions=True)
+                failed = sum(1 for r in results if isinstance(r, BaseException))
+                cursor = chunk[-1]
+                if not await self.store.checkpoint(b['id'], cursor, len(results) - failed, failed):
+                    next_chunk.cancel()
+                    logger.info("Рассылка #%s отменена, остановлена на id %s", b['id'], cursor)
+                    return
+                chunk = await next_chunk
+
+            b = await self.store.finish(b['id'], 'done')
+            if b['status'] != 'done':
+                return
+            logger.info("Рассылка #%s завершена: доставлено %s, ошибок %s", b['id'], b['sent'], b['failed'])
+            if b.get('created_by'):
+                send_queue.enqueue(
+                    b['created_by'],
+                    f"📣 Рассылка #{b['id']} завершена\n✅ Доставлено: {b['sent']}\n❌ Ошибок: {b['failed']}",
+                    priority=PRIORITY_INTERACTIVE
+                )
+        except asyncio.CancelledError:
+            logger.info("Рассылка #%s остановлена на id %s", b['id'], cursor)
+            raise
+        except Exception:
+            logger.exception("Ошибка рассылки #%s", b['id'])
+
+
+broadcast_engine = BroadcastEngine()
+
+
+async def resume_broadcasts(application) -> None:
+    """Хук post_init для PTB"""
+    await broadcast_engine.resume()
+
+
+async def stop_broadcasts(application) -> None:
+    """Хук post_shutdown для PTB"""
+    await broadcast_engine.stop()
+
+
+async def notify_category_helpers(request: dict):
+    """Рассылает новую заявку авторам активных предложений той же категории"""
+    if not BROADCAST_NEW_REQUESTS or not request.get('category'):
+        return None
+    text = (
+        f"🆕 Новая заявка #{request['id']} в категории {request['category']}\n\n"
+        f"{(request.get('description') or '')[:300]}\n\n"
+        f"💰 Бюджет: {request.get('budget', 'Не указан')}"
+    )
+    return await broadcast_engine.start(text, AUDIENCE_CATEGORY, category=request['category'],
+                                        exclude_user_id=request.get('user_id'))
+
+
+# Обработчики администратора
+def is_admin(user_id: int) -> bool:
+    return bool(ADMIN_ID) and user_id == ADMIN_ID
+
+
+async def start_broadcast_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """/broadcast [текст] — рассылка всем пользователям"""
+    if not is_admin(update.effective_user.id):
+        await update.message.reply_text("⛔ Команда доступна только администратору.")
+        return ConversationHandler.END
+
+    text = " ".join(context.args or []).strip()
+    if not text:
+        await update.message.reply_text("📣 Введите текст рассылки (или /cancel):")
+        return ADMIN_SEND_NOTIFICATION
+
+    return await _launch(update, text)
+
+
+async def process_broadcast_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Текст рассылки, введённый после /broadcast"""
+    text = (update.message.text or "").strip()
+    if not text:
+        await update.message.reply_text("Текст не распознан, попробуйте снова:")
+        return ADMIN_SEND_NOTIFICATION
+    return await _launch(update, text)
+
+
+async def _launch(update: Update, text: str):
+    b = await broadcast_engine.start(text, AUDIENCE_ALL, created_by=update.effective_user.id)
+    await update.message.reply_text(
+        f"📣 Рассылка #{b['id']} запущена.\n"
+        f"По завершении придёт отчёт, прогресс — /broadcast_status"
+    )
+    return ConversationHandler.END
+
+
+async def cancel_broadcast_input(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    await update.message.reply_text("Рассылка отменена.")
+    return ConversationHandler.END
+
+
+async def broadcast_status_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """/broadcast_status — последние рассылки и их счётчики"""
+    if not is_admin(update.effective_user.id):
+        await update.message.reply_text("⛔ Команда доступна только администратору.")
+        return
+    items = await broadcast_engine.store.list_recent(5)
+    if not items:
+        await update.message.reply_text("Рассылок ещё не было.")
+        return
+    lines = ["📣 Последние рассылки", ""]
+    for b in items:
+        target = b['category'] if b['audience'] == AUDIENCE_CATEGORY else "все"
+        lines.append(
+            f"#{b['id']} [{b['status']}] → {target}: ✅ {b['sent']} / ❌ {b['failed']} (курсор {b['cursor']})"
+        )
+    if any(b['status'] == 'running' for b in items):
+        lines += ["", "Остановить: /broadcast_cancel <номер>"]
+    await update.message.reply_text("\n".join(lines))
+
+
+async def broadcast_cancel_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """/broadcast_cancel <номер> — остановить рассылку"""
+    if not is_admin(update.effective_user.id):
+        await update.message.reply_text("⛔ Команда доступна только администратору.")
+        return
+    try:
+        broadcast_id = int((context.args or [''])[0].lstrip('#'))
+    except ValueError:
+        await update.message.reply_text("Укажите номер рассылки: /broadcast_cancel 12")
+        return
+
+    b = await broadcast_engine.cancel(broadcast_id)
+    if b is None:
+        await update.message.reply_text(f"Рассылка #{broadcast_id} не найдена.")
+    elif b['status'] == 'cancelled':
+        await update.message.reply_text(
+            f"⏹ Рассылка #{broadcast_id} отменена.\n✅ Доставлено: {b['sent']}\n❌ Ошибок: {b['failed']}"
+        )
+    else:
+        await update.message.reply_text(f"Рассылка #{broadcast_id} уже завершена ({b['status']}).")
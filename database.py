@@ -3,8 +3,15 @@ import sqlite3
 import logging
 import os
 import json
+import threading
+from collections import OrderedDict
 from typing import Optional, Dict, Any
 
+from db_pool import get_pool
+from interprocess import FileLock
+from async_storage import AsyncStorage
+from lazy import LazyProxy
+
 logger = logging.getLogger(__name__)
 
 DB_PATH = os.getenv("DATABASE_PATH", "data/bot_database.db")
@@ -15,6 +22,76 @@ USER_FILES_TO_CLEAR = [
     os.path.join("data", "user_reviews.json"),
     os.path.join("data", "user_stats.json"),
 ]
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+# Поля профиля, у которых есть свои колонки в таблице users; остальные лежат в users.data (JSON)
+USER_COLUMNS = (
+    'full_name', 'phone', 'email', 'password_hash', 'rating',
+    'help_offered_count', 'help_received_count', 'is_active', 'created_at',
+)
+
+_MISSING = object()
+
+
+class UserCache:
+    """
+    LRU-кэш пользователей по telegram_id (включая отрицательные ответы).
+
+    Сбрасывается, когда меняется PRAGMA data_version соединения SQLite
+    (запись из другого соединения или процесса). Собственные записи Database
+    удаляют запись из кэша, и следующее чтение берёт её из таблицы users.
+    Поэтому в файле с пользователями не должно быть часто меняющихся таблиц —
+    заявки, предложения и рассылки лежат в STORAGE_DB_PATH (data/storage.db).
+    """
+
+    def __init__(self, max_size: int = USER_CACHE_SIZE):
+        self.max_size = max_size
+        self._items: "OrderedDict[str, Optional[dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # data_version видна только своему соединению, поэтому храним её по потокам
+        self._local = threading.local()
+        self.hits = 0
+        self.misses = 0
+
+    def validate(self, conn: Optional[sqlite3.Connection]):
+        """Сбрасывает кэш, если БД изменилась извне"""
+        if conn is None:
+            return
+        try:
+            version = conn.execute('PRAGMA data_version').fetchone()[0]
+        except sqlite3.Error:
+            version = None
+        # Первое значение в потоке сравнить не с чем: запись другого процесса могла
+        # произойти до него и не должна оставить в кэше данные, прочитанные другими потоками
+        changed = version != getattr(self._local, 'data_version', _MISSING)
+        self._local.data_version = version
+        if changed:
+            self.clear()
+
+    def get(self, telegram_id: str):
+        """Возвращает копию записи, None (нет пользователя) или _MISSING (нет в кэше)"""
+        with self._lock:
+            if telegram_id not in self._items:
+                self.misses += 1
+                return _MISSING
+            self._items.move_to_end(telegram_id)
+            self.hits += 1
+            user = self._items[telegram_id]
+        return dict(user) if user is not None else None
+
+    def put(self, telegram_id: str, user: Optional[dict]):
+        with self._lock:
+            self._items[telegram_id] = dict(user) if user is not None else None
+            self._items.move_to_end(telegram_id)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def discard(self, telegram_id: str):
+        with self._lock:
+            self._items.pop(telegram_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
 
 
 class Database:
@@ -23,13 +100,14 @@ class Database:
     def __init__(self, db_name: str = "data/bot.db"):
         self.db_name = db_name
         os.makedirs(os.path.dirname(db_name), exist_ok=True)
+        self.pool = get_pool(db_name)
+        self.user_cache = UserCache()
         self.init_database()
+        self._import_users_json()
     
     def get_connection(self):
-        """Получить соединение"""
-        conn = sqlite3.connect(self.db_name, check_same_thread=False)
-        conn.row_factory = sqlite3.Row
-        return conn
+        """Получить соединение из пула (одно на поток, не закрывается после запроса)"""
+        return self.pool.get_connection()
     
     def init_database(self):
         """Инициализация БД"""
@@ -49,9 +127,14 @@ class Database:
                 help_offered_count INTEGER DEFAULT 0,
                 help_received_count INTEGER DEFAULT 0,
                 is_active BOOLEAN DEFAULT 1,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                data TEXT
             )
             ''')
+            columns = {row['name'] for row in cursor.execute('PRAGMA table_info(users)')}
+            if 'data' not in columns:
+                # Остальные поля профиля (username, phone_verified, ...) — JSON
+                cursor.execute('ALTER TABLE users ADD COLUMN data TEXT')
             
             # Таблица заявок
             cursor.execute('''
@@ -85,6 +168,80 @@ class Database:
             
             conn.commit()
             logger.info("✅ База данных инициализирована")
+
+    def _import_users_json(self):
+        """Однократно переносит пользователей из users.json в таблицу users"""
+        if not os.path.exists(USER_JSON_PATH):
+            return
+        # Шарды стартуют одновременно — переносит один, остальные увидят, что файла уже нет
+        with FileLock(USER_JSON_PATH + '.lock'):
+            if not os.path.exists(USER_JSON_PATH):
+                return
+            try:
+                with open(USER_JSON_PATH, 'r', encoding='utf-8') as f:
+                    txt = f.read().strip()
+                users = json.loads(txt) if txt else {}
+                if not isinstance(users, dict):
+                    raise ValueError("ожидался объект {telegram_id: профиль}")
+            except Exception:
+                logger.exception("Не удалось прочитать %s, перенос пропущен", USER_JSON_PATH)
+                return
+
+            added = 0
+            conn = self.get_connection()
+            with conn:
+                for key, user in users.items():
+                    if not isinstance(user, dict):
+                        continue
+                    user = dict(user)
+                    user.setdefault('telegram_id', key)
+                    # Файл был основным источником, поэтому его поля перекрывают строку БД
+                    try:
+                        if self._upsert_user(conn, user):
+                            added += 1
+                    except sqlite3.IntegrityError as e:
+                        logger.error("Пользователь %s из users.json не перенесён: %s", key, e)
+            os.replace(USER_JSON_PATH, USER_JSON_PATH + '.imported')
+        self.user_cache.clear()
+        logger.info("Перенесено %s пользователей из %s", added, USER_JSON_PATH)
+
+    @staticmethod
+    def _row_to_user(row) -> dict:
+        user = json.loads(row['data']) if row['data'] else {}
+        user.update((key, row[key]) for key in row.keys() if key != 'data')
+        return user
+
+    @staticmethod
+    def _upsert_user(conn, user_data: Dict[str, Any]) -> bool:
+        """
+        Вставляет или обновляет строку по telegram_id. Меняются только переданные
+        поля; те, у которых нет колонки, дописываются в users.data.
+        """
+        try:
+            telegram_id = int(user_data.get('telegram_id') or user_data.get('user_id'))
+        except (TypeError, ValueError):
+            return False
+        values = {key: user_data[key] for key in USER_COLUMNS if key in user_data}
+        if 'email' in values:
+            # UNIQUE: пустой email хранится как NULL, вход ищет по нижнему регистру
+            values['email'] = (values['email'] or '').strip().lower() or None
+        for key in ('full_name', 'password_hash'):
+            if key in values and values[key] is None:
+                values[key] = ''
+        extra = {key: value for key, value in user_data.items()
+                 if key not in USER_COLUMNS and key not in ('id', 'telegram_id', 'data')}
+
+        insert = {'full_name': '', 'password_hash': ''}
+        insert.update(values)
+        columns = ['telegram_id'] + list(insert) + ['data']
+        updates = [f'{key} = excluded.{key}' for key in values]
+        updates.append("data = json_patch(COALESCE(users.data, '{}'), excluded.data)")
+        conn.execute(
+            f'INSERT INTO users ({", ".join(columns)}) VALUES ({", ".join("?" * len(columns))}) '
+            f'ON CONFLICT(telegram_id) DO UPDATE SET {", ".join(updates)}',
+            [telegram_id] + list(insert.values()) + [json.dumps(extra, ensure_ascii=False)]
+        )
+        return True
     
     def create_user(self, telegram_id: int, full_name: str, phone: str, 
                    email: str, password_hash: str):
@@ -97,62 +254,53 @@ class Database:
                 VALUES (?, ?, ?, ?, ?)
                 ''', (telegram_id, full_name, phone, email, password_hash))
                 conn.commit()
+                # Убираем закэшированный отрицательный ответ
+                self.user_cache.discard(str(telegram_id))
                 return cursor.lastrowid
         except sqlite3.IntegrityError as e:
             logger.error(f"❌ Ошибка при создании пользователя: {e}")
             return None
     
     def get_user_by_telegram_id(self, telegram_id: int):
-        """Получить пользователя по Telegram ID - проверяет и БД, и users.json"""
+        """Получить пользователя по Telegram ID (через кэш)"""
         telegram_id_str = str(telegram_id)
-        logger.info(f"Поиск пользователя с telegram_id: {telegram_id_str}")
-        
-        # Сначала проверяем users.json
-        try:
-            if os.path.exists(USER_JSON_PATH):
-                with open(USER_JSON_PATH, 'r', encoding='utf-8') as f:
-                    txt = f.read().strip()
-                    if txt:
-                        users_data = json.loads(txt)
-                        user_data = users_data.get(telegram_id_str)
-                        if user_data:
-                            logger.info(f"✅ Пользователь {telegram_id_str} найден в users.json")
-                            return user_data
-                        else:
-                            logger.debug(f"Пользователь {telegram_id_str} не найден в users.json. Доступные ключи: {list(users_data.keys())}")
-        except Exception as e:
-            logger.error(f"Ошибка чтения users.json: {e}", exc_info=True)
-        
-        # Если не найдено в файле, проверяем БД
+        conn = self._sqlite_conn()
+        self.user_cache.validate(conn)
+
+        cached = self.user_cache.get(telegram_id_str)
+        if cached is not _MISSING:
+            return cached
+
+        user = self._load_user(telegram_id, conn)
+        self.user_cache.put(telegram_id_str, user)
+        return user
+
+    def _load_user(self, telegram_id: int, conn):
+        """Читает пользователя из таблицы users"""
+        if conn is None:
+            return None
         try:
-            with self.get_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute('SELECT * FROM users WHERE telegram_id = ?', (telegram_id,))
-                row = cursor.fetchone()
-                if row:
-                    logger.info(f"✅ Пользователь {telegram_id_str} найден в БД")
-                    return dict(row)
+            row = conn.execute('SELECT * FROM users WHERE telegram_id = ?', (telegram_id,)).fetchone()
         except Exception as e:
             logger.error(f"Ошибка проверки БД: {e}", exc_info=True)
-        
-        logger.warning(f"❌ Пользователь {telegram_id_str} не найден ни в users.json, ни в БД")
-        return None
+            return None
+        if row is None:
+            logger.debug("Пользователь %s не найден", telegram_id)
+            return None
+        return self._row_to_user(row)
     
     def get_user_by_email(self, email: str):
         """Получить пользователя по email"""
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute('SELECT * FROM users WHERE email = ?', (email.lower(),))
-            row = cursor.fetchone()
-            return dict(row) if row else None
+        email = (email or '').strip().lower()
+        if not email:
+            return None
+        row = self.get_connection().execute('SELECT * FROM users WHERE email = ?', (email,)).fetchone()
+        return self._row_to_user(row) if row else None
     
     def get_user_by_phone(self, phone: str):
         """Получить пользователя по номеру"""
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute('SELECT * FROM users WHERE phone = ?', (phone,))
-            row = cursor.fetchone()
-            return dict(row) if row else None
+        row = self.get_connection().execute('SELECT * FROM users WHERE phone = ?', (phone,)).fetchone()
+        return self._row_to_user(row) if row else None
     
     def update_user(self, user_id: int, **kwargs):
         """Обновить пользователя"""
@@ -162,6 +310,8 @@ class Database:
         try:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
+                # Прежний telegram_id тоже убираем из кэша: вход переносит запись на новый
+                old = cursor.execute('SELECT telegram_id FROM users WHERE id = ?', (user_id,)).fetchone()
                 
                 set_clause = ', '.join([f"{key} = ?" for key in kwargs.keys()])
                 query = f'UPDATE users SET {set_clause} WHERE id = ?'
@@ -169,11 +319,36 @@ class Database:
                 
                 cursor.execute(query, values)
                 conn.commit()
-                return cursor.rowcount > 0
+                if cursor.rowcount == 0:
+                    return False
+
+                row = cursor.execute('SELECT telegram_id FROM users WHERE id = ?', (user_id,)).fetchone()
+                for found in (old, row):
+                    if found:
+                        self.user_cache.discard(str(found['telegram_id']))
+                return True
         except Exception as e:
             logger.error(f"❌ Ошибка обновления: {e}")
             return False
     
+    def list_telegram_ids(self, after_id: int = 0, limit: int = 1000):
+        """
+        Следующие limit telegram_id больше after_id (по возрастанию).
+        Курсор after_id позволяет обходить всех пользователей порциями.
+        """
+        conn = self._sqlite_conn()
+        if conn is None:
+            return []
+        try:
+            rows = conn.execute(
+                'SELECT telegram_id FROM users WHERE telegram_id > ? ORDER BY telegram_id LIMIT ?',
+                (after_id, limit)
+            ).fetchall()
+        except Exception as e:
+            logger.error("Ошибка чтения пользователей из БД: %s", e)
+            return []
+        return [int(row[0]) for row in rows]
+
     def get_statistics(self):
         """Получить статистику"""
         with self.get_connection() as conn:
@@ -194,51 +369,29 @@ class Database:
 
     def _sqlite_conn(self):
         try:
-            return sqlite3.connect(self.db_name)
+            return self.pool.get_connection()
         except Exception as e:
             logger.debug("SQLite not available: %s", e)
             return None
 
     def create_or_update_user(self, user_data: Dict[str, Any]) -> bool:
-        telegram_id = str(user_data.get('telegram_id') or user_data.get('user_id') or user_data.get('id'))
-        if not telegram_id:
-            logger.error("create_or_update_user: telegram_id not provided")
-            return False
-
-        # Try SQLite upsert
+        """Сохраняет профиль в таблицу users (обновляет только переданные поля)"""
+        telegram_id = user_data.get('telegram_id') or user_data.get('user_id')
         conn = self._sqlite_conn()
-        if conn:
-            try:
-                cur = conn.cursor()
-                # ensure table exists; keep simple schema with telegram_id and data(JSON)
-                cur.execute("""CREATE TABLE IF NOT EXISTS users (
-                                telegram_id TEXT PRIMARY KEY,
-                                data TEXT
-                              )""")
-                cur.execute("INSERT OR REPLACE INTO users (telegram_id, data) VALUES (?, ?)",
-                            (telegram_id, json.dumps(user_data, ensure_ascii=False)))
-                conn.commit()
-                return True
-            except Exception as e:
-                logger.debug("SQLite write failed: %s", e)
-            finally:
-                conn.close()
-
-        # Fallback to file
-        os.makedirs(os.path.dirname(USER_JSON_PATH), exist_ok=True)
+        if conn is None:
+            return False
         try:
-            existing = {}
-            if os.path.exists(USER_JSON_PATH):
-                with open(USER_JSON_PATH, 'r', encoding='utf-8') as f:
-                    t = f.read().strip()
-                    existing = json.loads(t) if t else {}
-            existing[telegram_id] = user_data
-            with open(USER_JSON_PATH, 'w', encoding='utf-8') as f:
-                json.dump(existing, f, ensure_ascii=False, indent=2)
-            return True
-        except Exception as e:
-            logger.error("Failed to save user to file: %s", e)
+            with conn:
+                saved = self._upsert_user(conn, user_data)
+        except sqlite3.IntegrityError as e:
+            # Обычно это email, уже занятый другим пользователем
+            logger.error(f"❌ Ошибка сохранения пользователя {telegram_id}: {e}")
             return False
+        if not saved:
+            logger.error("create_or_update_user: telegram_id not provided")
+            return False
+        self.user_cache.discard(str(int(telegram_id)))
+        return True
 
     def clear_all_users(self):
         """Удаляет всех пользователей из БД / файлов — заставляет всех зарегистрированных пройти регистрацию заново"""
@@ -247,14 +400,13 @@ class Database:
         if conn:
             try:
                 cur = conn.cursor()
-                # if table exists, clear it
-                cur.execute("DROP TABLE IF EXISTS users")
+                # Таблицу не удаляем: её схему создаёт только init_database
+                cur.execute("DELETE FROM users")
                 conn.commit()
                 logger.info("Cleared SQLite users table")
             except Exception as e:
+                conn.rollback()
                 logger.warning("Failed to clear SQLite users table: %s", e)
-            finally:
-                conn.close()
 
         # Clear several JSON files used to store user data or stats
         for p in USER_FILES_TO_CLEAR:
@@ -267,6 +419,11 @@ class Database:
             except Exception as e:
                 logger.warning("Failed to clear file %s: %s", p, e)
 
+        self.user_cache.clear()
+
 
 # Глобальный экземпляр
-db = Database()
\ No newline at end of file
+db = LazyProxy(Database, 'db')
+
+# Асинхронный фасад для обработчиков
+async_db = AsyncStorage(db)
\ No newline at end of file
@@ -10,8 +10,10 @@ from typing import Dict, List, Optional, Tuple, Any, Union
 from contextlib import contextmanager
 import logging
 
-# Настройка логирования
-logging.basicConfig(level=logging.INFO)
+from db_pool import get_pool
+from async_storage import AsyncStorage
+from lazy import LazyProxy
+
 logger = logging.getLogger(__name__)
 
 class DatabaseManager:
@@ -19,6 +21,7 @@ class DatabaseManager:
     
     def __init__(self, db_path: str = "data/bot_database.db"):
         self.db_path = db_path
+        self.pool = get_pool(db_path)
         self._init_database()
     
     def _init_database(self):
@@ -194,25 +197,72 @@ class DatabaseManager:
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_offers_user ON help_offers(user_id)')
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_applications_request ON request_applications(request_id)')
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_reviews_reviewed ON reviews(reviewed_id)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_reviews_pair ON reviews(reviewer_id, reviewed_id, request_id)')
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_messages_conversation ON messages(sender_id, receiver_id)')
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_notifications_user ON notifications(user_id)')
             
+            self._migrate_sessions(cursor)
+            
             conn.commit()
             logger.info("База данных инициализирована")
     
+    @staticmethod
+    def _migrate_sessions(cursor):
+        """
+        Колонки user_sessions для persistence.py: name — раздел (user_data,
+        conversation:<имя>), session_key — ключ внутри раздела.
+        У старых сессий (save_user_session) name пустой.
+        """
+        columns = {row[1] for row in cursor.execute('PRAGMA table_info(user_sessions)')}
+        if 'name' not in columns:
+            cursor.execute("ALTER TABLE user_sessions ADD COLUMN name TEXT NOT NULL DEFAULT ''")
+        if 'session_key' not in columns:
+            cursor.execute("ALTER TABLE user_sessions ADD COLUMN session_key TEXT NOT NULL DEFAULT ''")
+        if 'updated_at' not in columns:
+            cursor.execute('ALTER TABLE user_sessions ADD COLUMN updated_at TIMESTAMP')
+        cursor.execute('''
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_sessions_name_key
+            ON user_sessions(name, session_key) WHERE name != ''
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_sessions_expires ON user_sessions(expires_at)')
+    
     @contextmanager
     def _get_connection(self):
-        """Контекстный менеджер для получения соединения с БД"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row  # Возвращать строки как словари
+        """Контекстный менеджер для получения соединения с БД из пула"""
+        conn = self.pool.get_connection()  # Строки возвращаются как sqlite3.Row
         try:
             yield conn
         except sqlite3.Error as e:
             logger.error(f"Ошибка базы данных: {e}")
             conn.rollback()
             raise
-        finally:
-            conn.close()
+        except Exception:
+            # Соединение переиспользуется, поэтому незавершённая транзакция не должна остаться открытой
+            conn.rollback()
+            raise
+    
+    @contextmanager
+    def _write_transaction(self):
+        """Одна транзакция записи (BEGIN IMMEDIATE) для пакетных операций"""
+        with self._get_connection() as conn:
+            if conn.in_transaction:
+                conn.commit()
+            conn.execute('BEGIN IMMEDIATE')
+            yield conn
+            conn.commit()
+    
+    @staticmethod
+    def _insert_many(conn, sql: str, rows: List[tuple]) -> List[int]:
+        """
+        Вставляет строки одним executemany и возвращает их id.
+        Внутри BEGIN IMMEDIATE другие соединения не пишут в БД, поэтому
+        AUTOINCREMENT выдаёт id подряд и они восстанавливаются по last_insert_rowid().
+        """
+        if not rows:
+            return []
+        conn.executemany(sql, rows)
+        last_id = conn.execute('SELECT last_insert_rowid()').fetchone()[0]
+        return list(range(last_id - len(rows) + 1, last_id + 1))
     
     # === МЕТОДЫ ДЛЯ РАБОТЫ С ПОЛЬЗОВАТЕЛЯМИ ===
     
@@ -658,6 +708,47 @@ class DatabaseManager:
             conn.commit()
             return review_id
     
+    def create_reviews_bulk(self, reviews: List[Tuple[int, int, Dict]]) -> List[int]:
+        """
+        Создает отзывы одной транзакцией
+        
+        Args:
+            reviews: Кортежи (reviewer_id, reviewed_id, review_data), как у create_review
+        
+        Returns:
+            List[int]: id отзывов в порядке входного списка
+        """
+        rows = []
+        seen = set()
+        with self._write_transaction() as conn:
+            # Существующие отзывы читаются один раз на пару пользователей, а не на каждую строку
+            for pair in {(reviewer_id, reviewed_id) for reviewer_id, reviewed_id, _ in reviews}:
+                seen.update(tuple(row) for row in conn.execute('''
+                    SELECT reviewer_id, reviewed_id, request_id FROM reviews
+                    WHERE reviewer_id = ? AND reviewed_id = ?
+                ''', pair))
+            
+            for reviewer_id, reviewed_id, review_data in reviews:
+                key = (reviewer_id, reviewed_id, review_data.get('request_id'))
+                if key in seen:
+                    # Откатывается весь пакет, как и одиночная вставка при повторном отзыве
+                    raise ValueError(f"Отзыв {reviewer_id} -> {reviewed_id} уже существует")
+                seen.add(key)
+                rows.append((
+                    reviewer_id,
+                    reviewed_id,
+                    key[2],
+                    review_data['rating'],
+                    review_data['comment']
+                ))
+            
+            return self._insert_many(conn, '''
+                INSERT INTO reviews (
+                    reviewer_id, reviewed_id, request_id,
+                    rating, comment
+                ) VALUES (?, ?, ?, ?, ?)
+            ''', rows)
+    
     def get_user_reviews(self, user_id: int, limit: int = 20) -> Dict:
         """Получает отзывы о пользователе и статистику"""
         with self._get_connection() as conn:
@@ -765,6 +856,34 @@ class DatabaseManager:
             conn.commit()
             return message_id
     
+    def create_messages_bulk(self, messages: List[Tuple[int, int, Dict]]) -> List[int]:
+        """
+        Создает сообщения одной транзакцией
+        
+        Args:
+            messages: Кортежи (sender_id, receiver_id, message_data), как у create_message
+        
+        Returns:
+            List[int]: id сообщений в порядке входного списка
+        """
+        rows = [
+            (
+                sender_id,
+                receiver_id,
+                message_data.get('request_id'),
+                message_data['message_text'],
+                message_data.get('message_type', 'text')
+            )
+            for sender_id, receiver_id, message_data in messages
+        ]
+        with self._write_transaction() as conn:
+            return self._insert_many(conn, '''
+                INSERT INTO messages (
+                    sender_id, receiver_id, request_id,
+                    message_text, message_type
+                ) VALUES (?, ?, ?, ?, ?)
+            ''', rows)
+    
     def get_conversation_messages(self, user1_id: int, user2_id: int, 
                                  limit: int = 50) -> List[Dict]:
         """Получает сообщения между двумя пользователями"""
@@ -820,6 +939,33 @@ class DatabaseManager:
             conn.commit()
             return notification_id
     
+    def create_notifications_bulk(self, notifications: List[Tuple[int, Dict]]) -> List[int]:
+        """
+        Создает уведомления одной транзакцией (например, всем помощникам категории)
+        
+        Args:
+            notifications: Пары (user_id, notification_data), как у create_notification
+        
+        Returns:
+            List[int]: id уведомлений в порядке входного списка
+        """
+        rows = [
+            (
+                user_id,
+                notification_data['notification_type'],
+                notification_data['title'],
+                notification_data['message'],
+                json.dumps(notification_data.get('data', {}))
+            )
+            for user_id, notification_data in notifications
+        ]
+        with self._write_transaction() as conn:
+            return self._insert_many(conn, '''
+                INSERT INTO notifications (
+                    user_id, notification_type, title, message, data
+                ) VALUES (?, ?, ?, ?, ?)
+            ''', rows)
+    
     def get_unread_notifications(self, user_id: int, limit: int = 20) -> List[Dict]:
         """Получает непрочитанные уведомления"""
         with self._get_connection() as conn:
@@ -860,7 +1006,7 @@ class DatabaseManager:
             # Удаляем старые сессии
             cursor.execute('''
                 DELETE FROM user_sessions 
-                WHERE user_id = ? OR expires_at < CURRENT_TIMESTAMP
+                WHERE name = '' AND (user_id = ? OR expires_at < CURRENT_TIMESTAMP)
             ''', (user_id,))
             
             # Создаем новую сессию
@@ -887,7 +1033,7 @@ class DatabaseManager:
             cursor = conn.cursor()
             cursor.execute('''
                 SELECT * FROM user_sessions
-                WHERE user_id = ? AND expires_at > CURRENT_TIMESTAMP
+                WHERE name = '' AND user_id = ? AND expires_at > CURRENT_TIMESTAMP
                 ORDER BY created_at DESC
                 LIMIT 1
             ''', (user_id,))
@@ -903,10 +1049,54 @@ class DatabaseManager:
         """Удаляет сессию пользователя"""
         with self._get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute('DELETE FROM user_sessions WHERE user_id = ?', (user_id,))
+            cursor.execute("DELETE FROM user_sessions WHERE name = '' AND user_id = ?", (user_id,))
             conn.commit()
             return cursor.rowcount > 0
     
+    def load_sessions(self, name: str) -> List[Dict]:
+        """Неистёкшие записи раздела persistence (session_key, state, data)"""
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT session_key, state, data FROM user_sessions
+                WHERE name = ? AND (expires_at IS NULL OR expires_at > ?)
+            ''', (name, datetime.now().isoformat()))
+            return [dict(row) for row in cursor.fetchall()]
+    
+    def save_sessions(self, upserts: List[tuple], deletes: List[tuple]):
+        """
+        Пакетная запись persistence одной транзакцией.
+        upserts — (name, session_key, user_id, state, data, expires_at),
+        deletes — (name, session_key).
+        """
+        if not upserts and not deletes:
+            return
+        now = datetime.now().isoformat()
+        with self._write_transaction() as conn:
+            if deletes:
+                conn.executemany('DELETE FROM user_sessions WHERE name = ? AND session_key = ?', deletes)
+            if upserts:
+                conn.executemany('''
+                    INSERT INTO user_sessions (
+                        name, session_key, user_id, state, data, expires_at, updated_at
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(name, session_key) WHERE name != '' DO UPDATE SET
+                        user_id = excluded.user_id,
+                        state = excluded.state,
+                        data = excluded.data,
+                        expires_at = excluded.expires_at,
+                        updated_at = excluded.updated_at
+                ''', [row + (now,) for row in upserts])
+    
+    def purge_expired_sessions(self) -> int:
+        """Удаляет истёкшие записи persistence"""
+        with self._write_transaction() as conn:
+            cursor = conn.execute(
+                "DELETE FROM user_sessions WHERE name != '' AND expires_at <= ?",
+                (datetime.now().isoformat(),)
+            )
+            return cursor.rowcount
+    
     # === СТАТИСТИЧЕСКИЕ МЕТОДЫ ===
     
     def get_system_stats(self) -> Dict:
@@ -962,4 +1152,7 @@ class DatabaseManager:
         return backup_path
 
 # Создаем глобальный экземпляр для использования
-db_manager = DatabaseManager()
\ No newline at end of file
+db_manager = LazyProxy(DatabaseManager, 'db_manager')
+
+# Асинхронный фасад для обработчиков
+async_db_manager = AsyncStorage(db_manager)
\ No newline at end of file
@@ -0,0 +1,103 @@
+# db_pool.py
+"""
+Пул долгоживущих соединений SQLite.
+
+Каждый поток получает своё соединение с файлом БД и переиспользует его
+между вызовами (asyncio-задачи работают в потоке цикла событий и потому
+делят одно соединение). При открытии соединение настраивается: WAL,
+synchronous=NORMAL, увеличенный кэш страниц и кэш подготовленных выражений.
+"""
+import os
+import sqlite3
+import threading
+import logging
+from typing import Dict, List
+
+logger = logging.getLogger(__name__)
+
+# Настройки берутся из окружения, значения по умолчанию подходят для бота
+CACHED_STATEMENTS = int(os.getenv('SQLITE_CACHED_STATEMENTS', '256'))
+CACHE_SIZE_KB = int(os.getenv('SQLITE_CACHE_SIZE_KB', '8192'))
+BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000'))
+SYNCHRONOUS = os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL')
+
+
+class ConnectionPool:
+    """Пул соединений с одним файлом БД (одно соединение на поток)"""
+
+    def __init__(self, db_path: str, row_factory=sqlite3.Row):
+        self.db_path = db_path
+        self.row_factory = row_factory
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections: List[sqlite3.Connection] = []
+
+    def _connect(self) -> sqlite3.Connection:
+        """Открывает и настраивает новое соединение"""
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        conn = sqlite3.connect(
+            self.db_path,
+            check_same_thread=False,
+            cached_statements=CACHED_STATEMENTS,
+            timeout=BUSY_TIMEOUT_MS / 1000
+        )
+        conn.row_factory = self.row_factory
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute(f'PRAGMA synchronous={SYNCHRONOUS}')
+        # Отрицательное значение — размер кэша в килобайтах
+        conn.execute(f'PRAGMA cache_size=-{CACHE_SIZE_KB}')
+        conn.execute('PRAGMA temp_store=MEMORY')
+        conn.execute(f'PRAGMA busy_timeout={BUSY_TIMEOUT_MS}')
+
+        with self._lock:
+            self._connections.append(conn)
+        logger.debug("Открыто соединение SQLite %s (поток %s)", self.db_path, threading.get_ident())
+        return conn
+
+    def get_connection(self) -> sqlite3.Connection:
+        """Возвращает соединение текущего потока, открывая его при первом обращении"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+        return conn
+
+    def close_all(self):
+        """Закрывает все соединения пула (при остановке бота)"""
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error as e:
+                logger.warning("Не удалось закрыть соединение %s: %s", self.db_path, e)
+        # Соединения других потоков закрыты, поэтому сбрасываем локальное хранилище
+        self._local = threading.local()
+
+
+_pools: Dict[str, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_path: str) -> ConnectionPool:
+    """Возвращает общий для процесса пул соединений для файла БД"""
+    key = os.path.abspath(db_path)
+    pool = _pools.get(key)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                pool = ConnectionPool(db_path)
+                _pools[key] = pool
+    return pool
+
+
+def close_all_pools():
+    """Закрывает соединения всех пулов"""
+    with _pools_lock:
+        pools = list(_pools.values())
+    for pool in pools:
+        pool.close_all()
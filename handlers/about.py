@@ -37,7 +37,7 @@ async def about_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
         # Отправляем без parse_mode, чтобы избежать ошибок парсинга сущностей
         await _safe_send_text(update.message, about_text, disable_web_page_preview=True)
-        logger.info(f"📖 Пользователь {update.effective_user.id} посмотрел о проекте")
+        logger.info("📖 Пользователь %s посмотрел о проекте", update.effective_user.id)
     except Exception:
         logger.exception("Ошибка в about_command")
         await update.message.reply_text("Информация временно недоступна.")
@@ -52,7 +52,7 @@ async def contact_support_command(update: Update, context: ContextTypes.DEFAULT_
             "Опишите проблему — и мы ответим вам в ближайшее время."
         )
         await _safe_send_text(update.message, text, disable_web_page_preview=True)
-        logger.info(f"📞 Пользователь {update.effective_user.id} запросил поддержку")
+        logger.info("📞 Пользователь %s запросил поддержку", update.effective_user.id)
     except Exception:
         logger.exception("Ошибка в contact_support_command")
         await update.message.reply_text("Служба поддержки временно недоступна.")
@@ -70,7 +70,7 @@ async def show_faq_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
             "Если вопрос не решён — напишите в поддержку."
         )
         await _safe_send_text(update.message, faq_text, disable_web_page_preview=True)
-        logger.info(f"❓ Пользователь {update.effective_user.id} посмотрел FAQ")
+        logger.info("❓ Пользователь %s посмотрел FAQ", update.effective_user.id)
     except Exception:
         logger.exception("Ошибка в show_faq_command")
         await update.message.reply_text("FAQ временно недоступен.")
\ No newline at end of file
@@ -1,31 +1,15 @@
 """Вход"""
 import logging
 import hashlib
-import json
-import os
 from telegram import Update
 from telegram.ext import ContextTypes, ConversationHandler
 from keyboards import get_start_keyboard, get_main_menu_keyboard
-from database import db
+from repository import async_repo
 from states import LOGIN_EMAIL, LOGIN_PASSWORD
 
 logger = logging.getLogger(__name__)
 
 
-def _read_user_from_file(telegram_id: str):
-    """Читает пользователя из users.json"""
-    users_path = os.path.join("data", "users.json")
-    if not os.path.exists(users_path):
-        return None
-    try:
-        with open(users_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        return data.get(str(telegram_id))
-    except Exception as e:
-        logger.error(f"Ошибка чтения users.json: {e}")
-        return None
-
-
 def hash_password(pwd: str) -> str:
     return hashlib.sha256(pwd.encode()).hexdigest()
 
@@ -33,21 +17,17 @@ def hash_password(pwd: str) -> str:
 async def start_login(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Начало входа"""
     user_id = update.effective_user.id
-    logger.info(f"Попытка входа для пользователя {user_id}")
+    logger.info("Попытка входа для пользователя %s", user_id)
     
-    # Сначала проверяем users.json напрямую
-    user_data = _read_user_from_file(str(user_id))
-    
-    # Если не найдено в файле, проверяем БД
-    if not user_data:
-        try:
-            user_data = db.get_user_by_telegram_id(user_id)
-        except Exception as e:
-            logger.error(f"Ошибка при проверке БД: {e}")
-            user_data = None
+    # Таблица users читается через кэш пользователей
+    try:
+        user_data = await async_repo.users.get(user_id)
+    except Exception as e:
+        logger.error(f"Ошибка при проверке БД: {e}")
+        user_data = None
     
     if user_data:
-        # Пользователь найден в users.json или БД - проверяем, что это тот же человек
+        # Пользователь найден в БД - проверяем, что это тот же человек
         # Сверяем telegram_id из данных с текущим telegram_id
         user_telegram_id = str(user_data.get('telegram_id', ''))
         current_telegram_id = str(user_id)
@@ -61,7 +41,7 @@ async def start_login(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 f"Выберите действие:",
                 reply_markup=get_main_menu_keyboard()
             )
-            logger.info(f"Пользователь {user_id} успешно вошёл (найден в users.json)")
+            logger.info("Пользователь %s успешно вошёл (найден по telegram_id)", user_id)
             return ConversationHandler.END
         else:
             # Telegram ID не совпадает - требуем email/пароль
@@ -76,14 +56,15 @@ async def start_login(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def process_login_input(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Email"""
     email = update.message.text.strip().lower()
-    user_data = db.get_user_by_email(email)
+    user_data = await async_repo.users.get_by_email(email)
     
     if not user_data:
         await update.message.reply_text("❌ Email не найден. Попробуйте снова:")
         return LOGIN_EMAIL
     
     context.user_data['login_user_id'] = user_data['id']
-    context.user_data['password_hash'] = user_data['password_hash']
+    # Хэш пароля не кладём в user_data (она сохраняется в user_sessions) — читаем при проверке
+    context.user_data['login_email'] = email
     
     await update.message.reply_text("Введите пароль:")
     return LOGIN_PASSWORD
@@ -93,7 +74,8 @@ async def process_password_input(update: Update, context: ContextTypes.DEFAULT_T
     """Пароль"""
     password = update.message.text
     pwd_hash = hash_password(password)
-    stored_hash = context.user_data.get('password_hash')
+    account = await async_repo.users.get_by_email(context.user_data.get('login_email') or '')
+    stored_hash = account.get('password_hash') if account else None
     
     if pwd_hash != stored_hash:
         context.user_data['login_attempts'] += 1
@@ -108,7 +90,7 @@ async def process_password_input(update: Update, context: ContextTypes.DEFAULT_T
     
     user_id = update.effective_user.id
     login_user_id = context.user_data.get('login_user_id')
-    db.update_user(login_user_id, telegram_id=user_id)
+    await async_repo.users.update_by_id(login_user_id, telegram_id=user_id)
     
     context.user_data.clear()
     
@@ -4,7 +4,7 @@ from telegram import Update, ReplyKeyboardMarkup, KeyboardButton
 from telegram.ext import ContextTypes, ConversationHandler
 
 from keyboards import get_main_menu_keyboard, get_start_keyboard
-from database import db
+from repository import async_repo
 from states import OFFER_CATEGORY, OFFER_TITLE, OFFER_DESCRIPTION, OFFER_CONTACTS
 
 logger = logging.getLogger(__name__)
@@ -35,7 +35,7 @@ def get_categories_keyboard():
 async def start_offer_help(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Начало предложения помощи"""
     user_id = update.effective_user.id
-    user_data = db.get_user_by_telegram_id(user_id)
+    user_data = await async_repo.users.get(user_id)
     
     if not user_data:
         await update.message.reply_text(
@@ -52,7 +52,7 @@ async def start_offer_help(update: Update, context: ContextTypes.DEFAULT_TYPE):
         reply_markup=get_categories_keyboard()
     )
     
-    logger.info(f"Пользователь {user_id} начал предложение помощи")
+    logger.info("Пользователь %s начал предложение помощи", user_id)
     return OFFER_CATEGORY
 
 
@@ -210,36 +210,10 @@ async def process_offer_contacts(update: Update, context: ContextTypes.DEFAULT_T
             'contacts': contacts
         }
         
-        # Сохраняем в файл (пока нет специальной таблицы в БД)
-        import json
-        import os
-        from datetime import datetime
+        offer_data['username'] = user.username or user.first_name
         
-        os.makedirs('data', exist_ok=True)
-        offers_file = 'data/offers.json'
-        
-        offers = []
-        if os.path.exists(offers_file):
-            with open(offers_file, 'r', encoding='utf-8') as f:
-                offers = json.load(f)
-        
-        offer = {
-            'id': len(offers) + 1,
-            'user_id': user_id,
-            'username': user.username or user.first_name,
-            'category': context.user_data['offer_category'],
-            'title': context.user_data['offer_title'],
-            'description': context.user_data['offer_description'],
-            'contacts': contacts,
-            'created_at': datetime.now().isoformat(),
-            'status': 'active',
-            'views': 0
-        }
-        
-        offers.append(offer)
-        
-        with open(offers_file, 'w', encoding='utf-8') as f:
-            json.dump(offers, f, ensure_ascii=False, indent=2)
+        offer_data['views'] = 0
+        offer = await async_repo.offers.insert(offer_data)
         
         # Очищаем временные данные
         context.user_data.clear()
@@ -257,7 +231,7 @@ async def process_offer_contacts(update: Update, context: ContextTypes.DEFAULT_T
             reply_markup=get_main_menu_keyboard()
         )
         
-        logger.info(f"Пользователь {user_id} опубликовал предложение помощи #{offer['id']}")
+        logger.info("Пользователь %s опубликовал предложение помощи #%s", user_id, offer['id'])
         
     except Exception as e:
         logger.error(f"Ошибка при сохранении предложения: {e}")
@@ -278,5 +252,5 @@ async def cancel_offer(update: Update, context: ContextTypes.DEFAULT_TYPE):
         reply_markup=get_main_menu_keyboard()
     )
     
-    logger.info(f"Пользователь {update.effective_user.id} отменил предложение помощи")
+    logger.info("Пользователь %s отменил предложение помощи", update.effective_user.id)
     return ConversationHandler.END
@@ -1,6 +1,4 @@
 """Регистрация"""
-import os
-import json
 import hashlib
 import logging
 import re
@@ -11,7 +9,8 @@ from telegram.ext import ContextTypes, ConversationHandler
 from keyboards import get_main_menu_keyboard, get_contact_request_keyboard, get_confirmation_keyboard, get_registration_keyboard
 from personal import show_profile
 
-from database import db
+from repository import async_repo
+from async_storage import run_io
 from states import (
     REGISTER_NAME, REGISTER_PHONE, REGISTER_CONFIRM_PHONE, REGISTER_VERIFY_PHONE_CODE,
     REGISTER_EMAIL, REGISTER_PASSWORD
@@ -20,9 +19,10 @@ from sms_service import generate_and_send_code
 
 logger = logging.getLogger(__name__)
 
+
 async def start_registration(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user = update.effective_user
-    logger.info(f"Пользователь {user.id} начал регистрацию")
+    logger.info("Пользователь %s начал регистрацию", user.id)
     context.user_data['registration'] = {}
     await update.message.reply_text(
         "Введите, пожалуйста, ваше имя и фамилию (например: Иван Иванов):",
@@ -78,8 +78,9 @@ async def register_confirm_phone(update: Update, context: ContextTypes.DEFAULT_T
             return REGISTER_PHONE
         
         # Генерируем и отправляем код
-        logger.info(f"Попытка отправить SMS код на номер {phone}")
-        code, success, message = generate_and_send_code(phone)
+        logger.info("Попытка отправить SMS код на номер %s", phone)
+        # HTTP-запрос к SMS-шлюзу блокирует поток — выполняем его в пуле, а не в цикле событий
+        code, success, message = await run_io(generate_and_send_code, phone)
         
         if success and code:
             # Сохраняем код для проверки
@@ -201,32 +202,13 @@ async def register_password(update: Update, context: ContextTypes.DEFAULT_TYPE):
     reg.setdefault('help_offered_count', 0)
     reg.setdefault('help_received_count', 0)
 
-    saved = False
+    # Одна запись в таблицу users; False — например, email уже занят
     try:
-        if hasattr(db, "create_or_update_user"):
-            db.create_or_update_user(reg)
-            saved = True
+        saved = await async_repo.users.save(reg)
     except Exception as e:
-        logger.error(f"Ошибка записи в DB: {e}", exc_info=True)
+        logger.error(f"Ошибка при сохранении профиля: {e}", exc_info=True)
         saved = False
 
-    if not saved:
-        users_path = os.path.join("data", "users.json")
-        os.makedirs(os.path.dirname(users_path), exist_ok=True)
-        try:
-            loaded = {}
-            if os.path.exists(users_path):
-                with open(users_path, 'r', encoding='utf-8') as f:
-                    txt = f.read().strip()
-                    loaded = json.loads(txt) if txt else {}
-            loaded[reg['telegram_id']] = reg
-            with open(users_path, 'w', encoding='utf-8') as f:
-                json.dump(loaded, f, ensure_ascii=False, indent=2)
-            saved = True
-        except Exception as e:
-            logger.error(f"Ошибка при сохранении профиля в файл: {e}", exc_info=True)
-            saved = False
-
     # Завершение регистрации и показ главного меню
     if saved:
         welcome_text = (
@@ -244,7 +226,7 @@ async def register_password(update: Update, context: ContextTypes.DEFAULT_TYPE):
             welcome_text,
             reply_markup=get_main_menu_keyboard()
         )
-        logger.info(f"Пользователь {reg['telegram_id']} успешно зарегистрирован")
+        logger.info("Пользователь %s успешно зарегистрирован", reg['telegram_id'])
     else:
         await update.message.reply_text(
             "❌ Ошибка при сохранении профиля. Попробуйте позже.",
@@ -257,7 +239,7 @@ async def register_password(update: Update, context: ContextTypes.DEFAULT_TYPE):
     for key in list(context.user_data.keys()):
         if key.startswith('registration') or key.startswith('sms_'):
             context.user_data.pop(key, None)
-    logger.info(f"Регистрация завершена, ConversationHandler завершён для пользователя {reg.get('telegram_id')}")
+    logger.info("Регистрация завершена, ConversationHandler завершён для пользователя %s", reg.get('telegram_id'))
     return ConversationHandler.END
 
 async def cancel_registration(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -4,7 +4,7 @@ from telegram import Update
 from telegram.ext import ContextTypes, ConversationHandler
 
 from keyboards import get_start_keyboard, get_main_menu_keyboard
-from database import db
+from repository import async_repo
 
 logger = logging.getLogger(__name__)
 
@@ -12,7 +12,7 @@ logger = logging.getLogger(__name__)
 async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Обработчик /start"""
     user_id = update.effective_user.id
-    user_data = db.get_user_by_telegram_id(user_id)
+    user_data = await async_repo.users.get(user_id)
     
     if user_data:
         await update.message.reply_text(
@@ -40,7 +40,7 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def menu_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Обработчик /menu"""
     user_id = update.effective_user.id
-    user_data = db.get_user_by_telegram_id(user_id)
+    user_data = await async_repo.users.get(user_id)
     
     if user_data:
         await update.message.reply_text("Меню:", reply_markup=get_main_menu_keyboard())
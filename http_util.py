@@ -0,0 +1,63 @@
+# http_util.py
+"""
+Минимальный HTTP/1.1 поверх asyncio-потоков: чтение запроса и запись ответа.
+
+Общий для webhook_server.py и metrics.py; не зависит от PTB, поэтому
+его можно импортировать из модулей хранилищ без загрузки telegram.
+"""
+import asyncio
+from typing import Dict, Optional, Tuple
+
+# Максимальный размер тела запроса по умолчанию, байт
+MAX_BODY = 1024 * 1024
+
+_REASONS = {200: 'OK', 400: 'Bad Request', 403: 'Forbidden', 404: 'Not Found',
+            405: 'Method Not Allowed', 413: 'Payload Too Large', 503: 'Service Unavailable'}
+
+
+class HttpError(Exception):
+    def __init__(self, status: int):
+        super().__init__(status)
+        self.status = status
+
+
+async def read_http_request(reader: asyncio.StreamReader,
+                            max_body: int = MAX_BODY) -> Optional[Tuple[str, str, Dict[str, str], bytes]]:
+    """Читает один HTTP/1.1 запрос: (метод, путь, заголовки, тело) или None, если соединение закрыто"""
+    line = await reader.readline()
+    if not line:
+        return None
+    try:
+        method, path, _ = line.decode('latin-1').split(' ', 2)
+    except ValueError:
+        raise HttpError(400)
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+
+    try:
+        length = int(headers.get('content-length') or 0)
+    except ValueError:
+        raise HttpError(400)
+    if length < 0:
+        raise HttpError(400)
+    if length > max_body:
+        raise HttpError(413)
+    body = await reader.readexactly(length) if length else b''
+    return method.upper(), path, headers, body
+
+
+def write_http_response(writer: asyncio.StreamWriter, status: int, body: bytes = b'',
+                        content_type: str = 'text/plain', keep_alive: bool = True):
+    head = (
+        f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+        f"Content-Type: {content_type}\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+    )
+    writer.write(head.encode('latin-1') + body)
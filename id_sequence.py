@@ -0,0 +1,108 @@
+# id_sequence.py
+"""
+Постоянные последовательности идентификаторов для JSON-хранилищ.
+
+Вместо len(list) + 1 или max(ids) + 1 хранилища берут id из именованной
+последовательности. На диске хранится только верхняя граница
+зарезервированного блока: файл переписывается (атомарно, с fsync) один раз
+на ID_BLOCK_SIZE идентификаторов, остальные выдаются из памяти за O(1).
+После сбоя неиспользованный остаток блока пропускается — id могут идти
+с пропусками, но никогда не повторяются.
+
+Блок резервируется под файловой блокировкой с перечитыванием границы
+с диска, поэтому несколько процессов (шарды) получают непересекающиеся блоки.
+"""
+import os
+import json
+import threading
+import logging
+from typing import Callable, Dict, Optional, Union
+
+from interprocess import FileLock
+from write_behind import atomic_write_text
+
+logger = logging.getLogger(__name__)
+
+ID_SEQUENCE_DIR = os.getenv('ID_SEQUENCE_DIR', 'data/sequences')
+ID_BLOCK_SIZE = int(os.getenv('ID_BLOCK_SIZE', '32'))
+
+
+class IdSequence:
+    """Монотонная последовательность id с резервированием блоками"""
+
+    def __init__(self, name: str, path: str, block_size: int = ID_BLOCK_SIZE,
+                 seed: Optional[Union[int, Callable[[], int]]] = None):
+        self.name = name
+        self.path = path
+        self.block_size = max(1, block_size)
+        self._lock = threading.Lock()
+        self._file_lock = FileLock(path + '.lock')
+
+        with self._file_lock:
+            reserved = self._read_reserved()
+            if reserved is None:
+                # Файла ещё нет: продолжаем после максимального id в существующих данных
+                reserved = (seed() if callable(seed) else seed) or 0
+                self._write_reserved(reserved)
+        self._next = reserved + 1
+        self._hi = reserved
+
+    def _read_reserved(self) -> Optional[int]:
+        if not os.path.exists(self.path):
+            return None
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return int(json.load(f)['reserved'])
+        except Exception:
+            logger.exception("Повреждён файл последовательности %s", self.path)
+            return None
+
+    def _write_reserved(self, value: int):
+        atomic_write_text(self.path, json.dumps({'name': self.name, 'reserved': value}))
+
+    def next_id(self) -> int:
+        """Следующий id"""
+        with self._lock:
+            if self._next > self._hi:
+                self._reserve_block(self._next)
+            value = self._next
+            self._next += 1
+            return value
+
+    def ensure_at_least(self, value: int):
+        """Гарантирует, что следующие id будут больше value"""
+        with self._lock:
+            if self._next <= value:
+                self._next = value + 1
+            if self._hi < value:
+                with self._file_lock:
+                    reserved = max(value, self._read_reserved() or 0)
+                    self._write_reserved(reserved)
+                self._hi = value
+
+    def _reserve_block(self, start: int):
+        # Сначала сохраняем границу блока, потом выдаём id из него.
+        # Другой процесс мог зарезервировать блоки после нас — начинаем после его границы
+        with self._file_lock:
+            start = max(start, (self._read_reserved() or 0) + 1)
+            hi = start + self.block_size - 1
+            self._write_reserved(hi)
+        self._next = start
+        self._hi = hi
+
+
+_sequences: Dict[str, IdSequence] = {}
+_sequences_lock = threading.Lock()
+
+
+def get_sequence(name: str, seed: Optional[Union[int, Callable[[], int]]] = None) -> IdSequence:
+    """
+    Возвращает общую для процесса последовательность. seed — максимальный
+    уже выданный id (число или функция); используется только при создании файла.
+    """
+    with _sequences_lock:
+        seq = _sequences.get(name)
+        if seq is None:
+            seq = IdSequence(name, os.path.join(ID_SEQUENCE_DIR, f"{name}.json"), seed=seed)
+            _sequences[name] = seq
+    return seq
@@ -0,0 +1,129 @@
+# interprocess.py
+"""
+Согласование хранилищ между процессами-шардами (sharding.py).
+
+При SHARD_WORKERS > 1 обновления обрабатывают несколько процессов, а
+JSON-хранилища держат данные в памяти. Чтобы процессы не затирали
+изменения друг друга:
+
+- FileLock — блокировка через flock на файле рядом с данными;
+- SharedFiles — помнит (inode, размер, mtime) своих файлов и перед
+  обращением к хранилищу перечитывает его, если файлы изменил другой процесс;
+- @cross_process — метод хранилища выполняется под FileLock с
+  предварительной синхронизацией, а mark_dirty_json пишет файл сразу.
+
+В обычном режиме (один процесс) всё это отключено и ничего не стоит.
+SQLite согласован сам (WAL + busy_timeout).
+"""
+import os
+import threading
+import functools
+import logging
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: блокировка только внутри процесса
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+SHARD_WORKERS = max(1, int(os.getenv('SHARD_WORKERS', '1')))
+# Номер шарда текущего процесса (задаёт sharding.py)
+SHARD_INDEX = int(os.getenv('SHARD_INDEX', '0'))
+MULTI_PROCESS = SHARD_WORKERS > 1
+
+
+class FileLock:
+    """Межпроцессная блокировка (flock), повторно входимая внутри процесса"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._fd: Optional[int] = None
+
+    def acquire(self):
+        self._lock.acquire()
+        if self._depth == 0 and fcntl is not None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+        self._depth += 1
+
+    @property
+    def depth(self) -> int:
+        return self._depth
+
+    def release(self):
+        self._depth -= 1
+        if self._depth == 0 and self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+        self._lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+def file_signature(path: str) -> Optional[Tuple[int, int, int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_ino, st.st_size, st.st_mtime_ns
+
+
+class SharedFiles:
+    """
+    Файлы хранилища, которые могут менять другие процессы.
+    reload(changed_paths) вызывается, когда файлы изменились не этим процессом.
+    """
+
+    def __init__(self, paths: Iterable[str], reload: Callable[[List[str]], None], lock_path: str):
+        self.paths = list(paths)
+        self._reload = reload
+        self.lock = FileLock(lock_path)
+        self._signatures: Dict[str, Optional[Tuple[int, int, int]]] = {}
+        self.remember()
+
+    def remember(self):
+        """Запоминает состояние файлов после собственной записи"""
+        self._signatures = {p: file_signature(p) for p in self.paths}
+
+    def sync(self):
+        changed = [p for p in self.paths if file_signature(p) != self._signatures.get(p)]
+        if changed:
+            logger.debug("Файлы изменены другим процессом: %s", changed)
+            self._reload(changed)
+            self.remember()
+
+
+def cross_process(method):
+    """
+    Метод хранилища с атрибутами self._lock и self._shared (SharedFiles).
+    В многопроцессном режиме выполняется под файловой блокировкой,
+    перед ним подхватываются изменения других процессов.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if not MULTI_PROCESS:
+            with self._lock:
+                return method(self, *args, **kwargs)
+        with self._lock, self._shared.lock:
+            # Вложенные вызовы (метод хранилища вызывает другой) не синхронизируют повторно
+            if self._shared.lock.depth > 1:
+                return method(self, *args, **kwargs)
+            self._shared.sync()
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                self._shared.remember()
+    return wrapper
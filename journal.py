@@ -0,0 +1,239 @@
+# journal.py
+"""
+Append-only журнал записей в формате JSON Lines.
+
+Каждая строка — одна операция: {"op": "put", "rec": {...}} добавляет или
+заменяет запись, {"op": "patch", "id": N, "fields": {...}} меняет её поля.
+При запуске журнал читается целиком и в памяти строится индекс id -> запись.
+Добавление — одна дописанная строка (O(1)); когда операций становится
+заметно больше, чем записей, журнал сжимается в снимок через временный файл
+и атомарное переименование. Оборванная последняя строка (сбой во время
+записи) при загрузке отбрасывается.
+
+Если журнал дописывает другой процесс (шарды, см. interprocess.py),
+sync() дочитывает новые строки, а после чужого сжатия перечитывает файл.
+"""
+import os
+import json
+import threading
+import logging
+from typing import Any, Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_FSYNC = os.getenv('JOURNAL_FSYNC', 'false').lower() == 'true'
+COMPACT_MIN_OPS = int(os.getenv('JOURNAL_COMPACT_MIN_OPS', '1000'))
+COMPACT_RATIO = float(os.getenv('JOURNAL_COMPACT_RATIO', '2.0'))
+
+
+class JsonlJournal:
+    """Журнал записей с целочисленным полем id"""
+
+    def __init__(self, path: str, legacy_json_path: Optional[str] = None):
+        self.path = path
+        self._records: Dict[int, dict] = {}
+        self._ops = 0
+        self._max_id = 0
+        self._lock = threading.RLock()
+        self._file = None
+        # Прочитанная / записанная нами часть файла (для sync)
+        self._offset = 0
+        self._inode = None
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        if not os.path.exists(path) and legacy_json_path and os.path.exists(legacy_json_path):
+            self._import_legacy(legacy_json_path)
+        else:
+            self._load()
+        self._open()
+
+    def _open(self):
+        self._file = open(self.path, 'a', encoding='utf-8')
+        self._remember_position()
+
+    def _remember_position(self):
+        st = os.fstat(self._file.fileno())
+        self._offset = st.st_size
+        self._inode = st.st_ino
+
+    # === ЗАГРУЗКА ===
+
+    def _apply(self, op: dict):
+        kind = op.get('op')
+        if kind == 'put':
+            rec = op['rec']
+            self._records[rec['id']] = rec
+            self._max_id = max(self._max_id, rec['id'])
+        elif kind == 'patch':
+            rec = self._records.get(op['id'])
+            if rec is not None:
+                rec.update(op.get('fields', {}))
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+
+        with open(self.path, 'rb') as f:
+            raw = f.read()
+
+        good_offset = 0
+        offset = 0
+        lines = raw.split(b'\n')
+        for i, line in enumerate(lines):
+            is_last = i == len(lines) - 1
+            end = offset + len(line) + (0 if is_last else 1)
+            if line.strip():
+                try:
+                    self._apply(json.loads(line.decode('utf-8')))
+                    self._ops += 1
+                    good_offset = end
+                except (ValueError, KeyError, TypeError):
+                    if is_last:
+                        # Запись оборвалась на середине — отбрасываем хвост
+                        logger.warning("Журнал %s: отброшена неполная последняя строка", self.path)
+                    else:
+                        logger.error("Журнал %s: повреждённая строка %s пропущена", self.path, i + 1)
+                        good_offset = end
+            else:
+                good_offset = end
+            offset = end
+
+        if good_offset < len(raw):
+            with open(self.path, 'rb+') as f:
+                f.truncate(good_offset)
+        elif raw and not raw.endswith(b'\n'):
+            # Последняя строка цела, но без перевода строки
+            with open(self.path, 'ab') as f:
+                f.write(b'\n')
+
+    def _import_legacy(self, legacy_path: str):
+        """Переносит записи из старого JSON-массива и сразу пишет снимок"""
+        try:
+            with open(legacy_path, 'r', encoding='utf-8') as f:
+                items = json.load(f) or []
+        except Exception:
+            logger.exception("Не удалось прочитать %s", legacy_path)
+            items = []
+        for rec in items:
+            if isinstance(rec, dict) and 'id' in rec:
+                self._apply({'op': 'put', 'rec': rec})
+        self._write_snapshot()
+        logger.info("Журнал %s: перенесено %s записей из %s", self.path, len(self._records), legacy_path)
+
+    # === ЗАПИСЬ ===
+
+    def _write_line(self, op: dict):
+        self._file.write(json.dumps(op, ensure_ascii=False) + '\n')
+        self._file.flush()
+        if JOURNAL_FSYNC:
+            os.fsync(self._file.fileno())
+        self._ops += 1
+        self._remember_position()
+
+    def next_id(self) -> int:
+        """Следующий свободный id (максимальный + 1)"""
+        with self._lock:
+            return self._max_id + 1
+
+    def append(self, record: Dict[str, Any]) -> dict:
+        """Добавляет запись (поле id обязательно)"""
+        with self._lock:
+            self._write_line({'op': 'put', 'rec': record})
+            self._apply({'op': 'put', 'rec': record})
+            self._maybe_compact()
+        return record
+
+    def patch(self, record_id: int, fields: Dict[str, Any]) -> Optional[dict]:
+        """Меняет поля записи, возвращает её или None"""
+        with self._lock:
+            rec = self._records.get(record_id)
+            if rec is None:
+                return None
+            self._write_line({'op': 'patch', 'id': record_id, 'fields': fields})
+            rec.update(fields)
+            self._maybe_compact()
+            return rec
+
+    # === СЖАТИЕ ===
+
+    def _write_snapshot(self):
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for rec in self._records.values():
+                f.write(json.dumps({'op': 'put', 'rec': rec}, ensure_ascii=False) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self._ops = len(self._records)
+
+    def _maybe_compact(self):
+        if self._ops >= COMPACT_MIN_OPS and self._ops > COMPACT_RATIO * len(self._records):
+            self.compact()
+
+    def compact(self):
+        """Переписывает журнал снимком текущих записей"""
+        with self._lock:
+            if self._file:
+                self._file.close()
+            self._write_snapshot()
+            self._open()
+        logger.debug("Журнал %s сжат до %s записей", self.path, len(self._records))
+
+    def close(self):
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+
+    # === СИНХРОНИЗАЦИЯ ===
+
+    def sync(self) -> bool:
+        """Подхватывает изменения журнала другим процессом; True, если записи изменились"""
+        with self._lock:
+            try:
+                st = os.stat(self.path)
+            except OSError:
+                return False
+            if st.st_ino != self._inode:
+                # Журнал сжат другим процессом — перечитываем целиком
+                if self._file:
+                    self._file.close()
+                self._records.clear()
+                self._ops = 0
+                self._max_id = 0
+                self._load()
+                self._open()
+                return True
+            if st.st_size <= self._offset:
+                return False
+
+            with open(self.path, 'rb') as f:
+                f.seek(self._offset)
+                tail = f.read(st.st_size - self._offset)
+            # Только целые строки: последняя может ещё дописываться
+            end = tail.rfind(b'\n') + 1
+            for line in tail[:end].split(b'\n'):
+                if not line.strip():
+                    continue
+                try:
+                    self._apply(json.loads(line.decode('utf-8')))
+                    self._ops += 1
+                except (ValueError, KeyError, TypeError):
+                    logger.error("Журнал %s: повреждённая строка пропущена", self.path)
+            self._offset += end
+            return end > 0
+
+    # === ЧТЕНИЕ ===
+
+    def get(self, record_id: int) -> Optional[dict]:
+        return self._records.get(record_id)
+
+    def values(self) -> Iterator[dict]:
+        with self._lock:
+            return iter(list(self._records.values()))
+
+    def __len__(self) -> int:
+        return len(self._records)
@@ -0,0 +1,125 @@
+# lazy.py
+"""
+Ленивые глобальные экземпляры хранилищ.
+
+Раньше `import bot` сразу создавал db, db_manager, request_system,
+rating_system, request_manager: открывал две SQLite-базы, создавал
+схемы, читал JSON-файлы и строил индексы — ещё до первого обновления.
+LazyProxy откладывает создание до первого обращения к атрибуту:
+
+    db = LazyProxy(Database)        # вместо db = Database()
+    db.get_user_by_telegram_id(1)   # здесь создаётся Database()
+
+Создание выполняется один раз (под блокировкой), его время попадает в
+init_timings — их показывает `python bot.py --profile-startup`.
+warm_up() создаёт экземпляры в пуле потоков после запуска бота, чтобы
+первый ответ пользователю не ждал чтения файлов.
+"""
+import time
+import asyncio
+import threading
+import logging
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Имя экземпляра -> время создания, секунд
+init_timings: Dict[str, float] = {}
+
+_proxies: Dict[str, 'LazyProxy'] = {}
+
+
+class LazyProxy:
+    """Создаёт объект factory() при первом обращении и дальше перенаправляет к нему атрибуты"""
+
+    __slots__ = ('_lazy_factory', '_lazy_name', '_lazy_target', '_lazy_lock')
+
+    def __init__(self, factory: Callable[[], Any], name: Optional[str] = None):
+        object.__setattr__(self, '_lazy_factory', factory)
+        object.__setattr__(self, '_lazy_name', name or getattr(factory, '__name__', repr(factory)))
+        object.__setattr__(self, '_lazy_target', None)
+        object.__setattr__(self, '_lazy_lock', threading.Lock())
+        _proxies[self._lazy_name] = self
+
+    @property
+    def lazy_class(self) -> Optional[type]:
+        """Класс экземпляра, если factory — класс (без создания экземпляра)"""
+        factory = self._lazy_factory
+        return factory if isinstance(factory, type) else None
+
+    @property
+    def lazy_name(self) -> str:
+        return self._lazy_name
+
+    @property
+    def lazy_ready(self) -> bool:
+        return self._lazy_target is not None
+
+    def lazy_get(self) -> Any:
+        target = self._lazy_target
+        if target is None:
+            with self._lazy_lock:
+                target = self._lazy_target
+                if target is None:
+                    started = time.perf_counter()
+                    target = self._lazy_factory()
+                    elapsed = time.perf_counter() - started
+                    init_timings[self._lazy_name] = elapsed
+                    logger.debug("%s создан за %.1f мс", self._lazy_name, elapsed * 1000)
+                    object.__setattr__(self, '_lazy_target', target)
+        return target
+
+    def __getattr__(self, name: str):
+        return getattr(self.lazy_get(), name)
+
+    def __setattr__(self, name: str, value):
+        setattr(self.lazy_get(), name, value)
+
+    def __repr__(self):
+        if self._lazy_target is None:
+            return f'<LazyProxy {self._lazy_name} (не создан)>'
+        return repr(self._lazy_target)
+
+
+def is_callable_attr(target: Any, name: str) -> bool:
+    """callable(getattr(target, name)) без создания ленивого экземпляра, если это возможно"""
+    if isinstance(target, LazyProxy) and not target.lazy_ready and target.lazy_class is not None:
+        attr = getattr(target.lazy_class, name, None)
+        if attr is not None and not isinstance(attr, property):
+            return callable(attr)
+    return callable(getattr(target, name))
+
+
+def preload(*names: str):
+    """Создаёт ленивые экземпляры (все зарегистрированные, если имена не заданы)"""
+    for name in names or list(_proxies):
+        _proxies[name].lazy_get()
+
+
+async def warm_up(*names: str):
+    """Создаёт экземпляры в пуле потоков ввода-вывода, не блокируя цикл событий"""
+    from async_storage import run_io
+    started = time.perf_counter()
+    try:
+        await run_io(preload, *names)
+    except Exception as e:
+        logger.error(f"Ошибка инициализации хранилищ: {e}", exc_info=True)
+        return
+    logger.info("Хранилища готовы за %.0f мс", (time.perf_counter() - started) * 1000)
+
+
+_warm_up_task: Optional[asyncio.Task] = None
+
+
+async def start_warm_up(application) -> None:
+    """Хук post_init для PTB: хранилища создаются в фоне, приём обновлений их не ждёт"""
+    global _warm_up_task
+    _warm_up_task = asyncio.create_task(warm_up())
+
+
+async def stop_warm_up(application) -> None:
+    """Хук post_shutdown для PTB: дожидается прогрева до сброса хранилищ"""
+    global _warm_up_task
+    if _warm_up_task is not None:
+        await asyncio.gather(_warm_up_task, return_exceptions=True)
+        _warm_up_task = None
@@ -0,0 +1,155 @@
+# logging_setup.py
+"""
+Настройка логирования бота.
+
+Записи не пишутся в файл из цикла событий: корневой логгер кладёт их в
+очередь (QueueHandler), а фоновый поток QueueListener форматирует и
+пишет их в файл с ротацией по размеру и в консоль. Сообщение собирается
+(%-форматирование) уже в этом потоке.
+
+LOG_SAMPLING задаёт долю INFO/DEBUG-записей, которые сохраняются для
+отдельных логгеров (с дочерними), например `bot.updates=0.1,start=0.5`
+— по одной записи на каждое обновление писать не обязательно.
+WARNING и выше сохраняются всегда.
+"""
+import os
+import queue
+import atexit
+import random
+import logging
+import logging.handlers
+import multiprocessing.util
+from typing import Dict, Optional
+
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+LOG_FILE = os.getenv('LOG_FILE', 'logs/bot.log')
+LOG_MAX_BYTES = int(os.getenv('LOG_MAX_BYTES', str(10 * 1024 * 1024)))
+LOG_BACKUP_COUNT = int(os.getenv('LOG_BACKUP_COUNT', '5'))
+LOG_SAMPLING = os.getenv('LOG_SAMPLING', '')
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Аргументы этих типов не меняются, поэтому сообщение можно собрать позже, в фоновом потоке
+_IMMUTABLE = (str, int, float, bool, type(None), bytes)
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def parse_sampling(spec: str) -> Dict[str, float]:
+    """'bot.updates=0.1,start=0.5' -> {'bot.updates': 0.1, 'start': 0.5}"""
+    rates = {}
+    for part in spec.split(','):
+        name, sep, rate = part.partition('=')
+        if not sep or not name.strip():
+            continue
+        try:
+            rates[name.strip()] = min(1.0, max(0.0, float(rate)))
+        except ValueError:
+            continue
+    return rates
+
+
+class SamplingFilter(logging.Filter):
+    """Пропускает только долю INFO/DEBUG-записей указанных логгеров"""
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = rates
+        self._cache: Dict[str, float] = {}
+        self.dropped = 0
+
+    def _rate(self, name: str) -> float:
+        rate = self._cache.get(name)
+        if rate is None:
+            # Ближайший настроенный предок: 'handlers' действует на 'handlers.about'
+            rate = 1.0
+            prefix = name
+            while prefix:
+                if prefix in self.rates:
+                    rate = self.rates[prefix]
+                    break
+                prefix = prefix.rpartition('.')[0]
+            self._cache[name] = rate
+        return rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.INFO:
+            return True
+        rate = self._rate(record.name)
+        if rate >= 1.0 or random.random() < rate:
+            return True
+        self.dropped += 1
+        return False
+
+
+class BackgroundQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler, который не форматирует запись в потоке вызова"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        args = record.args
+        if args:
+            values = args.values() if isinstance(args, dict) else args
+            if not all(isinstance(value, _IMMUTABLE) for value in values):
+                # Изменяемый объект может измениться до записи — собираем сообщение сразу
+                record.msg = record.getMessage()
+                record.args = None
+        return record
+
+
+def _log_file() -> str:
+    # Процессы-шарды пишут в свои файлы: ротация одного файла из нескольких процессов небезопасна
+    shard = os.getenv('SHARD_INDEX')
+    if shard is None:
+        return LOG_FILE
+    root, ext = os.path.splitext(LOG_FILE)
+    return f'{root}.shard-{shard}{ext}'
+
+
+def setup_logging(level: str = LOG_LEVEL, log_file: Optional[str] = None,
+                  sampling: str = LOG_SAMPLING) -> logging.handlers.QueueListener:
+    """Корневой логгер -> очередь -> фоновый поток (файл с ротацией + консоль)"""
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    log_file = log_file or _log_file()
+    directory = os.path.dirname(log_file)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    formatter = logging.Formatter(LOG_FORMAT)
+    file_handler = logging.handlers.RotatingFileHandler(
+        log_file, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding='utf-8'
+    )
+    stream_handler = logging.StreamHandler()
+    for handler in (file_handler, stream_handler):
+        handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = BackgroundQueueHandler(log_queue)
+    rates = parse_sampling(sampling)
+    if rates:
+        queue_handler.addFilter(SamplingFilter(rates))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    _listener = logging.handlers.QueueListener(log_queue, file_handler, stream_handler)
+    _listener.start()
+    # Процессы multiprocessing завершаются без atexit — дописываем очередь и там
+    atexit.register(stop_logging)
+    multiprocessing.util.Finalize(None, stop_logging, exitpriority=0)
+    return _listener
+
+
+def stop_logging():
+    """Дописывает записи из очереди и останавливает фоновый поток"""
+    global _listener
+    listener, _listener = _listener, None
+    if listener is not None:
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
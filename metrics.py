@@ -0,0 +1,293 @@
+# metrics.py
+"""
+Метрики бота в формате Prometheus, без внешних зависимостей.
+
+- bot_handler_* — вызовы, ошибки и гистограмма времени каждого
+  обработчика из register_handlers (метки handler и state: диалог и шаг,
+  например registration:REGISTER_EMAIL, или '-' вне диалогов);
+- bot_storage_call_* — вызовы хранилищ через AsyncStorage (storage, method);
+- bot_api_request_* — запросы к Bot API (method, code);
+- bot_send_queue_* и bot_updates_* — состояние очереди исходящих сообщений
+  и обработки обновлений.
+
+Если задан METRICS_PORT, метрики отдаются по http://METRICS_LISTEN:METRICS_PORT/metrics
+(у процессов-шардов порт METRICS_PORT + 1 + номер шарда; на METRICS_PORT
+в режиме шардов — главный процесс с запросами getUpdates / setWebhook).
+
+Модуль не импортирует PTB: его подключает async_storage.py, а значит и все
+хранилища. Обработчики и запросы Bot API замеряет bot_metrics.py.
+"""
+import os
+import asyncio
+import bisect
+import logging
+import threading
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from http_util import HttpError, read_http_request, write_http_response
+
+logger = logging.getLogger(__name__)
+
+METRICS_LISTEN = os.getenv('METRICS_LISTEN', '127.0.0.1')
+# 0 — HTTP-эндпоинт выключен (метрики всё равно собираются)
+METRICS_PORT = int(os.getenv('METRICS_PORT', '0'))
+
+# Границы корзин гистограмм, секунд
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+def _number(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self._values: Dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            lines.append(f'{self.name}{_format_labels(self.label_names, labels)} {_number(value)}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        # метки -> [счётчики корзин (без +Inf), сумма, количество]
+        self._values: Dict[Labels, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * len(self.buckets), 0.0, 0]
+            if index < len(self.buckets):
+                entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            items = sorted((labels, (list(e[0]), e[1], e[2])) for labels, e in self._values.items())
+        for labels, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                le = _format_labels(self.label_names, labels, f'le="{_number(bound)}"')
+                lines.append(f'{self.name}_bucket{le} {cumulative}')
+            le = _format_labels(self.label_names, labels, 'le="+Inf"')
+            lines.append(f'{self.name}_bucket{le} {count}')
+            plain = _format_labels(self.label_names, labels)
+            lines.append(f'{self.name}_sum{plain} {_number(total)}')
+            lines.append(f'{self.name}_count{plain} {count}')
+        return lines
+
+
+class Registry:
+    """Метрики процесса и функции, возвращающие текущие значения (gauge)"""
+
+    def __init__(self):
+        self._metrics: List = []
+        # Функции, возвращающие [(имя, справка, имена меток, {метки: значение}[, 'counter'])];
+        # без пятого элемента значение — gauge, монотонные счётчики помечаются 'counter' (имя *_total)
+        self._collectors: List[Callable] = []
+
+    def counter(self, name: str, help_text: str, label_names: Sequence[str] = ()) -> Counter:
+        metric = Counter(name, help_text, label_names)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help_text: str, label_names: Sequence[str] = ()) -> Histogram:
+        metric = Histogram(name, help_text, label_names)
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable):
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            try:
+                gauges = collector()
+            except Exception as e:
+                logger.warning("Метрики: ошибка сборщика %s: %s", collector.__name__, e)
+                continue
+            for name, help_text, label_names, values, *kind in gauges:
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} {kind[0] if kind else "gauge"}')
+                for labels, value in values.items():
+                    lines.append(f'{name}{_format_labels(label_names, labels)} {_number(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+handler_calls = registry.counter('bot_handler_calls_total', 'Вызовы обработчиков', ('handler', 'state'))
+handler_errors = registry.counter('bot_handler_errors_total', 'Исключения в обработчиках', ('handler', 'state'))
+handler_duration = registry.histogram('bot_handler_duration_seconds', 'Время обработчика', ('handler', 'state'))
+
+storage_errors = registry.counter('bot_storage_call_errors_total', 'Исключения в вызовах хранилищ',
+                                  ('storage', 'method'))
+storage_duration = registry.histogram('bot_storage_call_duration_seconds',
+                                      'Время вызова хранилища в пуле потоков', ('storage', 'method'))
+
+api_responses = registry.counter('bot_api_responses_total', 'Ответы Bot API по кодам', ('method', 'code'))
+api_duration = registry.histogram('bot_api_request_duration_seconds', 'Время запроса к Bot API', ('method',))
+
+
+def observe_storage_call(storage: str, method: str, seconds: float, failed: bool = False):
+    """Вызывается из AsyncStorage для каждого вызова хранилища"""
+    storage_duration.observe(seconds, storage, method)
+    if failed:
+        storage_errors.inc(storage, method)
+
+
+# ===== ОЧЕРЕДИ =====
+
+def _queue_gauges():
+    from send_queue import send_queue, rate_limiter
+    from update_processor import update_processor
+
+    sent = send_queue.metrics()
+    limits = rate_limiter.metrics()
+    updates = update_processor.metrics()
+    gauges = [
+        ('bot_send_queue_depth', 'Сообщений в очереди отправки', ('lane',),
+         {(lane,): depth for lane, depth in sent['queue_depth'].items()}),
+        ('bot_send_queue_in_flight', 'Отправляемых сейчас сообщений', (), {(): sent['in_flight']}),
+        ('bot_send_queue_latency_seconds', 'Задержка отправки (от постановки до ответа API)', ('stat',),
+         {('avg',): sent['latency_avg'], ('p95',): sent['latency_p95']}),
+        ('bot_rate_limiter_waiting', 'Запросов Bot API в ожидании лимита', ('lane',),
+         {(lane,): n for lane, n in limits['waiting'].items()}),
+        ('bot_rate_limiter_rate', 'Общий лимит запросов в секунду', (), {(): limits['rate']}),
+        ('bot_rate_limiter_events_total', 'Счётчики лимитера запросов', ('event',),
+         {(name,): limits[name] for name in ('requests', 'throttled', 'retry_after')}, 'counter'),
+        ('bot_updates_running', 'Выполняемых обновлений', (), {(): updates['running']}),
+        ('bot_updates_waiting', 'Обновлений в ожидании своей очереди', (), {(): updates['waiting']}),
+        ('bot_updates_processed_total', 'Обработано обновлений', (), {(): updates['processed']}, 'counter'),
+        ('bot_updates_wait_seconds', 'Ожидание очереди пользователя', ('stat',),
+         {('avg',): updates['wait_avg'], ('p95',): updates['wait_p95']}),
+    ]
+    counters = {(name,): value for name, value in sent.items() if isinstance(value, (int, float))
+                and name not in ('in_flight', 'latency_avg', 'latency_p95')}
+    if counters:
+        gauges.append(('bot_send_queue_events_total', 'Счётчики очереди отправки', ('event',), counters, 'counter'))
+    return gauges
+
+
+registry.add_collector(_queue_gauges)
+
+
+# ===== HTTP =====
+
+class MetricsServer:
+    """GET /metrics в текстовом формате Prometheus"""
+
+    def __init__(self, listen: str = METRICS_LISTEN, port: int = METRICS_PORT):
+        self.listen = listen
+        self.port = port
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle_connection, self.listen, self.port)
+        if not self.port:
+            self.port = self._server.sockets[0].getsockname()[1]
+        logger.info("Метрики: http://%s:%s/metrics", self.listen, self.port)
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request = await read_http_request(reader)
+            if request is None:
+                return
+            method, path, _, _ = request
+            if path.split('?', 1)[0] != '/metrics':
+                write_http_response(writer, 404, keep_alive=False)
+            elif method != 'GET':
+                write_http_response(writer, 405, keep_alive=False)
+            else:
+                body = registry.render().encode('utf-8')
+                write_http_response(writer, 200, body, content_type='text/plain; version=0.0.4; charset=utf-8',
+                                    keep_alive=False)
+            await writer.drain()
+        except HttpError as e:
+            write_http_response(writer, e.status, keep_alive=False)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+_server: Optional[MetricsServer] = None
+
+
+def _metrics_port() -> int:
+    # Процессы-шарды слушают соседние порты
+    shard = os.getenv('SHARD_INDEX')
+    if not METRICS_PORT or shard is None:
+        return METRICS_PORT
+    return METRICS_PORT + 1 + int(shard)
+
+
+async def start_metrics_server(application) -> None:
+    """Хук post_init для PTB"""
+    global _server
+    port = _metrics_port()
+    if not port:
+        return
+    server = MetricsServer(port=port)
+    try:
+        await server.start()
+    except OSError as e:
+        logger.error(f"Не удалось запустить сервер метрик на порту {port}: {e}")
+        return
+    _server = server
+
+
+async def stop_metrics_server(application) -> None:
+    """Хук post_shutdown для PTB"""
+    global _server
+    if _server is not None:
+        await _server.stop()
+        _server = None
@@ -2,18 +2,32 @@
 """
 Модуль для системы запросов помощи - пользователи могут просить о помощи
 """
-import json
 import os
 import logging
+import threading
 from datetime import datetime
 from telegram import Update, InlineKeyboardMarkup, InlineKeyboardButton
+from telegram.error import BadRequest
 from telegram.ext import ContextTypes
 
+from async_storage import AsyncStorage
+from interprocess import MULTI_PROCESS
+from lazy import LazyProxy
+from request_store import create_request_store
+from search_index import SearchIndex
+from write_behind import synchronized
+from broadcast import notify_category_helpers
+
 logger = logging.getLogger(__name__)
 DATA_DIR = "data"
-os.makedirs(DATA_DIR, exist_ok=True)
 REQUESTS_FILE = os.path.join(DATA_DIR, "help_requests.json")
 
+# Поиск: максимум результатов и размер страницы
+SEARCH_MAX_RESULTS = int(os.getenv("SEARCH_MAX_RESULTS", "50"))
+SEARCH_PAGE_SIZE = int(os.getenv("SEARCH_PAGE_SIZE", "5"))
+# Лента "📋 Активные заявки": заявок в одном сообщении
+FEED_PAGE_SIZE = int(os.getenv("FEED_PAGE_SIZE", "5"))
+
 # Conversation states (должны совпадать со states.py / bot.py)
 REQUEST_CATEGORY = 100
 REQUEST_DESCRIPTION = 101
@@ -21,82 +35,95 @@ REQUEST_BUDGET = 102
 REQUEST_DEADLINE = 103
 REQUEST_CONTACTS = 104
 
-def _load_requests():
-    if not os.path.exists(REQUESTS_FILE):
-        return {}
-    try:
-        with open(REQUESTS_FILE, 'r', encoding='utf-8') as f:
-            raw = json.load(f) or {}
-    except Exception as e:
-        logger.exception("Failed to load requests file")
-        raw = {}
-
-    # Нормализуем ключи: если ключи в формате "req_1", приведём к "1"
-    norm = {}
-    for k, v in raw.items():
-        nk = k
-        if isinstance(k, str) and k.startswith("req_"):
-            nk = k[len("req_"):]
-        norm[str(nk)] = v
-    return norm
-
-def _save_requests(data: dict):
-    try:
-        with open(REQUESTS_FILE, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-    except Exception:
-        logger.exception("Failed to save requests file")
-
 class RequestSystem:
-    def __init__(self):
-        self._data = _load_requests()
+    def __init__(self, store=None, sync_index: bool = MULTI_PROCESS):
+        # Хранилище выбирается настройкой REQUESTS_BACKEND (по умолчанию SQLite)
+        self.store = store or create_request_store(REQUESTS_FILE)
+        # Запись в хранилище и в поисковый индекс — под одной блокировкой (вызовы идут из пула потоков)
+        self._lock = threading.RLock()
+        # Несколько процессов: заявки создают и закрывают и другие шарды, перед поиском
+        # индекс догоняет их изменения по номерам из хранилища (changes_since)
+        self.sync_index = sync_index and hasattr(self.store, 'changes_since')
+        self._index_rev = self.store.last_rev() if self.sync_index else 0
+        # Поисковый индекс строится один раз и дальше обновляется по одной заявке
+        self.search_index = SearchIndex()
+        for r in self.store.iter_active():
+            self._index_request(r)
 
-    def _save(self):
-        _save_requests(self._data)
+    def _index_request(self, r: dict):
+        text = f"{r.get('title', '')} {r.get('description', '')}"
+        self.search_index.add(r['id'], text, r.get('category'))
 
     def get_all_active_requests(self, limit=10):
-        items = list(self._data.values())
-        items = [i for i in items if i.get('status') != 'closed']
-        items.sort(key=lambda x: x.get('created_at',''), reverse=True)
-        return items[:limit]
+        return self.store.list_active(limit)
 
     def get_request_by_id(self, req_id):
         if req_id is None:
             return None
-        rid = str(req_id)
-        if rid.startswith("req_"):
-            rid = rid[len("req_"):]
-        # Try both forms
-        r = self._data.get(rid)
-        if r:
-            return r
-        return self._data.get(f"req_{rid}")
+        return self.store.get(req_id)
+
+    def get_active_requests_page(self, limit: int = FEED_PAGE_SIZE, older_than=None, newer_than=None):
+        """Страница ленты активных заявок; курсор — id крайней заявки соседней страницы"""
+        return self.store.list_active_page(limit, older_than=older_than, newer_than=newer_than)
+
+    def get_user_requests(self, user_id, active_only: bool = False):
+        """Заявки пользователя, сначала новые"""
+        return self.store.list_by_user(user_id, active_only)
 
+    def get_requests_by_category(self, category: str, limit: int = 10):
+        """Активные заявки категории, сначала новые"""
+        return self.store.list_by_category(category, limit)
+
+    @synchronized
     def create_request(self, data: dict):
-        # generate simple numeric id
-        existing = [int(k) for k in self._data.keys() if k.isdigit()]
-        next_id = str(max(existing) + 1 if existing else 1)
-        self._data[next_id] = data
-        self._data[next_id]['id'] = next_id
-        self._data[next_id]['created_at'] = datetime.utcnow().isoformat()
-        self._save()
-        return next_id
+        req_id = self.store.insert(data)
+        if data.get('status') != 'closed':
+            self._index_request(data)
+        return req_id
 
-    def search_requests(self, q: str, category: str = None):
-        q = (q or "").strip().lower()
-        results = []
-        for r in self._data.values():
+    @synchronized
+    def close_request(self, req_id):
+        """Закрывает заявку, возвращает обновлённую запись или None"""
+        r = self.store.get(req_id)
+        if not r:
+            return None
+        updated = self.store.update(req_id, {
+            'status': 'closed',
+            'closed_at': r.get('closed_at') or datetime.utcnow().isoformat()
+        })
+        self.search_index.remove(r['id'])
+        return updated
+
+    @synchronized
+    def refresh_index(self):
+        """Применяет к поисковому индексу изменения заявок из других процессов"""
+        changed, self._index_rev = self.store.changes_since(self._index_rev)
+        for r in changed:
             if r.get('status') == 'closed':
-                continue
-            text = f"{r.get('description','')} {r.get('title','')}".lower()
-            if category and category != "Все" and (r.get('category') or "").lower() != category.lower():
-                continue
-            if not q or q in text:
-                results.append(r)
+                self.search_index.remove(r['id'])
+            else:
+                self._index_request(r)
+
+    def search(self, q: str, category: str = None, page: int = 0, page_size: int = SEARCH_PAGE_SIZE):
+        """Страница результатов поиска: (заявки, всего найдено с учётом лимита)"""
+        if self.sync_index:
+            self.refresh_index()
+        offset = page * page_size
+        if offset >= SEARCH_MAX_RESULTS:
+            return [], 0
+        limit = min(page_size, SEARCH_MAX_RESULTS - offset)
+        ids, total = self.search_index.search(q, category, limit=limit, offset=offset)
+        results = [r for r in (self.store.get(i) for i in ids) if r]
+        return results, min(total, SEARCH_MAX_RESULTS)
+
+    def search_requests(self, q: str, category: str = None):
+        """Найденные активные заявки по релевантности (не больше SEARCH_MAX_RESULTS)"""
+        results, _ = self.search(q, category, page=0, page_size=SEARCH_MAX_RESULTS)
         return results
 
 # Экземпляр для доступа извне
-request_system = RequestSystem()
+request_system = LazyProxy(RequestSystem, 'request_system')
+async_request_system = AsyncStorage(request_system)
 
 def get_request_keyboard(req_id: str, is_owner: bool = False):
     buttons = [[InlineKeyboardButton("📝 Посмотреть", callback_data=f"req_{req_id}_view"),
@@ -142,8 +169,13 @@ async def process_request_contacts(update: Update, context: ContextTypes.DEFAULT
     user = update.effective_user
     req['user_id'] = user.id
     req['username'] = user.username or user.full_name
-    req_id = request_system.create_request(req)
+    req_id = await async_request_system.create_request(req)
     await update.message.reply_text(f"✅ Ваша заявка #{req_id} создана.")
+    try:
+        # Помощники категории получат заявку фоновой рассылкой
+        await notify_category_helpers(req)
+    except Exception:
+        logger.exception("Не удалось запустить рассылку по заявке #%s", req_id)
     context.user_data.pop('new_request', None)
     return -1
 
@@ -152,14 +184,117 @@ async def cancel_request_flow(update: Update, context: ContextTypes.DEFAULT_TYPE
     await update.message.reply_text("Создание заявки отменено.")
     return -1
 
+# Лента активных заявок
+def _format_created(created: str) -> str:
+    try:
+        return datetime.fromisoformat(created).strftime('%d.%m.%Y %H:%M') if created else ''
+    except Exception:
+        return created
+
+def _render_feed_page(requests, has_newer: bool, has_older: bool):
+    """Одно сообщение со страницей заявок и кнопками ◀️/▶️ (курсор — id крайней заявки)"""
+    lines = ["📋 Активные заявки", ""]
+    buttons = []
+    for r in requests:
+        description = r.get('description') or ''
+        lines.append(
+            f"🆔 #{r['id']} · 🎯 {r.get('category', '—')} · 💰 {r.get('budget', 'Не указан')}\n"
+            f"👤 {r.get('username', '—')} · 📅 {_format_created(r.get('created_at', ''))}\n"
+            f"{description[:200]}{'...' if len(description) > 200 else ''}\n"
+        )
+        buttons.append([InlineKeyboardButton(f"📝 Заявка #{r['id']}", callback_data=f"req_{r['id']}_view"),
+                        InlineKeyboardButton("🤝 Откликнуться", callback_data=f"req_{r['id']}_apply")])
+
+    nav = []
+    if has_newer:
+        nav.append(InlineKeyboardButton("◀️", callback_data=f"feed_prev_{requests[0]['id']}"))
+    if has_older:
+        nav.append(InlineKeyboardButton("▶️", callback_data=f"feed_next_{requests[-1]['id']}"))
+    if nav:
+        buttons.append(nav)
+    return "\n".join(lines), InlineKeyboardMarkup(buttons)
+
+async def get_feed_page(older_than=None, newer_than=None):
+    """Текст и клавиатура страницы ленты или None, если заявок нет"""
+    # Одна лишняя заявка показывает, есть ли следующая страница в эту сторону
+    requests = await async_request_system.get_active_requests_page(
+        FEED_PAGE_SIZE + 1, older_than=older_than, newer_than=newer_than)
+    more = len(requests) > FEED_PAGE_SIZE
+    if newer_than is not None:
+        requests = requests[-FEED_PAGE_SIZE:]
+        has_newer, has_older = more, True
+    else:
+        requests = requests[:FEED_PAGE_SIZE]
+        has_newer, has_older = older_than is not None, more
+    if not requests:
+        return None
+    return _render_feed_page(requests, has_newer, has_older)
+
+async def handle_feed_page(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Перелистывание ленты (callback feed_next_<id> / feed_prev_<id>) правкой сообщения"""
+    query = update.callback_query
+    _, direction, rid = query.data.split("_")
+    if direction == "next":
+        page = await get_feed_page(older_than=rid)
+    else:
+        page = await get_feed_page(newer_than=rid)
+    if page is None:
+        # Соседние заявки успели закрыть — показываем начало ленты
+        page = await get_feed_page()
+    await query.answer()
+    if page is None:
+        await query.edit_message_text("📭 Пока нет активных заявок.")
+        return
+    text, markup = page
+    try:
+        await query.edit_message_text(text, reply_markup=markup)
+    except BadRequest:
+        # Повторное нажатие: страница уже показана
+        pass
+
 # Поиск
+def _render_search_page(results, total: int, page: int):
+    """Текст и клавиатура страницы результатов поиска"""
+    pages = (total + SEARCH_PAGE_SIZE - 1) // SEARCH_PAGE_SIZE
+    lines = [f"🔍 Найдено заявок: {total} (стр. {page + 1}/{pages})", ""]
+    buttons = []
+    for r in results:
+        lines.append(f"#{r['id']} — {r.get('description','')} ({r.get('category','-')}) — {r.get('budget','-')}")
+        buttons.append([InlineKeyboardButton(f"📝 Заявка #{r['id']}", callback_data=f"req_{r['id']}_view")])
+
+    nav = []
+    if page > 0:
+        nav.append(InlineKeyboardButton("◀️", callback_data=f"reqsearch_{page - 1}"))
+    if page + 1 < pages:
+        nav.append(InlineKeyboardButton("▶️", callback_data=f"reqsearch_{page + 1}"))
+    if nav:
+        buttons.append(nav)
+    return "\n".join(lines), InlineKeyboardMarkup(buttons)
+
 async def search_requests(update: Update, context: ContextTypes.DEFAULT_TYPE):
     q = (update.message.text or "").strip()
-    results = request_system.search_requests(q)
+    results, total = await async_request_system.search(q, page=0)
     if not results:
         await update.message.reply_text("По вашему запросу ничего не найдено.")
         return -1
-    for r in results:
-        txt = f"#{r['id']} — {r.get('description','')} ({r.get('category','-')}) — {r.get('budget','-')}"
-        await update.message.reply_text(txt, reply_markup=get_request_keyboard(r['id'], is_owner=False))
+    # Запрос запоминаем для перелистывания страниц
+    context.user_data['request_search_query'] = q
+    text, markup = _render_search_page(results, total, 0)
+    await update.message.reply_text(text, reply_markup=markup)
     return -1
+
+async def handle_search_page(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Перелистывание результатов поиска (callback reqsearch_<page>)"""
+    query = update.callback_query
+    q = context.user_data.get('request_search_query')
+    if q is None:
+        await query.answer("Поиск устарел, повторите запрос")
+        return
+    page = int(query.data.split("_")[1])
+    results, total = await async_request_system.search(q, page=page)
+    await query.answer()
+    if not results:
+        await query.edit_message_text("По вашему запросу ничего не найдено.")
+        return
+    text, markup = _render_search_page(results, total, page)
+    await query.edit_message_text(text, reply_markup=markup)
@@ -0,0 +1,269 @@
+# offer_store.py
+"""
+Хранилища предложений помощи.
+
+Раньше предложения жили в двух файлах: data/offers.json (handlers/offer_help)
+и data/help_offers.json (HelpSystem из удалённого offer_help.py). Теперь это одно хранилище
+с тем же выбором движка, что и у заявок: SQLite (по умолчанию) или JSON.
+При первом запуске записи из обоих файлов переносятся в выбранный движок.
+"""
+import os
+import json
+import heapq
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from db_pool import get_pool
+from write_behind import mark_dirty_json, synchronized, atomic_write_text, dump_json
+from id_sequence import get_sequence
+from request_store import STORAGE_BACKEND, STORAGE_DB_PATH, normalize_category
+
+logger = logging.getLogger(__name__)
+
+OFFERS_BACKEND = os.getenv('OFFERS_BACKEND', STORAGE_BACKEND).lower()
+OFFERS_FILE = os.path.join('data', 'offers.json')
+# Файл старого HelpSystem, переносится один раз
+LEGACY_HELP_OFFERS_FILE = os.path.join('data', 'help_offers.json')
+
+
+def offer_is_active(offer: dict) -> bool:
+    return offer.get('status', 'active') == 'active' and offer.get('is_active', True)
+
+
+def offer_rating(offer: dict) -> float:
+    try:
+        return float(offer.get('rating') or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _rank_key(offer: dict):
+    # Сначала с высоким рейтингом, при равном — более новые
+    return offer_rating(offer), offer.get('created_at') or ''
+
+
+def _load_list(path: str) -> List[dict]:
+    if not os.path.exists(path):
+        return []
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            items = json.load(f) or []
+    except Exception:
+        logger.exception("Не удалось прочитать %s", path)
+        return []
+    return [item for item in items if isinstance(item, dict)] if isinstance(items, list) else []
+
+
+class JsonOfferStore:
+    """Предложения в data/offers.json (список) с индексами в памяти"""
+
+    def __init__(self, path: str = OFFERS_FILE, legacy_path: Optional[str] = LEGACY_HELP_OFFERS_FILE):
+        self.path = path
+        self._lock = threading.RLock()
+        self._offers = _load_list(path)
+        self._ids = get_sequence('offers', seed=lambda: max(
+            (o.get('id', 0) for o in self._offers), default=0))
+        self._by_id: Dict[int, dict] = {}
+        self._by_user: Dict[str, List[dict]] = {}
+        self._by_category: Dict[str, List[dict]] = {}
+        for offer in self._offers:
+            self._index(offer)
+        if legacy_path and os.path.exists(legacy_path):
+            self._import_legacy(legacy_path)
+
+    def _index(self, offer: dict):
+        self._by_id[offer['id']] = offer
+        self._by_user.setdefault(str(offer.get('user_id')), []).append(offer)
+        self._by_category.setdefault(normalize_category(offer.get('category')), []).append(offer)
+
+    def _save(self):
+        mark_dirty_json(self.path, self._offers, self._lock)
+
+    def _import_legacy(self, legacy_path: str):
+        """Переносит предложения HelpSystem с новыми id и убирает старый файл"""
+        items = _load_list(legacy_path)
+        with self._lock:
+            # Перенос мог прерваться до переименования файла — уже перенесённые пропускаем
+            imported = {o.get('legacy_id') for o in self._offers if o.get('legacy_id') is not None}
+            added = 0
+            for item in items:
+                if item.get('id') is not None and item.get('id') in imported:
+                    continue
+                item = dict(item)
+                item['legacy_id'] = item.get('id')
+                self._append(item, keep_created_at=True)
+                added += 1
+            if added:
+                # Старый файл убираем только после того, как offers.json точно записан:
+                # отложенная запись (write_behind) могла бы не успеть до сбоя
+                try:
+                    atomic_write_text(self.path, dump_json(self._offers))
+                except OSError:
+                    logger.exception("Не удалось записать %s, %s оставлен для повторного переноса",
+                                     self.path, legacy_path)
+                    return
+        os.replace(legacy_path, legacy_path + '.migrated')
+        logger.info("Перенесено %s предложений из %s", added, legacy_path)
+
+    def _append(self, data: dict, keep_created_at: bool = False) -> dict:
+        data['id'] = self._ids.next_id()
+        if not (keep_created_at and data.get('created_at')):
+            data['created_at'] = datetime.now().isoformat()
+        data.setdefault('status', 'active')
+        self._offers.append(data)
+        self._index(data)
+        return data
+
+    @synchronized
+    def insert(self, data: Dict[str, Any]) -> dict:
+        offer = self._append(data)
+        self._save()
+        return offer
+
+    @synchronized
+    def get(self, offer_id) -> Optional[dict]:
+        try:
+            return self._by_id.get(int(offer_id))
+        except (TypeError, ValueError):
+            return None
+
+    @synchronized
+    def list_by_user(self, user_id) -> List[dict]:
+        return list(self._by_user.get(str(user_id), []))
+
+    @synchronized
+    def list_by_category(self, category: str, limit: int = 10) -> List[dict]:
+        """Активные предложения категории: по рейтингу, при равном — сначала новые"""
+        offers = (o for o in self._by_category.get(normalize_category(category), []) if offer_is_active(o))
+        return heapq.nlargest(limit, offers, key=_rank_key)
+
+    @synchronized
+    def list_user_ids_by_category(self, category: str, after_id: int = 0, limit: int = 1000) -> List[int]:
+        """Авторы активных предложений категории (по возрастанию id, после after_id)"""
+        ids = set()
+        for offer in self._by_category.get(normalize_category(category), []):
+            user_id = offer.get('user_id')
+            if offer_is_active(offer) and isinstance(user_id, int) and user_id > after_id:
+                ids.add(user_id)
+        return sorted(ids)[:limit]
+
+
+class SQLiteOfferStore:
+    """Предложения в таблице SQLite (одна строка на предложение)"""
+
+    TABLE = 'help_offers'
+
+    def __init__(self, db_path: str, legacy_paths: Optional[List[str]] = None):
+        self.pool = get_pool(db_path)
+        self._init_table()
+        self._import_legacy(legacy_paths or [])
+
+    def _init_table(self):
+        conn = self.pool.get_connection()
+        with conn:
+            conn.execute(f'''
+                CREATE TABLE IF NOT EXISTS {self.TABLE} (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id INTEGER,
+                    category TEXT,
+                    status TEXT NOT NULL DEFAULT 'active',
+                    rating REAL NOT NULL DEFAULT 0,
+                    created_at TEXT NOT NULL,
+                    data TEXT NOT NULL
+                )
+            ''')
+            columns = {row['name'] for row in conn.execute(f'PRAGMA table_info({self.TABLE})')}
+            if 'rating' not in columns:
+                conn.execute(f'ALTER TABLE {self.TABLE} ADD COLUMN rating REAL NOT NULL DEFAULT 0')
+                conn.execute(f"UPDATE {self.TABLE} SET rating = COALESCE(json_extract(data, '$.rating'), 0)")
+            conn.execute(f'CREATE INDEX IF NOT EXISTS idx_offers_user ON {self.TABLE}(user_id, created_at)')
+            conn.execute(f'CREATE INDEX IF NOT EXISTS idx_offers_category ON {self.TABLE}(category, status, created_at)')
+            # Выдача категории упорядочена по рейтингу (list_by_category)
+            conn.execute(f'CREATE INDEX IF NOT EXISTS idx_offers_category_rating '
+                         f'ON {self.TABLE}(category, status, rating, created_at)')
+
+    def _import_legacy(self, paths: List[str]):
+        """Однократно переносит предложения из JSON-файлов в пустую таблицу"""
+        conn = self.pool.get_connection()
+        if conn.execute(f'SELECT 1 FROM {self.TABLE} LIMIT 1').fetchone():
+            return
+        rows = []
+        for path in paths:
+            for item in _load_list(path):
+                item = dict(item)
+                item['legacy_id'] = item.pop('id', None)
+                item.setdefault('created_at', datetime.now().isoformat())
+                status = 'active' if offer_is_active(item) else 'inactive'
+                rows.append((item.get('user_id'), normalize_category(item.get('category')), status,
+                             offer_rating(item), item['created_at'], json.dumps(item, ensure_ascii=False)))
+        if not rows:
+            return
+        with conn:
+            conn.executemany(
+                f'INSERT INTO {self.TABLE} (user_id, category, status, rating, created_at, data) '
+                f'VALUES (?, ?, ?, ?, ?, ?)', rows
+            )
+        logger.info("Перенесено %s предложений в SQLite", len(rows))
+
+    @staticmethod
+    def _row_to_offer(row) -> dict:
+        offer = json.loads(row['data'])
+        offer['id'] = row['id']
+        return offer
+
+    def insert(self, data: Dict[str, Any]) -> dict:
+        data['created_at'] = datetime.now().isoformat()
+        data.setdefault('status', 'active')
+        conn = self.pool.get_connection()
+        with conn:
+            cur = conn.execute(
+                f'INSERT INTO {self.TABLE} (user_id, category, status, rating, created_at, data) '
+                f'VALUES (?, ?, ?, ?, ?, ?)',
+                (data.get('user_id'), normalize_category(data.get('category')),
+                 'active' if offer_is_active(data) else 'inactive', offer_rating(data),
+                 data['created_at'], json.dumps(data, ensure_ascii=False))
+            )
+        data['id'] = cur.lastrowid
+        return data
+
+    def get(self, offer_id) -> Optional[dict]:
+        try:
+            offer_id = int(offer_id)
+        except (TypeError, ValueError):
+            return None
+        row = self.pool.get_connection().execute(
+            f'SELECT id, data FROM {self.TABLE} WHERE id = ?', (offer_id,)
+        ).fetchone()
+        return self._row_to_offer(row) if row else None
+
+    def list_by_user(self, user_id) -> List[dict]:
+        rows = self.pool.get_connection().execute(
+            f'SELECT id, data FROM {self.TABLE} WHERE user_id = ? ORDER BY created_at', (user_id,)
+        ).fetchall()
+        return [self._row_to_offer(row) for row in rows]
+
+    def list_by_category(self, category: str, limit: int = 10) -> List[dict]:
+        """Активные предложения категории: по рейтингу, при равном — сначала новые"""
+        rows = self.pool.get_connection().execute(
+            f"SELECT id, data FROM {self.TABLE} WHERE category = ? AND status = 'active' "
+            f"ORDER BY rating DESC, created_at DESC LIMIT ?", (normalize_category(category), limit)
+        ).fetchall()
+        return [self._row_to_offer(row) for row in rows]
+
+    def list_user_ids_by_category(self, category: str, after_id: int = 0, limit: int = 1000) -> List[int]:
+        """Авторы активных предложений категории (по возрастанию id, после after_id)"""
+        rows = self.pool.get_connection().execute(
+            f"SELECT DISTINCT user_id FROM {self.TABLE} WHERE category = ? AND status = 'active' "
+            f"AND user_id > ? ORDER BY user_id LIMIT ?", (normalize_category(category), after_id, limit)
+        ).fetchall()
+        return [row['user_id'] for row in rows]
+
+
+def create_offer_store(backend: Optional[str] = None):
+    """Создаёт хранилище предложений по настройке OFFERS_BACKEND (sqlite | json)"""
+    backend = (backend or OFFERS_BACKEND).lower()
+    if backend == 'json':
+        return JsonOfferStore()
+    return SQLiteOfferStore(STORAGE_DB_PATH, legacy_paths=[OFFERS_FILE, LEGACY_HELP_OFFERS_FILE])
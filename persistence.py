@@ -0,0 +1,269 @@
+# persistence.py
+"""
+Сохранение user_data и состояний ConversationHandler в SQLite.
+
+Раньше черновики регистрации, заявок и предложений (context.user_data)
+и шаг диалога жили только в памяти и терялись при перезапуске.
+SQLitePersistence хранит их в таблице user_sessions (database_utils):
+
+- user_data — строка (name='user_data', session_key=user_id);
+- состояние диалога — строка (name='conversation:<имя>', session_key=ключ).
+
+PTB раз в PERSISTENCE_FLUSH_INTERVAL секунд передаёт только изменённые
+ключи; они пишутся одной транзакцией, без пересохранения всего остального.
+При остановке (Application.shutdown) несохранённое дописывается, поэтому
+после перезапуска пользователь продолжает диалог с того же шага.
+
+Секреты (хэши паролей, SMS-коды — SESSION_SECRET_KEYS) в таблицу не пишутся:
+они остаются только в памяти, после перезапуска код нужно запросить заново.
+
+Записи живут SESSION_LIFETIME часов с последнего изменения: при запуске
+загружаются только неистёкшие, а start_session_cleanup раз в час удаляет
+истёкшие строки и выгружает из памяти user_data давно неактивных пользователей.
+
+    Application.builder().persistence(session_persistence)
+"""
+import os
+import json
+import time
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+
+from telegram.ext import BasePersistence, PersistenceInput
+
+from async_storage import run_io
+from database_utils import db_manager
+from interprocess import SHARD_INDEX, SHARD_WORKERS
+
+logger = logging.getLogger(__name__)
+
+PERSISTENCE_FLUSH_INTERVAL = float(os.getenv('PERSISTENCE_FLUSH_INTERVAL', '10'))
+SESSION_LIFETIME = float(os.getenv('SESSION_LIFETIME', '24'))
+# Как часто удалять истёкшие сессии, секунд
+SESSION_CLEANUP_INTERVAL = 3600
+
+USER_DATA = 'user_data'
+_CONVERSATION_PREFIX = 'conversation:'
+# Ключи user_data (на любом уровне вложенности), которые не сохраняются
+SESSION_SECRET_KEYS = frozenset({'password', 'password_hash', 'sms_code'})
+
+
+def _dumps(value: Any) -> str:
+    # Значения, которых нет в JSON, сохраняются строкой
+    return json.dumps(value, ensure_ascii=False, default=str)
+
+
+def strip_secrets(value: Any) -> Any:
+    """Копия value без ключей SESSION_SECRET_KEYS во вложенных словарях"""
+    if isinstance(value, dict):
+        return {k: strip_secrets(v) for k, v in value.items() if k not in SESSION_SECRET_KEYS}
+    if isinstance(value, (list, tuple)):
+        return [strip_secrets(v) for v in value]
+    return value
+
+
+def _own_shard(user_id: int) -> bool:
+    """Пользователь обслуживается этим процессом (см. sharding.shard_for)"""
+    return SHARD_WORKERS <= 1 or abs(user_id) % SHARD_WORKERS == SHARD_INDEX
+
+
+class SQLitePersistence(BasePersistence):
+    """BasePersistence на таблице user_sessions: user_data и состояния диалогов"""
+
+    def __init__(self, db=db_manager, update_interval: float = PERSISTENCE_FLUSH_INTERVAL,
+                 lifetime_hours: float = SESSION_LIFETIME):
+        super().__init__(
+            store_data=PersistenceInput(bot_data=False, chat_data=False, user_data=True, callback_data=False),
+            update_interval=update_interval,
+        )
+        self.db = db
+        self.lifetime = timedelta(hours=lifetime_hours)
+        # (name, session_key) -> строка для записи или None (удалить)
+        self._pending: Dict[Tuple[str, str], Optional[tuple]] = {}
+        self._writer: Optional[asyncio.Future] = None
+        # Последнее изменение user_data (monotonic) — для выгрузки неактивных
+        self._last_seen: Dict[int, float] = {}
+        self.written = 0
+
+    # ===== ЗАГРУЗКА =====
+
+    async def get_user_data(self) -> Dict[int, Dict[Any, Any]]:
+        await run_io(self.db.purge_expired_sessions)
+        rows = await run_io(self.db.load_sessions, USER_DATA)
+        now = time.monotonic()
+        result = {}
+        for row in rows:
+            user_id = int(row['session_key'])
+            if not _own_shard(user_id):
+                continue
+            try:
+                # Записи, сохранённые до появления фильтра, тоже без секретов
+                result[user_id] = strip_secrets(json.loads(row['data'] or '{}'))
+            except ValueError:
+                logger.warning("Повреждённые user_data пользователя %s пропущены", user_id)
+                continue
+            self._last_seen[user_id] = now
+        logger.info("Загружены user_data: %s пользователей", len(result))
+        return result
+
+    async def get_conversations(self, name: str) -> Dict[tuple, object]:
+        rows = await run_io(self.db.load_sessions, _CONVERSATION_PREFIX + name)
+        result = {}
+        for row in rows:
+            try:
+                key = tuple(json.loads(row['session_key']))
+                state = json.loads(row['state'])
+            except (ValueError, TypeError):
+                continue
+            if key and isinstance(key[-1], int) and not _own_shard(key[-1]):
+                continue
+            result[key] = state
+        if result:
+            logger.info("Диалог %s: восстановлено %s состояний", name, len(result))
+        return result
+
+    async def get_chat_data(self) -> Dict[int, Dict[Any, Any]]:
+        return {}
+
+    async def get_bot_data(self) -> Dict[Any, Any]:
+        return {}
+
+    async def get_callback_data(self):
+        return None
+
+    # ===== ИЗМЕНЕНИЯ =====
+
+    def _expires_at(self) -> str:
+        return (datetime.now() + self.lifetime).isoformat()
+
+    async def update_user_data(self, user_id: int, data: Dict) -> None:
+        self._last_seen[user_id] = time.monotonic()
+        self._pending[(USER_DATA, str(user_id))] = (
+            USER_DATA, str(user_id), user_id, None, _dumps(strip_secrets(data)), self._expires_at()
+        )
+        await self._schedule_write()
+
+    async def drop_user_data(self, user_id: int) -> None:
+        self._last_seen.pop(user_id, None)
+        self._pending[(USER_DATA, str(user_id))] = None
+        await self._schedule_write()
+
+    async def update_conversation(self, name: str, key: tuple, new_state: Optional[object]) -> None:
+        section = _CONVERSATION_PREFIX + name
+        session_key = json.dumps(list(key))
+        if new_state is None:
+            # Диалог завершён
+            self._pending[(section, session_key)] = None
+        else:
+            user_id = key[-1] if key and isinstance(key[-1], int) else None
+            self._pending[(section, session_key)] = (
+                section, session_key, user_id, _dumps(new_state), '{}', self._expires_at()
+            )
+        await self._schedule_write()
+
+    async def update_chat_data(self, chat_id: int, data: Dict) -> None:
+        pass
+
+    async def update_bot_data(self, data: Dict) -> None:
+        pass
+
+    async def update_callback_data(self, data) -> None:
+        pass
+
+    async def drop_chat_data(self, chat_id: int) -> None:
+        pass
+
+    async def refresh_user_data(self, user_id: int, user_data: Dict) -> None:
+        pass
+
+    async def refresh_chat_data(self, chat_id: int, chat_data: Dict) -> None:
+        pass
+
+    async def refresh_bot_data(self, bot_data: Dict) -> None:
+        pass
+
+    # ===== ЗАПИСЬ =====
+
+    async def _schedule_write(self):
+        """
+        PTB вызывает update_* для всех изменённых ключей одновременно (gather):
+        они только складываются в _pending, а пишет их одна общая задача.
+        """
+        if self._writer is None or self._writer.done():
+            self._writer = asyncio.ensure_future(self._write_pending())
+        await asyncio.shield(self._writer)
+
+    async def _write_pending(self):
+        # Даём остальным update_* из того же цикла сохранения добавить свои ключи
+        await asyncio.sleep(0)
+        while self._pending:
+            batch, self._pending = self._pending, {}
+            upserts = [row for row in batch.values() if row is not None]
+            deletes = [key for key, row in batch.items() if row is None]
+            try:
+                await run_io(self.db.save_sessions, upserts, deletes)
+            except Exception as e:
+                logger.error(f"Не удалось сохранить сессии ({len(batch)} ключей): {e}")
+                # Повторим в следующий раз; более новые значения не затираем
+                for key, row in batch.items():
+                    self._pending.setdefault(key, row)
+                return
+            self.written += len(batch)
+            logger.debug("Сохранено ключей сессий: %s", len(batch))
+
+    async def flush(self) -> None:
+        """Дописывает несохранённое (вызывается в Application.shutdown)"""
+        if self._writer is not None and not self._writer.done():
+            await asyncio.shield(self._writer)
+        if self._pending:
+            await self._write_pending()
+        if self._pending:
+            logger.error("При остановке не сохранено ключей сессий: %s", len(self._pending))
+
+    # ===== ОЧИСТКА =====
+
+    def idle_users(self) -> list:
+        """Пользователи, чьи user_data не менялись дольше SESSION_LIFETIME"""
+        deadline = time.monotonic() - self.lifetime.total_seconds()
+        return [user_id for user_id, seen in self._last_seen.items() if seen < deadline]
+
+    async def cleanup(self, application) -> None:
+        for user_id in self.idle_users():
+            # Строка в БД удаляется в следующем цикле сохранения
+            application.drop_user_data(user_id)
+            self._last_seen.pop(user_id, None)
+        removed = await run_io(self.db.purge_expired_sessions)
+        if removed:
+            logger.info("Удалено истёкших сессий: %s", removed)
+
+
+session_persistence = SQLitePersistence()
+
+_cleanup_task: Optional[asyncio.Task] = None
+
+
+async def _cleanup_loop(application):
+    while True:
+        await asyncio.sleep(SESSION_CLEANUP_INTERVAL)
+        try:
+            await session_persistence.cleanup(application)
+        except Exception as e:
+            logger.error(f"Ошибка очистки сессий: {e}", exc_info=True)
+
+
+async def start_session_cleanup(application) -> None:
+    """Хук post_init для PTB"""
+    global _cleanup_task
+    if application.persistence is session_persistence:
+        _cleanup_task = asyncio.create_task(_cleanup_loop(application))
+
+
+async def stop_session_cleanup(application) -> None:
+    """Хук post_shutdown для PTB"""
+    global _cleanup_task
+    if _cleanup_task is not None:
+        _cleanup_task.cancel()
+        await asyncio.gather(_cleanup_task, return_exceptions=True)
+        _cleanup_task = None
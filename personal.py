@@ -5,6 +5,7 @@
 import json
 import os
 import logging
+import threading
 from datetime import datetime
 from typing import Dict, Any, Optional
 
@@ -12,42 +13,19 @@ from telegram import Update, InlineKeyboardMarkup, InlineKeyboardButton
 from telegram.ext import ContextTypes
 
 from keyboards import get_profile_keyboard, get_main_menu_keyboard
+from repository import async_repo
+from write_behind import mark_dirty_json
 from states import EDIT_NAME, EDIT_AGE, EDIT_EMAIL, EDIT_PHONE  # импортируем состояния
 
 logger = logging.getLogger(__name__)
 
-def _read_user_from_file(telegram_id: str) -> Optional[dict]:
-    users_path = os.path.join("data", "users.json")
-    if not os.path.exists(users_path):
-        return None
-    try:
-        with open(users_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        return data.get(str(telegram_id))
-    except Exception:
-        return None
-
-def _save_user_to_file(telegram_id: str, user_data: dict):
-    users_path = os.path.join("data", "users.json")
-    os.makedirs(os.path.dirname(users_path), exist_ok=True)
-    try:
-        existing = {}
-        if os.path.exists(users_path):
-            with open(users_path, 'r', encoding='utf-8') as f:
-                txt = f.read().strip()
-                existing = json.loads(txt) if txt else {}
-        existing[str(telegram_id)] = user_data
-        with open(users_path, 'w', encoding='utf-8') as f:
-            json.dump(existing, f, ensure_ascii=False, indent=2)
-    except Exception as e:
-        logger.error(f"Ошибка записи профиля в файл: {e}", exc_info=True)
-
 class UserProfile:
     """Класс для управления профилем пользователя"""
     
     def __init__(self, user_id: int):
         self.user_id = user_id
         self.data_file = f"data/users/{user_id}.json"
+        self._lock = threading.RLock()
         self.profile = self._load_profile()
     
     def _load_profile(self) -> Dict[str, Any]:
@@ -79,19 +57,19 @@ class UserProfile:
         return default_profile
     
     def _save_profile(self, profile: Dict[str, Any]) -> None:
-        """Сохраняет профиль пользователя в файл"""
-        with open(self.data_file, 'w', encoding='utf-8') as f:
-            json.dump(profile, f, ensure_ascii=False, indent=2)
+        """Сохраняет профиль пользователя в файл (отложенно, через write_behind)"""
+        mark_dirty_json(self.data_file, profile, self._lock)
     
     def update_field(self, field: str, value: Any) -> None:
         """Обновляет поле в профиле"""
-        if field in self.profile:
-            self.profile[field] = value
-        elif field in self.profile.get('settings', {}):
-            self.profile['settings'][field] = value
-        
-        self.profile['last_active'] = datetime.now().isoformat()
-        self._save_profile(self.profile)
+        with self._lock:
+            if field in self.profile:
+                self.profile[field] = value
+            elif field in self.profile.get('settings', {}):
+                self.profile['settings'][field] = value
+            
+            self.profile['last_active'] = datetime.now().isoformat()
+            self._save_profile(self.profile)
     
     def get_profile_text(self) -> str:
         """Возвращает текстовое представление профиля"""
@@ -138,22 +116,12 @@ class UserProfile:
 
 # Обработчики команд
 async def show_profile(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Показывает личный кабинет — берёт данные из DB или файла"""
+    """Показывает личный кабинет"""
     user = update.effective_user
     if not user:
         return
 
-    telegram_id = str(user.id)
-    user_data = None
-    try:
-        from database import db
-        if hasattr(db, "get_user_by_telegram_id"):
-            user_data = db.get_user_by_telegram_id(int(telegram_id))
-    except Exception:
-        user_data = None
-
-    if not user_data:
-        user_data = _read_user_from_file(telegram_id) or {}
+    user_data = await async_repo.users.get(user.id) or {}
 
     profile_text = (
         f"👤 Личный кабинет\n\n"
@@ -183,18 +151,8 @@ async def handle_profile_callback(update: Update, context: ContextTypes.DEFAULT_
         context.user_data['edit_field'] = 'full_name'
         return EDIT_NAME
     elif action == "profile_stats":
-        user = update.effective_user
-        telegram_id = str(user.id)
         # Получаем профиль и показываем статистику
-        user_data = None
-        try:
-            from database import db
-            if hasattr(db, "get_user_by_telegram_id"):
-                user_data = db.get_user_by_telegram_id(int(telegram_id))
-        except Exception:
-            user_data = None
-        if not user_data:
-            user_data = _read_user_from_file(telegram_id) or {}
+        user_data = await async_repo.users.get(update.effective_user.id) or {}
 
         stats_text = (
             f"📊 Статистика профиля\n\n"
@@ -219,25 +177,14 @@ async def save_edited_field(update: Update, context: ContextTypes.DEFAULT_TYPE):
     # вытянуть редактируемое поле
     field = context.user_data.get('edit_field', 'full_name')
 
-    # подготовить сохранение
-    try:
-        from database import db
-        if hasattr(db, "create_or_update_user"):
-            # получаем существующие данные для обновления
-            existing = db.get_user_by_telegram_id(int(telegram_id)) or {}
-            existing[field] = text
-            db.create_or_update_user(existing)
-            await update.message.reply_text("✅ Данные обновлены.", reply_markup=get_main_menu_keyboard())
-            context.user_data.pop('edit_field', None)
-            return -1
-    except Exception:
-        # fallback к файлу
-        user_data = _read_user_from_file(telegram_id) or {}
-        user_data[field] = text
-        _save_user_to_file(telegram_id, user_data)
+    # одна запись через репозиторий: чтение и сохранение в одном вызове
+    if await async_repo.users.update_fields(telegram_id, **{field: text}) is None:
+        await update.message.reply_text("❌ Не удалось сохранить изменения. Попробуйте позже.",
+                                        reply_markup=get_main_menu_keyboard())
+    else:
         await update.message.reply_text("✅ Данные обновлены.", reply_markup=get_main_menu_keyboard())
-        context.user_data.pop('edit_field', None)
-        return -1
+    context.user_data.pop('edit_field', None)
+    return -1
 
 async def cancel_edit(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Отмена редактирования (через /cancel)"""
@@ -5,11 +5,63 @@
 import json
 import os
 import math
+import threading
+import bisect
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple, Any
 from telegram import Update, InlineKeyboardMarkup, InlineKeyboardButton, ReplyKeyboardMarkup, KeyboardButton
 from telegram.ext import ContextTypes
 
+from async_storage import AsyncStorage
+from lazy import LazyProxy
+from write_behind import mark_dirty_json
+from interprocess import SharedFiles, cross_process
+from id_sequence import get_sequence
+
+# Минимальное количество отзывов для попадания в топ
+TOP_MIN_REVIEWS = 3
+
+
+def _newest_first(items: List[Dict], limit: int) -> List[Dict]:
+    """Последние limit элементов списка в обратном порядке"""
+    return items[-limit:][::-1] if limit > 0 else []
+
+
+class Leaderboard:
+    """
+    Таблица лидеров, отсортированная по total_score (по убыванию).
+    Позиция ищется через bisect, топ читается срезом без пересчёта.
+    """
+
+    def __init__(self):
+        self._keys: List[Tuple[float, int]] = []  # (-total_score, user_id)
+        self._entries: Dict[int, Dict] = {}
+
+    def _remove_key(self, user_id: int):
+        entry = self._entries.pop(user_id, None)
+        if entry is None:
+            return
+        key = (-entry['total_score'], user_id)
+        i = bisect.bisect_left(self._keys, key)
+        if i < len(self._keys) and self._keys[i] == key:
+            del self._keys[i]
+
+    def upsert(self, entry: Dict):
+        user_id = entry['user_id']
+        self._remove_key(user_id)
+        self._entries[user_id] = entry
+        bisect.insort(self._keys, (-entry['total_score'], user_id))
+
+    def remove(self, user_id: int):
+        self._remove_key(user_id)
+
+    def top(self, limit: int) -> List[Dict]:
+        return [dict(self._entries[user_id]) for _, user_id in self._keys[:limit]]
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+
 class RatingSystem:
     """Система рейтингов и отзывов"""
     
@@ -18,6 +70,26 @@ class RatingSystem:
         self.reviews_file = "data/user_reviews.json"
         self.stats_file = "data/user_stats.json"
         self._init_data_files()
+        # Данные держим в памяти, файлы переписываются отложенно (write_behind)
+        self._lock = threading.RLock()
+        self._ratings = self._load(self.ratings_file)
+        self._reviews = self._load(self.reviews_file)
+        self._stats = self._load(self.stats_file)
+        self._review_ids = get_sequence('user_reviews', seed=lambda: max(
+            (int(k) for k in self._reviews if str(k).isdigit()), default=0))
+        # Шарды: файлы могут изменить другие процессы
+        self._shared = SharedFiles([self.ratings_file, self.reviews_file, self.stats_file],
+                                   self._reload, "data/user_ratings.lock")
+        self._build_leaderboard()
+        self._build_review_indexes()
+    
+    def _reload(self, changed: List[str]):
+        """Перечитывает данные, изменённые другим процессом"""
+        self._ratings = self._load(self.ratings_file)
+        self._reviews = self._load(self.reviews_file)
+        self._stats = self._load(self.stats_file)
+        self._build_leaderboard()
+        self._build_review_indexes()
     
     def _init_data_files(self):
         """Инициализирует файлы данных"""
@@ -28,10 +100,65 @@ class RatingSystem:
                 with open(file_path, 'w', encoding='utf-8') as f:
                     json.dump({}, f, ensure_ascii=False)
     
+    @staticmethod
+    def _load(file_path: str) -> Dict:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    
+    def _mark_dirty(self, file_path: str, data: Dict):
+        mark_dirty_json(file_path, data, self._lock)
+    
+    def _build_review_indexes(self):
+        """Отзывы по получателю и по автору, от старых к новым"""
+        self._reviews_about: Dict[int, List[Dict]] = {}
+        self._reviews_by: Dict[int, List[Dict]] = {}
+        for review in sorted(self._reviews.values(), key=lambda r: (r['timestamp'], r['id'])):
+            self._index_review(review)
+    
+    def _index_review(self, review: Dict):
+        self._reviews_about.setdefault(review['reviewed_id'], []).append(review)
+        self._reviews_by.setdefault(review['reviewer_id'], []).append(review)
+    
+    def _build_leaderboard(self):
+        """Строит таблицу лидеров и сумму рейтингов при запуске"""
+        self._leaderboard = Leaderboard()
+        self._rating_sum = 0.0
+        self._rated_count = 0
+        for user_id_str, user_data in self._ratings.items():
+            if user_data.get('total_reviews', 0) > 0:
+                self._rating_sum += user_data['current_rating']
+                self._rated_count += 1
+            self._refresh_leaderboard(int(user_id_str))
+    
+    def _refresh_leaderboard(self, user_id: int):
+        """Пересчитывает позицию пользователя в таблице лидеров"""
+        user_data = self._ratings.get(str(user_id))
+        if not user_data or user_data.get('total_reviews', 0) < TOP_MIN_REVIEWS:
+            self._leaderboard.remove(user_id)
+            return
+        
+        stats = self.get_user_stats(user_id)
+        
+        # Рейтинговая формула: учитываем рейтинг, надежность и количество отзывов
+        rating_score = user_data['current_rating']
+        reliability_score = stats['reliability_score'] / 100
+        review_count_bonus = min(user_data['total_reviews'] * 0.1, 2.0)  # Бонус за количество отзывов
+        
+        total_score = (rating_score * 0.4 + reliability_score * 4 * 0.4 + review_count_bonus * 0.2)
+        
+        self._leaderboard.upsert({
+            'user_id': user_id,
+            'rating': user_data['current_rating'],
+            'total_reviews': user_data['total_reviews'],
+            'total_score': total_score,
+            'reliability_score': stats['reliability_score'],
+            'level': stats['level']
+        })
+    
+    @cross_process
     def update_rating(self, user_id: int, rating_change: float, review_id: Optional[int] = None):
         """Обновляет рейтинг пользователя"""
-        with open(self.ratings_file, 'r', encoding='utf-8') as f:
-            ratings = json.load(f)
+        ratings = self._ratings
         
         user_str = str(user_id)
         
@@ -52,6 +179,11 @@ class RatingSystem:
         old_rating = user_data['current_rating']
         total_reviews = user_data['total_reviews']
         
+        # Убираем старое значение из суммы для среднего рейтинга
+        if total_reviews > 0:
+            self._rating_sum -= old_rating
+            self._rated_count -= 1
+        
         # Формула для обновления рейтинга с учетом количества отзывов
         if total_reviews == 0:
             new_rating = rating_change
@@ -80,18 +212,21 @@ class RatingSystem:
                 user_data['review_ids'] = []
             user_data['review_ids'].append(review_id)
         
-        with open(self.ratings_file, 'w', encoding='utf-8') as f:
-            json.dump(ratings, f, ensure_ascii=False, indent=2)
+        self._mark_dirty(self.ratings_file, ratings)
+        
+        self._rating_sum += user_data['current_rating']
+        self._rated_count += 1
         
         # Обновляем статистику пользователя
         self._update_user_stats(user_id, rating_change >= 3.0)
+        self._refresh_leaderboard(user_id)
         
         return new_rating
     
+    @cross_process
     def _update_user_stats(self, user_id: int, is_positive: bool):
         """Обновляет статистику пользователя"""
-        with open(self.stats_file, 'r', encoding='utf-8') as f:
-            stats = json.load(f)
+        stats = self._stats
         
         user_str = str(user_id)
         today = datetime.now().strftime('%Y-%m-%d')
@@ -127,16 +262,15 @@ class RatingSystem:
         reliability = (completed * 0.3 + positive_rate * 0.7) / 100 * 100
         user_stats['reliability_score'] = round(min(100, reliability), 1)
         
-        with open(self.stats_file, 'w', encoding='utf-8') as f:
-            json.dump(stats, f, ensure_ascii=False, indent=2)
+        self._mark_dirty(self.stats_file, stats)
     
+    @cross_process
     def add_review(self, reviewer_id: int, reviewed_id: int, rating: float, 
                   comment: str, request_id: Optional[int] = None) -> int:
         """Добавляет отзыв о пользователе"""
-        with open(self.reviews_file, 'r', encoding='utf-8') as f:
-            reviews = json.load(f)
+        reviews = self._reviews
         
-        review_id = len(reviews) + 1
+        review_id = self._review_ids.next_id()
         
         review = {
             'id': review_id,
@@ -152,19 +286,19 @@ class RatingSystem:
         }
         
         reviews[str(review_id)] = review
+        self._index_review(review)
         
-        with open(self.reviews_file, 'w', encoding='utf-8') as f:
-            json.dump(reviews, f, ensure_ascii=False, indent=2)
+        self._mark_dirty(self.reviews_file, reviews)
         
         # Обновляем рейтинг пользователя
         self.update_rating(reviewed_id, rating, review_id)
         
         return review_id
     
+    @cross_process
     def get_user_rating(self, user_id: int) -> Dict[str, Any]:
         """Получает рейтинг пользователя"""
-        with open(self.ratings_file, 'r', encoding='utf-8') as f:
-            ratings = json.load(f)
+        ratings = self._ratings
         
         user_str = str(user_id)
         
@@ -198,26 +332,24 @@ class RatingSystem:
             'has_rating': user_data['total_reviews'] > 0
         }
     
+    @cross_process
     def get_user_reviews(self, user_id: int, limit: int = 5) -> List[Dict]:
-        """Получает отзывы о пользователе"""
-        with open(self.reviews_file, 'r', encoding='utf-8') as f:
-            reviews = json.load(f)
-        
-        user_reviews = []
-        
-        for review_id, review in reviews.items():
-            if review['reviewed_id'] == user_id:
-                user_reviews.append(review)
-        
-        # Сортируем по дате (сначала новые)
-        user_reviews.sort(key=lambda x: x['timestamp'], reverse=True)
-        
-        return user_reviews[:limit]
+        """Получает отзывы о пользователе (сначала новые)"""
+        return _newest_first(self._reviews_about.get(user_id, []), limit)
     
+    @cross_process
+    def get_reviews_given(self, user_id: int, limit: int = 5) -> List[Dict]:
+        """Получает отзывы, которые оставил пользователь (сначала новые)"""
+        return _newest_first(self._reviews_by.get(user_id, []), limit)
+    
+    @cross_process
+    def count_reviews_given(self, user_id: int) -> int:
+        return len(self._reviews_by.get(user_id, []))
+    
+    @cross_process
     def get_user_stats(self, user_id: int) -> Dict[str, Any]:
         """Получает статистику пользователя"""
-        with open(self.stats_file, 'r', encoding='utf-8') as f:
-            stats = json.load(f)
+        stats = self._stats
         
         user_str = str(user_id)
         
@@ -282,65 +414,43 @@ class RatingSystem:
         """Опыт, необходимый для достижения уровня"""
         return 2 ** (level - 1) - 1
     
+    @cross_process
     def get_top_users(self, limit: int = 10, category: Optional[str] = None) -> List[Dict]:
-        """Получает топ пользователей"""
-        with open(self.ratings_file, 'r', encoding='utf-8') as f:
-            ratings = json.load(f)
-        
-        top_users = []
-        
-        for user_id_str, user_data in ratings.items():
-            if user_data.get('total_reviews', 0) >= 3:  # Только пользователи с минимум 3 отзывами
-                user_id = int(user_id_str)
-                stats = self.get_user_stats(user_id)
-                
-                # Рейтинговая формула: учитываем рейтинг, надежность и количество отзывов
-                rating_score = user_data['current_rating']
-                reliability_score = stats['reliability_score'] / 100
-                review_count_bonus = min(user_data['total_reviews'] * 0.1, 2.0)  # Бонус за количество отзывов
-                
-                total_score = (rating_score * 0.4 + reliability_score * 4 * 0.4 + review_count_bonus * 0.2)
-                
-                top_users.append({
-                    'user_id': user_id,
-                    'rating': user_data['current_rating'],
-                    'total_reviews': user_data['total_reviews'],
-                    'total_score': total_score,
-                    'reliability_score': stats['reliability_score'],
-                    'level': stats['level']
-                })
-        
-        # Сортируем по общему баллу
-        top_users.sort(key=lambda x: x['total_score'], reverse=True)
-        
-        return top_users[:limit]
+        """Получает топ пользователей (из таблицы лидеров)"""
+        return self._leaderboard.top(limit)
     
+    @cross_process
+    def get_average_rating(self) -> Tuple[float, int]:
+        """Средний рейтинг и количество оценённых пользователей"""
+        if not self._rated_count:
+            return 0.0, 0
+        return round(self._rating_sum / self._rated_count, 2), self._rated_count
+    
+    @cross_process
     def like_review(self, review_id: int):
         """Ставит лайк отзыву"""
-        with open(self.reviews_file, 'r', encoding='utf-8') as f:
-            reviews = json.load(f)
+        reviews = self._reviews
         
         review_str = str(review_id)
         if review_str in reviews:
             reviews[review_str]['likes'] = reviews[review_str].get('likes', 0) + 1
         
-        with open(self.reviews_file, 'w', encoding='utf-8') as f:
-            json.dump(reviews, f, ensure_ascii=False, indent=2)
+        self._mark_dirty(self.reviews_file, reviews)
     
+    @cross_process
     def dislike_review(self, review_id: int):
         """Ставит дизлайк отзыву"""
-        with open(self.reviews_file, 'r', encoding='utf-8') as f:
-            reviews = json.load(f)
+        reviews = self._reviews
         
         review_str = str(review_id)
         if review_str in reviews:
             reviews[review_str]['dislikes'] = reviews[review_str].get('dislikes', 0) + 1
         
-        with open(self.reviews_file, 'w', encoding='utf-8') as f:
-            json.dump(reviews, f, ensure_ascii=False, indent=2)
+        self._mark_dirty(self.reviews_file, reviews)
 
 # Создаем глобальный экземпляр системы рейтингов
-rating_system = RatingSystem()
+rating_system = LazyProxy(RatingSystem, 'rating_system')
+async_rating_system = AsyncStorage(rating_system)
 
 # Константы состояний для ConversationHandler
 REVIEW_RATING, REVIEW_COMMENT = range(30, 32)
@@ -417,8 +527,8 @@ async def show_my_rating(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user = update.effective_user
     
     # Получаем данные рейтинга
-    rating_data = rating_system.get_user_rating(user_id)
-    stats_data = rating_system.get_user_stats(user_id)
+    rating_data = await async_rating_system.get_user_rating(user_id)
+    stats_data = await async_rating_system.get_user_stats(user_id)
     
     # Формируем сообщение
     message_text = f"⭐ *Рейтинг пользователя* @{user.username or user.first_name}\n\n"
@@ -456,7 +566,7 @@ async def show_my_rating(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 async def show_top_users(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Показывает топ пользователей"""
-    top_users = rating_system.get_top_users(limit=10)
+    top_users = await async_rating_system.get_top_users(limit=10)
     
     if not top_users:
         await update.message.reply_text(
@@ -509,24 +619,50 @@ async def show_top_users(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def show_my_reviews_given(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Показывает отзывы, которые оставил пользователь"""
     user_id = update.effective_user.id
-    reviews = rating_system.get_user_reviews(user_id)
+    reviews = await async_rating_system.get_reviews_given(user_id, limit=3)
     
-    # Фильтруем только те отзывы, где пользователь был рецензентом
-    # Для этого нужно пересмотреть структуру данных или сделать отдельный метод
+    if not reviews:
+        await update.message.reply_text(
+            "📝 *Мои отзывы*\n\n"
+            "Вы пока не оставили ни одного отзыва.",
+            parse_mode='Markdown',
+            reply_markup=get_rating_main_keyboard()
+        )
+        return
     
+    total = await async_rating_system.count_reviews_given(user_id)
     await update.message.reply_text(
-        "📝 *Мои отзывы*\n\n"
-        "Отзывы, которые вы оставили другим пользователям, "
-        "будут отображаться здесь.\n\n"
-        "Функция в разработке...",
-        parse_mode='Markdown',
-        reply_markup=get_rating_main_keyboard()
+        f"📝 *Мои отзывы ({total})*\n\n"
+        "👇 Последние оставленные отзывы:",
+        parse_mode='Markdown'
     )
+    
+    for review in reviews:
+        stars = "⭐" * int(review['rating']) + "☆" * (5 - int(review['rating']))
+        time_ago = get_time_ago(review['timestamp'])
+        
+        review_text = (
+            f"👤 Пользователю: {review['reviewed_id']}\n"
+            f"⭐ {stars} ({review['rating']}/5)\n"
+            f"📝 {review['comment'][:150]}...\n"
+            f"🕐 {time_ago}"
+        )
+        
+        if review.get('request_id'):
+            review_text += f"\n📋 К запросу: #{review['request_id']}"
+        
+        await update.message.reply_text(review_text, parse_mode='Markdown')
+    
+    if total > 3:
+        await update.message.reply_text(
+            f"И еще {total - 3} отзывов...",
+            reply_markup=get_rating_main_keyboard()
+        )
 
 async def show_reviews_about_me(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Показывает отзывы о текущем пользователе"""
     user_id = update.effective_user.id
-    reviews = rating_system.get_user_reviews(user_id)
+    reviews = await async_rating_system.get_user_reviews(user_id)
     
     if not reviews:
         await update.message.reply_text(
@@ -573,8 +709,8 @@ async def show_reviews_about_me(update: Update, context: ContextTypes.DEFAULT_TY
 async def show_detailed_stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Показывает подробную статистику"""
     user_id = update.effective_user.id
-    stats = rating_system.get_user_stats(user_id)
-    rating = rating_system.get_user_rating(user_id)
+    stats = await async_rating_system.get_user_stats(user_id)
+    rating = await async_rating_system.get_user_rating(user_id)
     
     # Рассчитываем дополнительные метрики
     completion_rate = min(100, (stats['total_completed'] / (stats['total_completed'] + 5)) * 100)
@@ -626,7 +762,7 @@ async def show_detailed_stats(update: Update, context: ContextTypes.DEFAULT_TYPE
 async def show_levels_and_achievements(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Показывает систему уровней и достижений"""
     user_id = update.effective_user.id
-    stats = rating_system.get_user_stats(user_id)
+    stats = await async_rating_system.get_user_stats(user_id)
     
     message_text = (
         "🎖️ *Система уровней и достижений*\n\n"
@@ -766,7 +902,7 @@ async def save_user_review(update: Update, context: ContextTypes.DEFAULT_TYPE):
     reviewed_id = context.user_data.get('reviewed_user_id', user.id)  # По умолчанию себе
     
     # Сохраняем отзыв
-    review_id = rating_system.add_review(
+    review_id = await async_rating_system.add_review(
         reviewer_id=user.id,
         reviewed_id=reviewed_id,
         rating=float(rating),
@@ -814,7 +950,7 @@ async def handle_rating_callback(update: Update, context: ContextTypes.DEFAULT_T
     
     if callback_data.startswith("like_review_"):
         review_id = int(callback_data.replace("like_review_", ""))
-        rating_system.like_review(review_id)
+        await async_rating_system.like_review(review_id)
         
         await query.edit_message_text(
             "👍 Ваш лайк учтен!",
@@ -823,7 +959,7 @@ async def handle_rating_callback(update: Update, context: ContextTypes.DEFAULT_T
     
     elif callback_data.startswith("dislike_review_"):
         review_id = int(callback_data.replace("dislike_review_", ""))
-        rating_system.dislike_review(review_id)
+        await async_rating_system.dislike_review(review_id)
         
         await query.edit_message_text(
             "👎 Ваш дизлайк учтен!",
@@ -834,8 +970,8 @@ async def handle_rating_callback(update: Update, context: ContextTypes.DEFAULT_T
         user_id = int(callback_data.replace("view_top_profile_", ""))
         
         # Получаем информацию о пользователе
-        rating_data = rating_system.get_user_rating(user_id)
-        stats_data = rating_system.get_user_stats(user_id)
+        rating_data = await async_rating_system.get_user_rating(user_id)
+        stats_data = await async_rating_system.get_user_stats(user_id)
         
         profile_text = (
             f"👤 *Профиль пользователя #{user_id}*\n\n"
@@ -868,9 +1004,9 @@ async def handle_rating_callback(update: Update, context: ContextTypes.DEFAULT_T
     
     elif callback_data == "compare_top":
         user_id = query.from_user.id
-        user_stats = rating_system.get_user_stats(user_id)
-        user_rating = rating_system.get_user_rating(user_id)
-        top_users = rating_system.get_top_users(limit=1)
+        user_stats = await async_rating_system.get_user_stats(user_id)
+        user_rating = await async_rating_system.get_user_rating(user_id)
+        top_users = await async_rating_system.get_top_users(limit=1)
         
         if not top_users:
             await query.edit_message_text(
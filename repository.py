@@ -0,0 +1,154 @@
+# repository.py
+"""
+Точка доступа к хранилищам бота по областям.
+
+Обработчики не открывают JSON-файлы сами: всё идёт через repository
+(синхронно) или async_repo (из цикла событий). Хранилища подключаются
+лениво, при первом обращении; заявки и предложения — SQLite или JSON
+по настройкам STORAGE_BACKEND / REQUESTS_BACKEND / OFFERS_BACKEND.
+
+    user = await async_repo.users.get(telegram_id)
+    offer = await async_repo.offers.insert({...})
+
+Это не единый движок: у областей остаются API их хранилищ.
+
+- users — database.Database: get / get_by_email / save / list_ids /
+  update_fields / update_by_id. Все пользователи лежат в таблице users
+  (data/bot.db), старый users.json переносится туда при первом запуске;
+  повторные обращения обслуживает кэш UserCache.
+- requests — need_help.RequestSystem: create_request, close_request,
+  get_request_by_id, search, ...
+- offers — offer_store: insert, get, list_by_user, list_by_category.
+- reviews — rating.RatingSystem (отзывы о пользователях). Отзывы по
+  заявкам хранит requests.RequestManager (messages) в request_reviews.json.
+- messages / notifications — requests.RequestManager.
+
+database_utils.DatabaseManager (data/bot_database.db) сюда не входит:
+его использует только persistence.py (сессии), а не обработчики.
+
+Все хранилища потокобезопасны сами, поэтому async_repo вызывает их
+параллельно в пуле потоков — так же, как async_request_system и другие
+фасады AsyncStorage.
+"""
+import threading
+import logging
+from typing import Any, Dict, List, Optional
+
+from async_storage import AsyncStorage
+from lazy import LazyProxy
+
+logger = logging.getLogger(__name__)
+
+
+class UserRepository:
+    """Пользователи поверх database.Database (таблица users и кэш)"""
+
+    def __init__(self, database):
+        self._db = database
+
+    def get(self, telegram_id) -> Optional[dict]:
+        return self._db.get_user_by_telegram_id(int(telegram_id))
+
+    def get_by_email(self, email: str) -> Optional[dict]:
+        return self._db.get_user_by_email(email)
+
+    def save(self, user_data: Dict[str, Any]) -> bool:
+        return self._db.create_or_update_user(user_data)
+
+    def list_ids(self, after_id: int = 0, limit: int = 1000) -> List[int]:
+        """Порция telegram_id по возрастанию, начиная после after_id"""
+        return self._db.list_telegram_ids(after_id, limit)
+
+    def update_fields(self, telegram_id, **fields) -> Optional[dict]:
+        """Обновляет поля профиля одной записью; возвращает профиль или None при ошибке"""
+        user = dict(self.get(telegram_id) or {})
+        user.setdefault('telegram_id', str(telegram_id))
+        user.update(fields)
+        return user if self.save(user) else None
+
+    def update_by_id(self, user_id: int, **fields) -> bool:
+        """Обновляет колонки строки users по её id (например, telegram_id при входе)"""
+        return self._db.update_user(user_id, **fields)
+
+
+class Repository:
+    """Хранилища по областям: users, requests, offers, reviews, messages, notifications"""
+
+    def __init__(self):
+        # RLock: фабрика одной области может обратиться к другой
+        self._lock = threading.RLock()
+        self._parts: Dict[str, Any] = {}
+
+    def _get(self, name: str, factory):
+        part = self._parts.get(name)
+        if part is None:
+            with self._lock:
+                part = self._parts.get(name)
+                if part is None:
+                    part = factory()
+                    self._parts[name] = part
+        return part
+
+    @property
+    def users(self) -> UserRepository:
+        def factory():
+            from database import db
+            return UserRepository(db)
+        return self._get('users', factory)
+
+    @property
+    def requests(self):
+        """Заявки (need_help.RequestSystem: хранилище + поисковый индекс)"""
+        def factory():
+            from need_help import request_system
+            return request_system
+        return self._get('requests', factory)
+
+    @property
+    def offers(self):
+        def factory():
+            from offer_store import create_offer_store
+            return LazyProxy(create_offer_store, 'offer_store')
+        return self._get('offers', factory)
+
+    @property
+    def reviews(self):
+        def factory():
+            from rating import rating_system
+            return rating_system
+        return self._get('reviews', factory)
+
+    @property
+    def messages(self):
+        """Сообщения и уведомления заявок (requests.RequestManager)"""
+        def factory():
+            from requests import request_manager
+            return request_manager
+        return self._get('messages', factory)
+
+    @property
+    def notifications(self):
+        return self.messages
+
+
+class AsyncRepository:
+    """То же, что Repository, но методы возвращают awaitable (см. AsyncStorage)"""
+
+    def __init__(self, repo: Repository):
+        self._repo = repo
+        self._lock = threading.Lock()
+        self._wrappers: Dict[str, AsyncStorage] = {}
+
+    def __getattr__(self, name: str) -> AsyncStorage:
+        if name.startswith('_'):
+            raise AttributeError(name)
+        wrapper = self._wrappers.get(name)
+        if wrapper is None:
+            target = getattr(self._repo, name)
+            with self._lock:
+                wrapper = self._wrappers.setdefault(name, AsyncStorage(target))
+        return wrapper
+
+
+repository = Repository()
+async_repo = AsyncRepository(repository)
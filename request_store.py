@@ -0,0 +1,424 @@
+# request_store.py
+"""
+Хранилища заявок для need_help.RequestSystem.
+
+JsonRequestStore — прежний формат: весь словарь заявок в help_requests.json
+(запись отложенная), в памяти поддерживаются индексы по пользователю,
+категории и статусу.
+SQLiteRequestStore — таблица с индексами по status, created_at, user_id и
+category: запись затрагивает одну строку, а список активных заявок
+выбирается индексом с ORDER BY created_at DESC LIMIT. Лента и категории
+читают частичные индексы WHERE status != 'closed', поэтому закрытые
+заявки (их число только растёт) в запросы не попадают.
+"""
+import os
+import json
+import logging
+import bisect
+import heapq
+import itertools
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Any, Tuple
+
+from db_pool import get_pool
+from write_behind import mark_dirty_json, synchronized
+from id_sequence import get_sequence
+from search_index import normalize_text
+
+logger = logging.getLogger(__name__)
+
+# Общие настройки хранилища (repository.py); для заявок их можно переопределить.
+# Отдельный файл от data/bot.db с пользователями: кэш пользователей (database.py)
+# сбрасывается по PRAGMA data_version, и запись заявок не должна его очищать
+STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'sqlite').lower()
+STORAGE_DB_PATH = os.getenv('STORAGE_DB_PATH', 'data/storage.db')
+REQUESTS_BACKEND = os.getenv('REQUESTS_BACKEND', STORAGE_BACKEND).lower()
+REQUESTS_DB_PATH = os.getenv('REQUESTS_DB_PATH', STORAGE_DB_PATH)
+
+
+def normalize_request_id(req_id) -> Optional[str]:
+    """Приводит идентификатор заявки к строке без префикса req_"""
+    if req_id is None:
+        return None
+    rid = str(req_id)
+    if rid.startswith("req_"):
+        rid = rid[len("req_"):]
+    return rid
+
+
+def normalize_category(category: Optional[str]) -> str:
+    """Ключ категории: без пробелов по краям, нижний регистр, ё -> е"""
+    return normalize_text((category or '').strip())
+
+
+def request_status(r: dict) -> str:
+    """Статус заявки (у заявок без статуса — 'active')"""
+    return r.get('status') or 'active'
+
+
+def load_requests_file(path: str) -> Dict[str, dict]:
+    """Читает help_requests.json и нормализует ключи ("req_1" -> "1")"""
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            raw = json.load(f) or {}
+    except Exception:
+        logger.exception("Failed to load requests file")
+        raw = {}
+
+    # Старый HelpSystem мог записать сюда список — такие данные пропускаем
+    if not isinstance(raw, dict):
+        logger.warning("Unexpected format of %s, ignoring", path)
+        return {}
+
+    norm = {}
+    for k, v in raw.items():
+        nk = normalize_request_id(k)
+        if isinstance(v, dict):
+            v.setdefault('id', nk)
+        norm[nk] = v
+    return norm
+
+
+class JsonRequestStore:
+    """Заявки в одном JSON-файле (словарь id -> заявка) с индексами в памяти"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.RLock()
+        self._data = load_requests_file(path)
+        self._ids = get_sequence('help_requests', seed=lambda: max(
+            (int(k) for k in self._data if k.isdigit()), default=0))
+
+        # Вторичные индексы: пользователь, категория, статус -> [(created_at, id)]
+        # по возрастанию даты (список пользователя или категории читается с конца — сначала новые)
+        self._by_user: Dict[str, List[tuple]] = {}
+        self._by_category: Dict[str, List[tuple]] = {}
+        self._by_status: Dict[str, List[tuple]] = {}
+        for key, r in self._data.items():
+            if isinstance(r, dict):
+                self._index(key, r)
+
+    def _save(self):
+        # Файл переписывается отложенно: серия изменений — одна запись на диск
+        mark_dirty_json(self.path, self._data, self._lock)
+
+    @staticmethod
+    def _index_keys(r: dict) -> tuple:
+        """Значения, по которым заявка лежит в индексах"""
+        return (str(r.get('user_id')), normalize_category(r.get('category')),
+                request_status(r), r.get('created_at') or '')
+
+    def _indexes(self, index_keys: tuple):
+        user, category, status, _ = index_keys
+        return ((self._by_user, user), (self._by_category, category), (self._by_status, status))
+
+    def _index(self, key: str, r: dict, index_keys: Optional[tuple] = None):
+        index_keys = index_keys or self._index_keys(r)
+        entry = (index_keys[3], key)
+        for index, value in self._indexes(index_keys):
+            bisect.insort(index.setdefault(value, []), entry)
+
+    def _unindex(self, key: str, r: dict, index_keys: Optional[tuple] = None):
+        index_keys = index_keys or self._index_keys(r)
+        entry = (index_keys[3], key)
+        for index, value in self._indexes(index_keys):
+            entries = index.get(value)
+            if entries:
+                i = bisect.bisect_left(entries, entry)
+                if i < len(entries) and entries[i] == entry:
+                    del entries[i]
+
+    def _key(self, req_id) -> Optional[str]:
+        rid = normalize_request_id(req_id)
+        if rid is None:
+            return None
+        if rid in self._data:
+            return rid
+        if f"req_{rid}" in self._data:
+            return f"req_{rid}"
+        return None
+
+    @synchronized
+    def get(self, req_id) -> Optional[dict]:
+        key = self._key(req_id)
+        return self._data.get(key) if key else None
+
+    @synchronized
+    def insert(self, data: dict) -> str:
+        next_id = str(self._ids.next_id())
+        self._data[next_id] = data
+        data['id'] = next_id
+        data['created_at'] = datetime.utcnow().isoformat()
+        self._index(next_id, data)
+        self._save()
+        return next_id
+
+    @synchronized
+    def update(self, req_id, fields: Dict[str, Any]) -> Optional[dict]:
+        key = self._key(req_id)
+        r = self._data.get(key) if key else None
+        if not r:
+            return None
+        old_keys = self._index_keys(r)
+        r.update(fields)
+        new_keys = self._index_keys(r)
+        # Заявка остаётся на своём месте по дате; индексы меняются, только если изменились их поля
+        if new_keys != old_keys:
+            self._unindex(key, r, old_keys)
+            self._index(key, r, new_keys)
+        self._save()
+        return r
+
+    def _active_keys_newest_first(self):
+        """id активных заявок от новых к старым (слияние списков по статусам)"""
+        lists = [reversed(entries) for status, entries in self._by_status.items() if status != 'closed']
+        for _, key in heapq.merge(*lists, reverse=True):
+            yield key
+
+    def _active_keys_from(self, cursor: tuple, older: bool):
+        """id активных заявок от курсора (created_at, id): к старым или к новым"""
+        lists = []
+        for status, entries in self._by_status.items():
+            if status == 'closed':
+                continue
+            if older:
+                i = bisect.bisect_left(entries, cursor)
+                lists.append(map(entries.__getitem__, range(i - 1, -1, -1)))
+            else:
+                i = bisect.bisect_right(entries, cursor)
+                lists.append(map(entries.__getitem__, range(i, len(entries))))
+        for _, key in heapq.merge(*lists, reverse=older):
+            yield key
+
+    @synchronized
+    def list_active(self, limit: int = 10) -> List[dict]:
+        result = []
+        for key in self._active_keys_newest_first():
+            if len(result) >= limit:
+                break
+            result.append(self._data[key])
+        return result
+
+    @synchronized
+    def list_active_page(self, limit: int = 10, older_than=None, newer_than=None) -> List[dict]:
+        """Страница активных заявок (сначала новые) до или после заявки-курсора"""
+        key = self._key(older_than if older_than is not None else newer_than)
+        if key is None:
+            return self.list_active(limit)
+        cursor = (self._data[key].get('created_at') or '', key)
+        keys = itertools.islice(self._active_keys_from(cursor, older=older_than is not None), limit)
+        items = [self._data[k] for k in keys]
+        if older_than is None:
+            items.reverse()
+        return items
+
+    @synchronized
+    def list_by_user(self, user_id, active_only: bool = False) -> List[dict]:
+        items = [self._data[k] for _, k in reversed(self._by_user.get(str(user_id), []))]
+        if active_only:
+            items = [r for r in items if request_status(r) != 'closed']
+        return items
+
+    @synchronized
+    def list_by_category(self, category: str, limit: int = 10) -> List[dict]:
+        result = []
+        for _, key in reversed(self._by_category.get(normalize_category(category), [])):
+            r = self._data[key]
+            if request_status(r) == 'closed':
+                continue
+            result.append(r)
+            if len(result) >= limit:
+                break
+        return result
+
+    def iter_active(self):
+        with self._lock:
+            items = [self._data[k] for k in self._active_keys_newest_first()]
+        return iter(items)
+
+
+class SQLiteRequestStore:
+    """Заявки в таблице SQLite с индексами (одна строка на заявку)"""
+
+    TABLE = 'need_help_requests'
+    # Вычисляется внутри пишущей транзакции, поэтому номера растут в порядке фиксации
+    _NEXT_REV = f'(SELECT COALESCE(MAX(rev), 0) + 1 FROM {TABLE})'
+
+    def __init__(self, db_path: str, legacy_json_path: Optional[str] = None):
+        self.db_path = db_path
+        self.pool = get_pool(db_path)
+        self._init_table()
+        if legacy_json_path:
+            self._import_legacy(legacy_json_path)
+
+    def _init_table(self):
+        conn = self.pool.get_connection()
+        with conn:
+            conn.execute(f'''
+                CREATE TABLE IF NOT EXISTS {self.TABLE} (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id INTEGER,
+                    category TEXT,
+                    status TEXT NOT NULL DEFAULT 'active',
+                    created_at TEXT NOT NULL,
+                    data TEXT NOT NULL,
+                    rev INTEGER NOT NULL DEFAULT 0
+                )
+            ''')
+            columns = {row['name'] for row in conn.execute(f'PRAGMA table_info({self.TABLE})')}
+            if 'rev' not in columns:
+                conn.execute(f'ALTER TABLE {self.TABLE} ADD COLUMN rev INTEGER NOT NULL DEFAULT 0')
+            # Номер изменения: другие процессы догоняют свои индексы по changes_since
+            conn.execute(f'CREATE INDEX IF NOT EXISTS idx_nhr_rev ON {self.TABLE}(rev)')
+            conn.execute(f'CREATE INDEX IF NOT EXISTS idx_nhr_status ON {self.TABLE}(status)')
+            conn.execute(f'CREATE INDEX IF NOT EXISTS idx_nhr_created ON {self.TABLE}(created_at)')
+            conn.execute(f'CREATE INDEX IF NOT EXISTS idx_nhr_user ON {self.TABLE}(user_id)')
+            conn.execute(f'CREATE INDEX IF NOT EXISTS idx_nhr_category ON {self.TABLE}(category)')
+            conn.execute(f'CREATE INDEX IF NOT EXISTS idx_nhr_user_created ON {self.TABLE}(user_id, created_at)')
+            conn.execute(f'CREATE INDEX IF NOT EXISTS idx_nhr_category_created ON {self.TABLE}(category, created_at)')
+            # По (status, created_at) условие status != 'closed' не даёт диапазона — индекс читался целиком
+            conn.execute('DROP INDEX IF EXISTS idx_nhr_status_created')
+            # Частичные индексы только по незакрытым заявкам; условие в запросах должно совпадать с WHERE индекса
+            conn.execute(f"CREATE INDEX IF NOT EXISTS idx_nhr_open_created ON {self.TABLE}(created_at) "
+                         f"WHERE status != 'closed'")
+            conn.execute(f"CREATE INDEX IF NOT EXISTS idx_nhr_open_category ON {self.TABLE}(category, created_at) "
+                         f"WHERE status != 'closed'")
+
+    def _import_legacy(self, path: str):
+        """Однократно переносит заявки из help_requests.json в пустую таблицу"""
+        conn = self.pool.get_connection()
+        if conn.execute(f'SELECT 1 FROM {self.TABLE} LIMIT 1').fetchone():
+            return
+        legacy = load_requests_file(path)
+        if not legacy:
+            return
+
+        rows = []
+        for rid, r in legacy.items():
+            if not isinstance(r, dict):
+                continue
+            r = dict(r)
+            r.setdefault('created_at', datetime.utcnow().isoformat())
+            rows.append((int(rid) if rid.isdigit() else None, r.get('user_id'), normalize_category(r.get('category')),
+                         request_status(r), r['created_at'], json.dumps(r, ensure_ascii=False)))
+
+        with conn:
+            conn.executemany(
+                f'INSERT INTO {self.TABLE} (id, user_id, category, status, created_at, data) '
+                f'VALUES (?, ?, ?, ?, ?, ?)', rows
+            )
+        logger.info("Перенесено %s заявок из %s в SQLite", len(rows), path)
+
+    @staticmethod
+    def _row_to_request(row) -> dict:
+        r = json.loads(row['data'])
+        r['id'] = str(row['id'])
+        return r
+
+    def get(self, req_id) -> Optional[dict]:
+        rid = normalize_request_id(req_id)
+        if not rid or not rid.isdigit():
+            return None
+        row = self.pool.get_connection().execute(
+            f'SELECT id, data FROM {self.TABLE} WHERE id = ?', (int(rid),)
+        ).fetchone()
+        return self._row_to_request(row) if row else None
+
+    def insert(self, data: dict) -> str:
+        data['created_at'] = datetime.utcnow().isoformat()
+        conn = self.pool.get_connection()
+        with conn:
+            # id хранится в колонке и подставляется при чтении, поэтому вставка — одна строка
+            cur = conn.execute(
+                f'INSERT INTO {self.TABLE} (user_id, category, status, created_at, data, rev) '
+                f'VALUES (?, ?, ?, ?, ?, {self._NEXT_REV})',
+                (data.get('user_id'), normalize_category(data.get('category')), request_status(data),
+                 data['created_at'], json.dumps(data, ensure_ascii=False))
+            )
+        data['id'] = str(cur.lastrowid)
+        return data['id']
+
+    def update(self, req_id, fields: Dict[str, Any]) -> Optional[dict]:
+        r = self.get(req_id)
+        if not r:
+            return None
+        r.update(fields)
+        conn = self.pool.get_connection()
+        with conn:
+            conn.execute(
+                f'UPDATE {self.TABLE} SET user_id = ?, category = ?, status = ?, data = ?, '
+                f'rev = {self._NEXT_REV} WHERE id = ?',
+                (r.get('user_id'), normalize_category(r.get('category')), request_status(r),
+                 json.dumps(r, ensure_ascii=False), int(r['id']))
+            )
+        return r
+
+    def list_active(self, limit: int = 10) -> List[dict]:
+        rows = self.pool.get_connection().execute(
+            f"SELECT id, data FROM {self.TABLE} WHERE status != 'closed' "
+            f"ORDER BY created_at DESC, id DESC LIMIT ?", (limit,)
+        ).fetchall()
+        return [self._row_to_request(row) for row in rows]
+
+    def list_active_page(self, limit: int = 10, older_than=None, newer_than=None) -> List[dict]:
+        """Страница активных заявок (сначала новые) до или после заявки-курсора"""
+        cursor = self.get(older_than if older_than is not None else newer_than)
+        if cursor is None:
+            return self.list_active(limit)
+        params = (cursor['created_at'], int(cursor['id']), limit)
+        # Сравнение пар (created_at, id) — поиск по диапазону idx_nhr_open_created, а не обход
+        if older_than is not None:
+            sql = (f"SELECT id, data FROM {self.TABLE} WHERE status != 'closed' "
+                   f"AND (created_at, id) < (?, ?) "
+                   f"ORDER BY created_at DESC, id DESC LIMIT ?")
+        else:
+            sql = (f"SELECT id, data FROM {self.TABLE} WHERE status != 'closed' "
+                   f"AND (created_at, id) > (?, ?) "
+                   f"ORDER BY created_at ASC, id ASC LIMIT ?")
+        items = [self._row_to_request(row) for row in self.pool.get_connection().execute(sql, params)]
+        if older_than is None:
+            items.reverse()
+        return items
+
+    def list_by_user(self, user_id, active_only: bool = False) -> List[dict]:
+        sql = f"SELECT id, data FROM {self.TABLE} WHERE user_id = ?"
+        if active_only:
+            sql += " AND status != 'closed'"
+        rows = self.pool.get_connection().execute(sql + " ORDER BY created_at DESC", (user_id,)).fetchall()
+        return [self._row_to_request(row) for row in rows]
+
+    def list_by_category(self, category: str, limit: int = 10) -> List[dict]:
+        rows = self.pool.get_connection().execute(
+            f"SELECT id, data FROM {self.TABLE} WHERE category = ? AND status != 'closed' "
+            f"ORDER BY created_at DESC, id DESC LIMIT ?", (normalize_category(category), limit)
+        ).fetchall()
+        return [self._row_to_request(row) for row in rows]
+
+    def iter_active(self):
+        rows = self.pool.get_connection().execute(
+            f"SELECT id, data FROM {self.TABLE} WHERE status != 'closed'"
+        )
+        for row in rows:
+            yield self._row_to_request(row)
+
+    def last_rev(self) -> int:
+        """Номер последнего изменения заявок"""
+        return self.pool.get_connection().execute(f'SELECT MAX(rev) FROM {self.TABLE}').fetchone()[0] or 0
+
+    def changes_since(self, rev: int) -> Tuple[List[dict], int]:
+        """Заявки, изменённые после изменения rev (в том числе закрытые), и номер последнего из них"""
+        rows = self.pool.get_connection().execute(
+            f'SELECT id, data, rev FROM {self.TABLE} WHERE rev > ? ORDER BY rev', (rev,)
+        ).fetchall()
+        return [self._row_to_request(row) for row in rows], (rows[-1]['rev'] if rows else rev)
+
+
+def create_request_store(json_path: str, backend: Optional[str] = None):
+    """Создаёт хранилище заявок по настройке REQUESTS_BACKEND (sqlite | json)"""
+    backend = (backend or REQUESTS_BACKEND).lower()
+    if backend == 'json':
+        return JsonRequestStore(json_path)
+    return SQLiteRequestStore(REQUESTS_DB_PATH, legacy_json_path=json_path)
@@ -5,6 +5,8 @@
 import json
 import os
 import re
+import threading
+import bisect
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple, Any
 from telegram import Update, InlineKeyboardMarkup, InlineKeyboardButton, ReplyKeyboardMarkup, KeyboardButton
@@ -12,10 +14,20 @@ from telegram.ext import ContextTypes
 import logging
 from telegram.error import BadRequest
 
-from need_help import request_system
+from need_help import request_system, async_request_system
+from async_storage import AsyncStorage
+from lazy import LazyProxy
+from journal import JsonlJournal
+from write_behind import mark_dirty_json
+from interprocess import SharedFiles, cross_process
+from id_sequence import get_sequence
+from send_queue import send_queue, PRIORITY_NOTIFICATION
 
 logger = logging.getLogger(__name__)
 
+# Сколько сообщений чата показывать за раз
+CHAT_PAGE_SIZE = int(os.getenv("CHAT_PAGE_SIZE", "10"))
+
 # Делаем делегирование в need_help, чтобы не дублировать логику.
 try:
     from need_help import handle_request_callback as _handle_request_callback
@@ -29,28 +41,86 @@ class RequestManager:
     """Менеджер для управления всеми типами запросов"""
     
     def __init__(self):
-        self.messages_file = "data/request_messages.json"
+        self.messages_file = "data/request_messages.jsonl"
         self.reviews_file = "data/request_reviews.json"
-        self.notifications_file = "data/request_notifications.json"
+        self.notifications_file = "data/request_notifications.jsonl"
         self._init_data_files()
+        # Сообщения и уведомления — append-only журналы; старые JSON-файлы переносятся при первом запуске
+        self.messages = JsonlJournal(self.messages_file, legacy_json_path="data/request_messages.json")
+        self.notifications = JsonlJournal(self.notifications_file, legacy_json_path="data/request_notifications.json")
+        # Отзывы в памяти, файл переписывается отложенно (write_behind)
+        self._lock = threading.RLock()
+        with open(self.reviews_file, 'r', encoding='utf-8') as f:
+            self._reviews = json.load(f)
+        self._message_ids = get_sequence('request_messages', seed=lambda: self.messages.next_id() - 1)
+        self._notification_ids = get_sequence('request_notifications', seed=lambda: self.notifications.next_id() - 1)
+        self._review_ids = get_sequence('request_reviews', seed=lambda: max(
+            (r.get('id', 0) for r in self._reviews), default=0))
+        self._build_notification_index()
+        self._build_message_index()
+        self._build_review_indexes()
+        # Шарды: журналы и отзывы могут дописывать другие процессы
+        self._shared = SharedFiles([self.messages_file, self.notifications_file, self.reviews_file],
+                                   self._reload, "data/request_manager.lock")
+    
+    def _reload(self, changed: List[str]):
+        """Подхватывает изменения других процессов и перестраивает индексы"""
+        if self.messages_file in changed and self.messages.sync():
+            self._build_message_index()
+        if self.notifications_file in changed and self.notifications.sync():
+            self._build_notification_index()
+        if self.reviews_file in changed:
+            with open(self.reviews_file, 'r', encoding='utf-8') as f:
+                self._reviews = json.load(f)
+            self._build_review_indexes()
     
     def _init_data_files(self):
         """Инициализирует файлы данных"""
         os.makedirs("data", exist_ok=True)
         
-        for file_path in [self.messages_file, self.reviews_file, self.notifications_file]:
-            if not os.path.exists(file_path):
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    json.dump([], f, ensure_ascii=False)
+        if not os.path.exists(self.reviews_file):
+            with open(self.reviews_file, 'w', encoding='utf-8') as f:
+                json.dump([], f, ensure_ascii=False)
+    
+    def _build_notification_index(self):
+        """Непрочитанные уведомления по пользователям: id по возрастанию и счётчики"""
+        self._unread_by_user: Dict[int, List[int]] = {}
+        for n in self.notifications.values():
+            if not n.get('is_read'):
+                self._unread_by_user.setdefault(n['user_id'], []).append(n['id'])
+        for ids in self._unread_by_user.values():
+            ids.sort()
+        self._unread_count: Dict[int, int] = {
+            user_id: len(ids) for user_id, ids in self._unread_by_user.items()
+        }
     
+    def _build_review_indexes(self):
+        """Отзывы по получателю и по автору (в порядке добавления) и суммы оценок"""
+        self._reviews_about: Dict[int, List[Dict]] = {}
+        self._reviews_by: Dict[int, List[Dict]] = {}
+        self._rating_sums: Dict[int, int] = {}
+        for review in sorted(self._reviews, key=lambda r: (r['timestamp'], r['id'])):
+            self._index_review(review)
+    
+    def _index_review(self, review: Dict):
+        self._reviews_about.setdefault(review['reviewed_id'], []).append(review)
+        self._reviews_by.setdefault(review['reviewer_id'], []).append(review)
+        self._rating_sums[review['reviewed_id']] = self._rating_sums.get(review['reviewed_id'], 0) + review['rating']
+    
+    def _build_message_index(self):
+        """Сообщения по заявкам: id по возрастанию (в порядке отправки)"""
+        self._messages_by_request: Dict[str, List[int]] = {}
+        for msg in self.messages.values():
+            self._messages_by_request.setdefault(str(msg['request_id']), []).append(msg['id'])
+        for ids in self._messages_by_request.values():
+            ids.sort()
+    
+    @cross_process
     def save_message(self, request_id: int, sender_id: int, sender_name: str, 
                     receiver_id: int, message: str, message_type: str = "text") -> int:
         """Сохраняет сообщение по запросу"""
-        with open(self.messages_file, 'r', encoding='utf-8') as f:
-            messages = json.load(f)
-        
         msg = {
-            'id': len(messages) + 1,
+            'id': self._message_ids.next_id(),
             'request_id': request_id,
             'sender_id': sender_id,
             'sender_name': sender_name,
@@ -61,10 +131,8 @@ class RequestManager:
             'is_read': False
         }
         
-        messages.append(msg)
-        
-        with open(self.messages_file, 'w', encoding='utf-8') as f:
-            json.dump(messages, f, ensure_ascii=False, indent=2)
+        self.messages.append(msg)
+        self._messages_by_request.setdefault(str(request_id), []).append(msg['id'])
         
         # Создаем уведомление
         self.create_notification(
@@ -77,14 +145,12 @@ class RequestManager:
         
         return msg['id']
     
+    @cross_process
     def create_notification(self, user_id: int, title: str, message: str, 
-                           notification_type: str, data: Dict = None):
+                           notification_type: str, data: Dict = None) -> int:
         """Создает уведомление для пользователя"""
-        with open(self.notifications_file, 'r', encoding='utf-8') as f:
-            notifications = json.load(f)
-        
         notification = {
-            'id': len(notifications) + 1,
+            'id': self._notification_ids.next_id(),
             'user_id': user_id,
             'title': title,
             'message': message,
@@ -94,50 +160,52 @@ class RequestManager:
             'is_read': False
         }
         
-        notifications.append(notification)
-        
-        with open(self.notifications_file, 'w', encoding='utf-8') as f:
-            json.dump(notifications, f, ensure_ascii=False, indent=2)
-    
-    def get_unread_notifications(self, user_id: int) -> List[Dict]:
-        """Получает непрочитанные уведомления пользователя"""
-        with open(self.notifications_file, 'r', encoding='utf-8') as f:
-            notifications = json.load(f)
-        
-        unread = [
-            n for n in notifications 
-            if n['user_id'] == user_id and not n['is_read']
-        ]
-        
-        # Сортируем по дате (сначала новые)
-        unread.sort(key=lambda x: x['timestamp'], reverse=True)
-        
-        return unread
-    
+        self.notifications.append(notification)
+        # id растут со временем, поэтому добавление в конец сохраняет порядок
+        self._unread_by_user.setdefault(user_id, []).append(notification['id'])
+        self._unread_count[user_id] = self._unread_count.get(user_id, 0) + 1
+        return notification['id']
+    
+    @cross_process
+    def get_unread_count(self, user_id: int) -> int:
+        """Количество непрочитанных уведомлений пользователя"""
+        return self._unread_count.get(user_id, 0)
+    
+    @cross_process
+    def get_unread_notifications(self, user_id: int, limit: Optional[int] = None, offset: int = 0) -> List[Dict]:
+        """Получает непрочитанные уведомления пользователя (сначала новые)"""
+        ids = self._unread_by_user.get(user_id, [])
+        end = len(ids) - offset
+        start = 0 if limit is None else max(0, end - limit)
+        return [self.notifications.get(i) for i in reversed(ids[start:max(end, 0)])]
+    
+    @cross_process
     def mark_notification_read(self, notification_id: int):
         """Отмечает уведомление как прочитанное"""
-        with open(self.notifications_file, 'r', encoding='utf-8') as f:
-            notifications = json.load(f)
-        
-        for notification in notifications:
-            if notification['id'] == notification_id:
-                notification['is_read'] = True
-                break
+        notification = self.notifications.get(notification_id)
+        if not notification or notification.get('is_read'):
+            return
+        # В журнал дописывается только изменение поля, файл не переписывается
+        self.notifications.patch(notification_id, {'is_read': True})
         
-        with open(self.notifications_file, 'w', encoding='utf-8') as f:
-            json.dump(notifications, f, ensure_ascii=False, indent=2)
+        user_id = notification['user_id']
+        ids = self._unread_by_user.get(user_id, [])
+        i = bisect.bisect_left(ids, notification_id)
+        if i < len(ids) and ids[i] == notification_id:
+            del ids[i]
+        self._unread_count[user_id] = len(ids)
     
+    @cross_process
     def save_review(self, request_id: int, reviewer_id: int, reviewed_id: int,
                    rating: int, comment: str, review_type: str = "request") -> int:
         """Сохраняет отзыв по запросу"""
         if rating < 1 or rating > 5:
             raise ValueError("Рейтинг должен быть от 1 до 5")
         
-        with open(self.reviews_file, 'r', encoding='utf-8') as f:
-            reviews = json.load(f)
+        reviews = self._reviews
         
         review = {
-            'id': len(reviews) + 1,
+            'id': self._review_ids.next_id(),
             'request_id': request_id,
             'reviewer_id': reviewer_id,
             'reviewed_id': reviewed_id,
@@ -149,18 +217,16 @@ class RequestManager:
         }
         
         reviews.append(review)
+        self._index_review(review)
         
-        with open(self.reviews_file, 'w', encoding='utf-8') as f:
-            json.dump(reviews, f, ensure_ascii=False, indent=2)
+        mark_dirty_json(self.reviews_file, reviews, self._lock)
         
         return review['id']
     
+    @cross_process
     def get_user_reviews(self, user_id: int) -> Dict[str, Any]:
         """Получает отзывы пользователя"""
-        with open(self.reviews_file, 'r', encoding='utf-8') as f:
-            reviews = json.load(f)
-        
-        user_reviews = [r for r in reviews if r['reviewed_id'] == user_id]
+        user_reviews = self._reviews_about.get(user_id, [])
         
         if not user_reviews:
             return {
@@ -169,7 +235,7 @@ class RequestManager:
                 'reviews': []
             }
         
-        avg_rating = sum(r['rating'] for r in user_reviews) / len(user_reviews)
+        avg_rating = self._rating_sums[user_id] / len(user_reviews)
         
         return {
             'count': len(user_reviews),
@@ -177,23 +243,27 @@ class RequestManager:
             'reviews': user_reviews[-10:]  # Последние 10 отзывов
         }
     
-    def get_request_messages(self, request_id: int) -> List[Dict]:
-        """Получает сообщения по запросу"""
-        with open(self.messages_file, 'r', encoding='utf-8') as f:
-            messages = json.load(f)
-        
-        request_messages = [
-            msg for msg in messages 
-            if msg['request_id'] == request_id
-        ]
-        
-        # Сортируем по времени
-        request_messages.sort(key=lambda x: x['timestamp'])
-        
-        return request_messages
+    @cross_process
+    def get_reviews_given(self, user_id: int, limit: int = 10) -> List[Dict]:
+        """Отзывы, которые оставил пользователь (последние limit, в порядке добавления)"""
+        return self._reviews_by.get(user_id, [])[-limit:] if limit > 0 else []
+    
+    @cross_process
+    def get_request_messages(self, request_id, limit: Optional[int] = None,
+                             before_id: Optional[int] = None) -> List[Dict]:
+        """
+        Получает сообщения по запросу в порядке отправки.
+        limit/before_id — страница из последних limit сообщений старше before_id
+        (для «загрузить ранние»).
+        """
+        ids = self._messages_by_request.get(str(request_id), [])
+        end = bisect.bisect_left(ids, before_id) if before_id is not None else len(ids)
+        start = 0 if limit is None else max(0, end - limit)
+        return [self.messages.get(i) for i in ids[start:end]]
 
 # Создаем глобальный экземпляр менеджера
-request_manager = RequestManager()
+request_manager = LazyProxy(RequestManager, 'request_manager')
+async_request_manager = AsyncStorage(request_manager)
 
 # Константы состояний для ConversationHandler
 SEND_MESSAGE, SEND_REVIEW, SELECT_RATING = range(20, 23)
@@ -254,9 +324,8 @@ async def show_requests_menu(update: Update, context: ContextTypes.DEFAULT_TYPE)
     """Показывает меню управления запросами"""
     user_id = update.effective_user.id
     
-    # Проверяем непрочитанные уведомления
-    notifications = request_manager.get_unread_notifications(user_id)
-    notification_count = len(notifications)
+    # Проверяем непрочитанные уведомления (счётчик без загрузки самих уведомлений)
+    notification_count = await async_request_manager.get_unread_count(user_id)
     
     greeting = f"📋 *Управление запросами*\n\n"
     
@@ -281,9 +350,9 @@ async def show_requests_menu(update: Update, context: ContextTypes.DEFAULT_TYPE)
 async def show_notifications(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Показывает уведомления пользователя"""
     user_id = update.effective_user.id
-    notifications = request_manager.get_unread_notifications(user_id)
+    notification_count = await async_request_manager.get_unread_count(user_id)
     
-    if not notifications:
+    if not notification_count:
         await update.message.reply_text(
             "📭 *Уведомления*\n\n"
             "У вас нет непрочитанных уведомлений.",
@@ -293,13 +362,14 @@ async def show_notifications(update: Update, context: ContextTypes.DEFAULT_TYPE)
         return
     
     await update.message.reply_text(
-        f"🔔 *Уведомления ({len(notifications)})*\n\n"
+        f"🔔 *Уведомления ({notification_count})*\n\n"
         "👇 Ваши непрочитанные уведомления:",
         parse_mode='Markdown'
     )
     
     # Показываем последние 5 уведомлений
-    for i, notification in enumerate(notifications[:5], 1):
+    notifications = await async_request_manager.get_unread_notifications(user_id, limit=5)
+    for i, notification in enumerate(notifications, 1):
         time_ago = get_time_ago(notification['timestamp'])
         
         notification_text = (
@@ -325,9 +395,9 @@ async def show_notifications(update: Update, context: ContextTypes.DEFAULT_TYPE)
             parse_mode='Markdown'
         )
     
-    if len(notifications) > 5:
+    if notification_count > 5:
         await update.message.reply_text(
-            f"И еще {len(notifications) - 5} уведомлений...",
+            f"И еще {notification_count - 5} уведомлений...",
             reply_markup=get_requests_main_keyboard()
         )
 
@@ -388,7 +458,7 @@ async def process_message_target(update: Update, context: ContextTypes.DEFAULT_T
         context.user_data['message_target'] = {'type': 'request', 'id': request_id}
         
         # Проверяем существование запроса
-        request = request_system.get_request_by_id(request_id)
+        request = await async_request_system.get_request_by_id(request_id)
         if not request:
             await update.message.reply_text(
                 f"❌ Запрос #{request_id} не найден.\n"
@@ -451,13 +521,13 @@ async def send_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
         
         # Здесь должна быть логика определения получателя
         # Для примера: получатель - автор запроса
-        request = request_system.get_request_by_id(request_id)
+        request = await async_request_system.get_request_by_id(request_id)
         if request:
             receiver_id = request['user_id']
             receiver_name = request['username']
             
             # Сохраняем сообщение
-            message_id = request_manager.save_message(
+            message_id = await async_request_manager.save_message(
                 request_id=request_id,
                 sender_id=user.id,
                 sender_name=user.username or user.first_name,
@@ -542,7 +612,7 @@ async def save_review(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
     
     # Получаем информацию о запросе
-    request = request_system.get_request_by_id(request_id)
+    request = await async_request_system.get_request_by_id(request_id)
     if not request:
         await update.message.reply_text(
             f"❌ Запрос #{request_id} не найден.",
@@ -555,7 +625,7 @@ async def save_review(update: Update, context: ContextTypes.DEFAULT_TYPE):
     reviewed_id = request['user_id']  # Автор запроса
     
     # Сохраняем отзыв
-    review_id = request_manager.save_review(
+    review_id = await async_request_manager.save_review(
         request_id=request_id,
         reviewer_id=user.id,
         reviewed_id=reviewed_id,
@@ -582,7 +652,7 @@ async def save_review(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def show_my_reviews(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Показывает отзывы пользователя"""
     user_id = update.effective_user.id
-    reviews_data = request_manager.get_user_reviews(user_id)
+    reviews_data = await async_request_manager.get_user_reviews(user_id)
     
     if reviews_data['count'] == 0:
         await update.message.reply_text(
@@ -626,8 +696,8 @@ async def show_active_requests(update: Update, context: ContextTypes.DEFAULT_TYP
     """Показывает активные запросы пользователя"""
     user_id = update.effective_user.id
     
-    # Получаем запросы из need_help системы
-    requests = need_help_system.get_user_requests(user_id) # type: ignore
+    # Получаем запросы из need_help системы (по индексу пользователя)
+    requests = await async_request_system.get_user_requests(user_id)
     
     if not requests:
         await update.message.reply_text(
@@ -640,10 +710,7 @@ async def show_active_requests(update: Update, context: ContextTypes.DEFAULT_TYP
         return
     
     # Фильтруем активные запросы
-    active_requests = [
-        req for req in requests 
-        if req.get('is_active', False) and req.get('status') in ['open', 'in_progress']
-    ]
+    active_requests = [req for req in requests if req.get('status') != 'closed']
     
     if not active_requests:
         await update.message.reply_text(
@@ -670,7 +737,7 @@ async def show_active_requests(update: Update, context: ContextTypes.DEFAULT_TYP
             f"💰 {request.get('budget', 'Без бюджета')}\n"
             f"📊 Откликов: {request.get('applications_count', 0)}\n"
             f"📅 {time_ago}\n"
-            f"📋 Статус: {request.get('status', 'unknown')}"
+            f"📋 Статус: {request.get('status') or 'active'}"
         )
         
         keyboard = [[
@@ -700,6 +767,44 @@ async def show_active_requests(update: Update, context: ContextTypes.DEFAULT_TYP
             reply_markup=get_requests_main_keyboard()
         )
 
+async def show_request_chat(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Переписка по запросу: view_chat_<id> и «загрузить ранние» chat_older_<id>_<before_id>"""
+    query = update.callback_query
+    await query.answer()
+    
+    before_id = None
+    if query.data.startswith("chat_older_"):
+        request_id, before = query.data[len("chat_older_"):].rsplit("_", 1)
+        before_id = int(before)
+    else:
+        request_id = query.data[len("view_chat_"):]
+    
+    # Берём на одно сообщение больше, чтобы понять, есть ли более ранние
+    messages = await async_request_manager.get_request_messages(
+        request_id, limit=CHAT_PAGE_SIZE + 1, before_id=before_id
+    )
+    has_older = len(messages) > CHAT_PAGE_SIZE
+    messages = messages[-CHAT_PAGE_SIZE:]
+    
+    if messages:
+        lines = [f"💬 Чат по запросу #{request_id}", ""]
+        for msg in messages:
+            lines.append(f"{msg['sender_name']} ({get_time_ago(msg['timestamp'])}): {msg['message']}")
+        text = "\n".join(lines)
+    else:
+        text = f"💬 Чат по запросу #{request_id}\n\nСообщений пока нет."
+    
+    keyboard = list(get_request_chat_keyboard(request_id).inline_keyboard)
+    if has_older:
+        keyboard.insert(0, [InlineKeyboardButton(
+            "⬆️ Загрузить ранние", callback_data=f"chat_older_{request_id}_{messages[0]['id']}"
+        )])
+    
+    if before_id is None:
+        await query.message.reply_text(text, reply_markup=InlineKeyboardMarkup(keyboard))
+    else:
+        await query.edit_message_text(text, reply_markup=InlineKeyboardMarkup(keyboard))
+
 async def cancel_requests_flow(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Отменяет текущий процесс"""
     await update.message.reply_text(
@@ -759,7 +864,7 @@ async def handle_request_callback(update: Update, context: ContextTypes.DEFAULT_
         rid = parts[0]
         action = parts[1] if len(parts) > 1 else "view"
 
-    req = request_system.get_request_by_id(rid)
+    req = await async_request_system.get_request_by_id(rid)
     if not req:
         await query.answer("Заявка не найдена")
         return
@@ -791,7 +896,8 @@ async def handle_request_callback(update: Update, context: ContextTypes.DEFAULT_
                     f"🤝 Отклик на вашу заявку #{req.get('id')} от @{user.username or user.full_name}\n"
                     f"Свяжитесь: @{user.username}" if user.username else f"Свяжитесь: {user.full_name}"
                 )
-                await context.bot.send_message(chat_id=int(target_user_id), text=send_text)
+                # Уведомление идёт через общую очередь с учётом лимитов Telegram
+                send_queue.enqueue(int(target_user_id), send_text, priority=PRIORITY_NOTIFICATION)
                 await query.answer("Отклик отправлен автору заявки")
             except Exception:
                 logger.exception("Ошибка при отправке отклика автору заявки")
@@ -799,9 +905,7 @@ async def handle_request_callback(update: Update, context: ContextTypes.DEFAULT_
             return
 
         elif action == "close":
-            req['status'] = 'closed'
-            req['closed_at'] = req.get('closed_at') or datetime.utcnow().isoformat()
-            request_system._save()
+            await async_request_system.close_request(rid)
             try:
                 # убрать inline-клавиатуру у исходного сообщения, если есть
                 if query.message:
@@ -0,0 +1,139 @@
+# search_index.py
+"""
+Инвертированный индекс для поиска заявок.
+
+Текст приводится к нижнему регистру, «ё» заменяется на «е», у русских слов
+отрезаются типичные окончания (упрощённый стеммер в духе Snowball), так что
+«программирование», «программированию» и «программирования» дают один терм.
+Индекс обновляется по одной заявке при создании и закрытии, поиск
+не перебирает все заявки — только списки документов для термов запроса.
+"""
+import re
+import math
+import heapq
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+_CYRILLIC_RE = re.compile(r'[а-я]')
+
+# Окончания проверяются от длинных к коротким
+_REFLEXIVE = ('ся', 'сь')
+_ENDINGS = tuple(sorted({
+    # прилагательные и причастия
+    'ее', 'ие', 'ые', 'ое', 'ими', 'ыми', 'ей', 'ий', 'ый', 'ой', 'ем', 'им', 'ым', 'ом',
+    'его', 'ого', 'ему', 'ому', 'их', 'ых', 'ую', 'юю', 'ая', 'яя', 'ою', 'ею',
+    'ивш', 'ывш', 'ующ', 'ащ', 'ящ', 'ущ', 'ющ', 'ем', 'нн', 'вш',
+    # глаголы
+    'ла', 'на', 'ете', 'йте', 'ли', 'ло', 'но', 'ет', 'ют', 'ны', 'ть', 'ешь', 'нно',
+    'ила', 'ыла', 'ена', 'ейте', 'уйте', 'ите', 'или', 'ыли', 'ил', 'ыл', 'ен',
+    'ило', 'ыло', 'ено', 'ят', 'ует', 'уют', 'ит', 'ыт', 'ены', 'ить', 'ыть', 'ишь',
+    # существительные
+    'а', 'ев', 'ов', 'ье', 'е', 'иями', 'ями', 'ами', 'еи', 'ии', 'и', 'ией', 'й',
+    'иям', 'ям', 'ием', 'ам', 'о', 'у', 'ах', 'иях', 'ях', 'ы', 'ь', 'ию', 'ью', 'ю',
+    'ия', 'ья', 'я', 'ость', 'ост', 'ние', 'ния', 'нию', 'нием', 'ниями', 'ниях',
+}, key=len, reverse=True))
+
+# Короче этой длины основа не укорачивается
+MIN_STEM_LENGTH = 3
+
+
+def normalize_text(text: str) -> str:
+    """Нижний регистр и замена ё на е"""
+    return (text or '').lower().replace('ё', 'е')
+
+
+def stem(word: str) -> str:
+    """Отрезает окончание русского слова; остальные слова не меняет"""
+    if not _CYRILLIC_RE.search(word):
+        return word
+    for suffix in _REFLEXIVE:
+        if word.endswith(suffix) and len(word) - len(suffix) >= MIN_STEM_LENGTH:
+            word = word[:-len(suffix)]
+            break
+    for suffix in _ENDINGS:
+        if word.endswith(suffix) and len(word) - len(suffix) >= MIN_STEM_LENGTH:
+            return word[:-len(suffix)]
+    return word
+
+
+def tokenize(text: str) -> List[str]:
+    """Разбивает текст на нормализованные термы"""
+    return [stem(w) for w in _WORD_RE.findall(normalize_text(text)) if len(w) > 1 or w.isdigit()]
+
+
+def _doc_order(doc_id: str):
+    # Более новые заявки (с большим id) выше при равной релевантности
+    return int(doc_id) if str(doc_id).isdigit() else 0
+
+
+class SearchIndex:
+    """Инвертированный индекс: терм -> {id документа: частота}"""
+
+    def __init__(self):
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._docs: Dict[str, Counter] = {}
+        self._categories: Dict[str, str] = {}
+        self._lock = threading.RLock()
+
+    def add(self, doc_id, text: str, category: Optional[str] = None):
+        """Добавляет или переиндексирует документ"""
+        doc_id = str(doc_id)
+        terms = Counter(tokenize(text))
+        with self._lock:
+            self._remove(doc_id)
+            self._docs[doc_id] = terms
+            self._categories[doc_id] = normalize_text(category)
+            for term, tf in terms.items():
+                self._postings.setdefault(term, {})[doc_id] = tf
+
+    def _remove(self, doc_id: str):
+        terms = self._docs.pop(doc_id, None)
+        self._categories.pop(doc_id, None)
+        if not terms:
+            return
+        for term in terms:
+            posting = self._postings.get(term)
+            if posting is None:
+                continue
+            posting.pop(doc_id, None)
+            if not posting:
+                del self._postings[term]
+
+    def remove(self, doc_id):
+        """Удаляет документ из индекса"""
+        with self._lock:
+            self._remove(str(doc_id))
+
+    def search(self, query: str, category: Optional[str] = None,
+               limit: int = 10, offset: int = 0) -> Tuple[List[str], int]:
+        """
+        Возвращает (id документов на странице, общее число найденных).
+        Документы, где встречается больше термов запроса, идут выше (TF-IDF).
+        """
+        terms = set(tokenize(query))
+        category = normalize_text(category) if category and category != 'Все' else None
+
+        with self._lock:
+            total_docs = len(self._docs) or 1
+            if not terms:
+                scores = {doc_id: 0.0 for doc_id in self._docs}
+            else:
+                scores: Dict[str, float] = {}
+                for term in terms:
+                    posting = self._postings.get(term)
+                    if not posting:
+                        continue
+                    idf = math.log(1 + total_docs / len(posting))
+                    for doc_id, tf in posting.items():
+                        scores[doc_id] = scores.get(doc_id, 0.0) + idf * (1 + math.log(tf))
+            if category:
+                scores = {d: s for d, s in scores.items() if self._categories.get(d) == category}
+
+        # Сортируется только то, что нужно для страницы, а не все найденные документы
+        top = heapq.nlargest(offset + limit, scores, key=lambda d: (scores[d], _doc_order(d)))
+        return top[offset:], len(scores)
+
+    def __len__(self) -> int:
+        return len(self._docs)
@@ -0,0 +1,465 @@
+# send_queue.py
+"""
+Очередь исходящих сообщений с учётом лимитов Telegram.
+
+Telegram ограничивает бота примерно 30 сообщениями в секунду в целом и
+одним сообщением в секунду в один чат; при превышении Bot API отвечает
+429 (RetryAfter). Лимиты соблюдает BotRateLimiter — он подключается через
+ApplicationBuilder.rate_limiter, поэтому через него проходит каждый вызов
+Bot API, в том числе reply_text и edit_message_text в обработчиках:
+глобальный token bucket, небольшой запас сообщений на чат, две полосы
+приоритета (ответы раньше рассылок) и повтор после RetryAfter.
+
+Уведомления и рассылки, которых не нужно ждать, ставятся в очередь:
+
+    send_queue.enqueue(chat_id, text, priority=PRIORITY_NOTIFICATION)
+
+Очередь не держит собственного лимита — её сообщения идут через тот же
+BotRateLimiter в полосе своего приоритета, а чат выбирает по его запасу
+(chat_delay), чтобы не занимать слоты отправки ожиданием одного чата; она
+даёт накопление без ожидания, повтор при сетевых ошибках и метрики
+(глубина очереди, задержка отправки).
+"""
+import os
+import time
+import heapq
+import asyncio
+import logging
+import itertools
+from collections import Counter, deque
+from typing import Any, Dict, Optional
+
+from telegram.error import BadRequest, ChatMigrated, Forbidden, NetworkError, RetryAfter
+from telegram.ext import BaseRateLimiter
+
+logger = logging.getLogger(__name__)
+
+SEND_GLOBAL_RATE = float(os.getenv('SEND_GLOBAL_RATE', '30'))
+SEND_CHAT_INTERVAL = float(os.getenv('SEND_CHAT_INTERVAL', '1.0'))
+# Сколько сообщений подряд можно отправить в один чат без интервала
+SEND_CHAT_BURST = int(os.getenv('SEND_CHAT_BURST', '3'))
+SEND_CONCURRENCY = int(os.getenv('SEND_CONCURRENCY', '8'))
+SEND_MAX_RETRIES = int(os.getenv('SEND_MAX_RETRIES', '3'))
+
+# Полосы приоритета: меньше — раньше
+PRIORITY_INTERACTIVE = 0
+PRIORITY_NOTIFICATION = 1
+_LANE_NAMES = {PRIORITY_INTERACTIVE: 'interactive', PRIORITY_NOTIFICATION: 'notification'}
+
+# Сколько последних задержек хранить для метрик
+_LATENCY_WINDOW = 1000
+# При стольких чатах в таблице лимитов забываются чаты с полным запасом
+_CHAT_TABLE_PRUNE = 10000
+
+
+class TokenBucket:
+    """Token bucket: rate токенов в секунду, запас не больше capacity"""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, now: Optional[float] = None) -> bool:
+        """Забирает токен, если он есть"""
+        self._refill(time.monotonic() if now is None else now)
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return True
+        return False
+
+    def delay(self, now: Optional[float] = None) -> float:
+        """Через сколько секунд появится следующий токен (now — сначала пополнить)"""
+        if now is not None:
+            self._refill(now)
+        return max(0.0, (1 - self._tokens) / self.rate)
+
+    def is_full(self, now: float) -> bool:
+        self._refill(now)
+        return self._tokens >= self.capacity
+
+    async def acquire(self):
+        """Ждёт, пока появится токен, и забирает его"""
+        while not self.try_acquire():
+            await asyncio.sleep(self.delay())
+
+
+class SharedTokenBucket(TokenBucket):
+    """
+    Token bucket в общей памяти процессов (sharding.py): один лимит Telegram
+    на все шарды, и рассылка в одном шарде может занять его целиком
+    """
+
+    def __init__(self, ctx, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        # [токены, момент пополнения]; time.monotonic() общий для процессов одной машины
+        self._state = ctx.RawArray('d', [self.capacity, time.monotonic()])
+        self._lock = ctx.Lock()
+
+    def try_acquire(self, now: Optional[float] = None) -> bool:
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            tokens = min(self.capacity, self._state[0] + max(0.0, now - self._state[1]) * self.rate)
+            self._state[1] = max(now, self._state[1])
+            taken = tokens >= 1
+            self._state[0] = tokens - 1 if taken else tokens
+        return taken
+
+    def delay(self, now: Optional[float] = None) -> float:
+        return max(0.0, (1 - self._state[0]) / self.rate)
+
+    def is_full(self, now: float) -> bool:
+        return self._state[0] >= self.capacity
+
+
+class BotRateLimiter(BaseRateLimiter):
+    """
+    Лимиты Telegram для всех запросов бота (ApplicationBuilder.rate_limiter).
+
+    Приоритет передаётся в rate_limit_args={'priority': ...}; без него запрос
+    считается ответом пользователю. Запросы полосы уведомлений пропускают
+    вперёд ожидающие ответы: ждут события «полоса выше опустела». После RetryAfter приостанавливаются все запросы,
+    затем запрос повторяется (не больше max_retries раз).
+    """
+
+    def __init__(self, rate: float = SEND_GLOBAL_RATE, chat_interval: float = SEND_CHAT_INTERVAL,
+                 chat_burst: int = SEND_CHAT_BURST, max_retries: int = SEND_MAX_RETRIES):
+        self.chat_interval = chat_interval
+        self.chat_burst = max(1, chat_burst)
+        self.max_retries = max_retries
+        self._bucket = TokenBucket(rate)
+        self._chats: Dict[Any, TokenBucket] = {}
+        self._waiting = Counter()
+        # Событие на полосу: set, пока в ней никто не ждёт. Привязано к циклу событий
+        self._lane_events: Dict[int, asyncio.Event] = {}
+        self._events_loop = None
+        self._paused_until = 0.0
+        self._counters = {'requests': 0, 'throttled': 0, 'retry_after': 0}
+
+    @property
+    def rate(self) -> float:
+        return self._bucket.rate
+
+    def share_bucket(self, bucket: TokenBucket):
+        """Общий лимит с другими процессами (SharedTokenBucket); полосы приоритета остаются свои"""
+        self._bucket = bucket
+
+    async def initialize(self) -> None:
+        logger.info("Лимит запросов Bot API: %.0f в секунду, %s подряд в чат, затем раз в %.1f с",
+                    self.rate, self.chat_burst, self.chat_interval)
+
+    async def shutdown(self) -> None:
+        pass
+
+    async def process_request(self, callback, args, kwargs, endpoint, data, rate_limit_args):
+        priority = PRIORITY_INTERACTIVE
+        if isinstance(rate_limit_args, dict):
+            priority = rate_limit_args.get('priority', PRIORITY_INTERACTIVE)
+        chat_id = data.get('chat_id')
+        self._counters['requests'] += 1
+
+        attempts = 0
+        while True:
+            await self.acquire(chat_id, priority)
+            try:
+                return await callback(*args, **kwargs)
+            except RetryAfter as e:
+                # Лимит общий для бота: приостанавливаем все запросы
+                attempts += 1
+                self._counters['retry_after'] += 1
+                self._paused_until = max(self._paused_until, time.monotonic() + e.retry_after)
+                logger.warning("RetryAfter %s с: %s, чат %s", e.retry_after, endpoint, chat_id)
+                if attempts > self.max_retries:
+                    raise
+
+    async def acquire(self, chat_id=None, priority: int = PRIORITY_INTERACTIVE):
+        """Ждёт разрешения на запрос в чат chat_id (None — запрос не к чату)"""
+        throttled = False
+        if chat_id is not None and self.chat_interval > 0:
+            chat = self._chat_bucket(chat_id)
+            while not chat.try_acquire():
+                throttled = True
+                await asyncio.sleep(chat.delay())
+
+        self._waiting[priority] += 1
+        self._lane_event(priority).clear()
+        try:
+            while True:
+                now = time.monotonic()
+                if self._paused_until > now:
+                    throttled = True
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                # Пока ждут запросы полосы выше, младшие полосы уступают им токены
+                busy = [p for p, n in self._waiting.items() if p < priority and n]
+                if busy:
+                    throttled = True
+                    await self._lane_event(min(busy)).wait()
+                    continue
+                if self._bucket.try_acquire(now):
+                    break
+                throttled = True
+                await asyncio.sleep(self._bucket.delay())
+        finally:
+            self._waiting[priority] -= 1
+            if not self._waiting[priority]:
+                self._lane_event(priority).set()
+        if throttled:
+            self._counters['throttled'] += 1
+
+    def _lane_event(self, priority: int) -> asyncio.Event:
+        loop = asyncio.get_running_loop()
+        if self._events_loop is not loop:
+            # Новый цикл событий (перезапуск приложения): старые события к нему не подходят
+            self._events_loop = loop
+            self._lane_events = {}
+        event = self._lane_events.get(priority)
+        if event is None:
+            event = self._lane_events[priority] = asyncio.Event()
+            if not self._waiting[priority]:
+                event.set()
+        return event
+
+    def chat_delay(self, chat_id, now: Optional[float] = None) -> float:
+        """Через сколько секунд в чат можно отправить без ожидания (для SendQueue)"""
+        bucket = self._chats.get(chat_id) if self.chat_interval > 0 else None
+        if bucket is None:
+            return 0.0
+        return bucket.delay(time.monotonic() if now is None else now)
+
+    def _chat_bucket(self, chat_id) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            if len(self._chats) >= _CHAT_TABLE_PRUNE:
+                now = time.monotonic()
+                self._chats = {c: b for c, b in self._chats.items() if not b.is_full(now)}
+            bucket = self._chats[chat_id] = TokenBucket(1 / self.chat_interval, self.chat_burst)
+        return bucket
+
+    def metrics(self) -> Dict[str, Any]:
+        """Счётчики запросов, ожидающих по полосам и текущий общий лимит"""
+        result = dict(self._counters)
+        result['waiting'] = {_LANE_NAMES.get(p, str(p)): n for p, n in self._waiting.items()}
+        result['rate'] = self.rate
+        return result
+
+
+class _Job:
+    __slots__ = ('chat_id', 'kwargs', 'priority', 'future', 'enqueued_at', 'attempts')
+
+    def __init__(self, chat_id, kwargs: Dict[str, Any], priority: int, future: asyncio.Future):
+        self.chat_id = chat_id
+        self.kwargs = kwargs
+        self.priority = priority
+        self.future = future
+        self.enqueued_at = time.monotonic()
+        self.attempts = 0
+
+
+class SendQueue:
+    """
+    Исходящая очередь: полосы приоритета при выборе сообщения, в чат — одно
+    сообщение за раз. Интервал на чат, общий лимит и RetryAfter — в BotRateLimiter
+    бота; очередь только спрашивает у него, готов ли чат (chat_delay)
+    """
+
+    def __init__(self, concurrency: int = SEND_CONCURRENCY, max_retries: int = SEND_MAX_RETRIES):
+        self.max_retries = max_retries
+        self._concurrency = concurrency
+        self._heap = []
+        self._seq = itertools.count()
+        # Чаты, сообщение в которые сейчас отправляется
+        self._busy = set()
+        self._bot = None
+        self._worker: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._inflight = set()
+
+        self._latencies = deque(maxlen=_LATENCY_WINDOW)
+        self._counters = {'sent': 0, 'failed': 0, 'retried': 0, 'retry_after': 0}
+
+    # --- жизненный цикл ---
+
+    def start(self, bot):
+        """Запускает обработку очереди в текущем цикле событий"""
+        if self._worker is not None:
+            return
+        self._bot = bot
+        self._wakeup = asyncio.Event()
+        self._slots = asyncio.Semaphore(self._concurrency)
+        self._worker = asyncio.create_task(self._run(), name='send-queue')
+        if getattr(bot, 'rate_limiter', None) is None:
+            logger.warning("У бота нет rate_limiter: очередь отправляет без общего лимита")
+        logger.info("Очередь отправки запущена (%s одновременно)", self._concurrency)
+
+    async def stop(self, timeout: float = 5.0):
+        """Дожидается отправки уже поставленных сообщений (не дольше timeout) и останавливается"""
+        if self._worker is None:
+            return
+        deadline = time.monotonic() + timeout
+        while (self._heap or self._inflight) and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+        if self._heap:
+            logger.warning("Очередь отправки остановлена, не отправлено: %s", len(self._heap))
+        for _, _, job in self._heap:
+            if not job.future.done():
+                job.future.cancel()
+        self._heap.clear()
+
+    # --- постановка в очередь ---
+
+    def enqueue(self, chat_id, text: Optional[str] = None, priority: int = PRIORITY_INTERACTIVE,
+                **kwargs) -> asyncio.Future:
+        """Ставит send_message в очередь; результат (Message или ошибка) — в возвращаемом future"""
+        if text is not None:
+            kwargs['text'] = text
+        future = asyncio.get_running_loop().create_future()
+        self._push(0.0, _Job(chat_id, kwargs, priority, future))
+        if self._worker is None:
+            logger.warning("Очередь отправки не запущена, сообщение для %s ждёт start()", chat_id)
+        return future
+
+    async def send(self, chat_id, text: Optional[str] = None, priority: int = PRIORITY_INTERACTIVE, **kwargs):
+        """Отправляет сообщение через очередь и ждёт результата"""
+        return await self.enqueue(chat_id, text, priority=priority, **kwargs)
+
+    def _push(self, ready_at: float, job: _Job):
+        # Порядок: приоритет, затем момент готовности, затем порядок постановки
+        heapq.heappush(self._heap, ((job.priority, ready_at, next(self._seq)), ready_at, job))
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    # --- обработка ---
+
+    def _pop_ready(self, now: float):
+        """
+        Первое по приоритету сообщение, которое уже можно отправить, или время
+        ожидания (None — ждать, пока освободится чат или придёт новое сообщение)
+        """
+        chat_delay = getattr(getattr(self._bot, 'rate_limiter', None), 'chat_delay', None)
+        deferred = []
+        job, wait = None, None
+        while self._heap:
+            key, ready_at, candidate = heapq.heappop(self._heap)
+            deferred.append((key, ready_at, candidate))
+            if candidate.chat_id in self._busy:
+                continue
+            chat_ready = ready_at
+            if chat_delay is not None:
+                chat_ready = max(chat_ready, now + chat_delay(candidate.chat_id, now))
+            if chat_ready <= now:
+                job = candidate
+                deferred.pop()
+                break
+            wait = chat_ready - now if wait is None else min(wait, chat_ready - now)
+        for item in deferred:
+            heapq.heappush(self._heap, item)
+        return job, wait
+
+    async def _run(self):
+        while True:
+            now = time.monotonic()
+            job, wait = self._pop_ready(now)
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            if job.future.cancelled():
+                continue
+            await self._slots.acquire()
+            self._busy.add(job.chat_id)
+            task = asyncio.create_task(self._deliver(job))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _deliver(self, job: _Job):
+        try:
+            job.attempts += 1
+            kwargs = dict(job.kwargs)
+            if getattr(self._bot, 'rate_limiter', None) is not None:
+                kwargs['rate_limit_args'] = {'priority': job.priority}
+            message = await self._bot.send_message(chat_id=job.chat_id, **kwargs)
+        except RetryAfter as e:
+            # Лимитер уже выждал и повторил запрос max_retries раз
+            self._counters['retry_after'] += 1
+            self._fail(job, e)
+        except (BadRequest, Forbidden, ChatMigrated) as e:
+            self._fail(job, e)
+        except NetworkError as e:
+            self._retry(job, e, delay=min(2 ** job.attempts, 30))
+        except Exception as e:
+            self._fail(job, e)
+        else:
+            self._counters['sent'] += 1
+            self._latencies.append(time.monotonic() - job.enqueued_at)
+            if not job.future.done():
+                job.future.set_result(message)
+        finally:
+            self._busy.discard(job.chat_id)
+            self._slots.release()
+            # Чат освободился: его следующее сообщение могло ждать
+            self._wakeup.set()
+
+    def _retry(self, job: _Job, error: Exception, delay: float):
+        if job.attempts > self.max_retries:
+            self._fail(job, error)
+            return
+        self._counters['retried'] += 1
+        self._push(time.monotonic() + delay, job)
+
+    def _fail(self, job: _Job, error: Exception):
+        self._counters['failed'] += 1
+        logger.error("Не удалось отправить сообщение в чат %s: %s", job.chat_id, error)
+        if not job.future.done():
+            job.future.set_exception(error)
+            # Для enqueue() без ожидания исключение не должно попадать в лог цикла событий
+            job.future.exception()
+
+    # --- метрики ---
+
+    def metrics(self) -> Dict[str, Any]:
+        """Глубина очереди по полосам, счётчики и задержка отправки (от постановки до ответа API)"""
+        depth = {name: 0 for name in _LANE_NAMES.values()}
+        for _, _, job in self._heap:
+            lane = _LANE_NAMES.get(job.priority, str(job.priority))
+            depth[lane] = depth.get(lane, 0) + 1
+        latencies = sorted(self._latencies)
+        result = dict(self._counters)
+        result.update({
+            'queue_depth': depth,
+            'in_flight': len(self._inflight),
+            'latency_avg': sum(latencies) / len(latencies) if latencies else 0.0,
+            'latency_p95': latencies[int(len(latencies) * 0.95) - 1] if latencies else 0.0,
+        })
+        return result
+
+
+rate_limiter = BotRateLimiter()
+send_queue = SendQueue()
+
+
+async def start_send_queue(application) -> None:
+    """Хук post_init для PTB"""
+    send_queue.start(application.bot)
+
+
+async def stop_send_queue(application) -> None:
+    """Хук post_shutdown для PTB: досылает поставленные сообщения"""
+    await send_queue.stop()
@@ -0,0 +1,354 @@
+# sharding.py
+"""
+Обработка обновлений несколькими процессами (SHARD_WORKERS > 1).
+
+Главный процесс только принимает обновления — long polling или webhook
+(BOT_MODE) — и раскладывает их по процессам-шардам по user_id % N.
+Все обновления одного пользователя попадают в один и тот же процесс,
+поэтому состояние диалогов (ConversationHandler) и очередь ответов
+пользователю остаются в нём, а нагрузка распределяется по ядрам.
+
+Каждый шард — обычное Application со всеми обработчиками (фабрика из
+bot.py), запущенное в отдельном процессе (spawn). Хранилища согласуются
+между процессами через SQLite и interprocess.py; JSON-хранилища заявок
+и предложений в этом режиме не поддерживаются.
+
+Раз в SHARD_HEALTH_INTERVAL секунд в лог пишется состояние шардов:
+жив ли процесс, давно ли был heartbeat, очередь и скорость обработки.
+Упавший шард перезапускается, его очередь сохраняется.
+"""
+import os
+import json
+import time
+import queue
+import signal
+import asyncio
+import logging
+import threading
+import multiprocessing
+from typing import Callable, Dict, List, Optional
+
+from telegram import Bot, Update
+from telegram.error import NetworkError, TimedOut
+from telegram.ext import TypeHandler
+
+from interprocess import SHARD_WORKERS
+from bot_metrics import InstrumentedRequest
+from metrics import METRICS_PORT, MetricsServer
+from send_queue import SEND_GLOBAL_RATE, SharedTokenBucket
+from webhook_server import (
+    BOT_MODE, WebhookServer, register_webhook, run_until_signal, running_application
+)
+
+logger = logging.getLogger(__name__)
+
+SHARD_HEALTH_INTERVAL = float(os.getenv('SHARD_HEALTH_INTERVAL', '30'))
+# Обновлений в очереди одного шарда; при заполнении приём ждёт
+SHARD_QUEUE_SIZE = int(os.getenv('SHARD_QUEUE_SIZE', '10000'))
+POLL_TIMEOUT = int(os.getenv('SHARD_POLL_TIMEOUT', '30'))
+
+# Группа обработчика-счётчика: после всех обработчиков бота
+_STATS_GROUP = 1000
+# Поля статистики шарда в общем массиве
+_HEARTBEAT, _RECEIVED, _PROCESSED = range(3)
+_STATS_FIELDS = 3
+
+
+def update_user_id(data: dict) -> int:
+    """Пользователь (или чат), от которого пришло обновление; 0 — если не найден"""
+    for value in data.values():
+        if not isinstance(value, dict):
+            continue
+        user = value.get('from') or value.get('user')
+        if isinstance(user, dict) and 'id' in user:
+            return int(user['id'])
+        chat = value.get('chat')
+        if isinstance(chat, dict) and 'id' in chat:
+            return int(chat['id'])
+    return 0
+
+
+def shard_for(user_id: int, workers: int) -> int:
+    # Не hash(): номер шарда должен совпадать между перезапусками
+    return abs(user_id) % workers
+
+
+def check_storage():
+    """JSON-хранилища заявок и предложений живут в памяти одного процесса"""
+    from request_store import REQUESTS_BACKEND
+    from offer_store import OFFERS_BACKEND
+    if 'json' in (REQUESTS_BACKEND, OFFERS_BACKEND):
+        raise RuntimeError(
+            "SHARD_WORKERS > 1 требует REQUESTS_BACKEND=sqlite и OFFERS_BACKEND=sqlite"
+        )
+
+
+# ===== ПРОЦЕСС-ШАРД =====
+
+def _worker_main(index: int, factory: Callable, inbox, stats, send_bucket=None):
+    if send_bucket is not None:
+        # Лимит Telegram общий для бота, а не для процесса
+        from send_queue import rate_limiter
+        rate_limiter.share_bucket(send_bucket)
+    application = factory()
+    base = index * _STATS_FIELDS
+
+    async def count_processed(update, context):
+        stats[base + _PROCESSED] += 1
+
+    application.add_handler(TypeHandler(Update, count_processed), group=_STATS_GROUP)
+    # Ctrl+C получает вся группа процессов; шарды останавливает главный процесс
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    run_until_signal(lambda stop_event: _worker_serve(application, index, inbox, stats, stop_event),
+                     signals=(signal.SIGTERM,))
+
+
+async def _worker_serve(application, index: int, inbox, stats, stop_event: asyncio.Event):
+    base = index * _STATS_FIELDS
+    loop = asyncio.get_running_loop()
+
+    def read_inbox():
+        # Блокирующее чтение multiprocessing.Queue — в отдельном потоке
+        while True:
+            raw = inbox.get()
+            if raw is None:
+                loop.call_soon_threadsafe(stop_event.set)
+                return
+            try:
+                update = Update.de_json(json.loads(raw), application.bot)
+            except Exception:
+                logger.exception("Шард %s: не удалось разобрать обновление", index)
+                continue
+            stats[base + _RECEIVED] += 1
+            loop.call_soon_threadsafe(application.update_queue.put_nowait, update)
+
+    async with running_application(application):
+        threading.Thread(target=read_inbox, name=f'shard-{index}-inbox', daemon=True).start()
+        logger.info("Шард %s запущен (pid %s)", index, os.getpid())
+        while not stop_event.is_set():
+            stats[base + _HEARTBEAT] = time.time()
+            try:
+                await asyncio.wait_for(stop_event.wait(), timeout=1.0)
+            except asyncio.TimeoutError:
+                pass
+    logger.info("Шард %s остановлен", index)
+
+
+# ===== ГЛАВНЫЙ ПРОЦЕСС =====
+
+class ShardDispatcher:
+    """Процессы-шарды, их очереди и статистика"""
+
+    def __init__(self, factory: Callable, workers: int = SHARD_WORKERS):
+        self.factory = factory
+        self.workers = workers
+        self._ctx = multiprocessing.get_context('spawn')
+        self.inboxes = [self._ctx.Queue(SHARD_QUEUE_SIZE) for _ in range(workers)]
+        self.stats = self._ctx.Array('d', workers * _STATS_FIELDS, lock=False)
+        # Один лимит отправки на все шарды: рассылка в одном шарде получает всю скорость,
+        # а не 1/N, и вместе с ответами других шардов не превышает SEND_GLOBAL_RATE
+        self.send_bucket = SharedTokenBucket(self._ctx, SEND_GLOBAL_RATE)
+        self.processes: List[Optional[multiprocessing.Process]] = [None] * workers
+        self.routed = [0] * workers
+        self.restarts = [0] * workers
+        self._last_report = (time.monotonic(), [0.0] * workers)
+        self._stopping = False
+
+    def start(self):
+        for index in range(self.workers):
+            self._start_worker(index)
+
+    def _start_worker(self, index: int):
+        # Окружение наследуется процессом: номер шарда
+        env = {'SHARD_INDEX': str(index)}
+        saved = {key: os.environ.get(key) for key in env}
+        os.environ.update(env)
+        try:
+            process = self._ctx.Process(
+                target=_worker_main,
+                args=(index, self.factory, self.inboxes[index], self.stats, self.send_bucket),
+                name=f'shard-{index}'
+            )
+            process.start()
+        finally:
+            for key, value in saved.items():
+                if value is None:
+                    os.environ.pop(key, None)
+                else:
+                    os.environ[key] = value
+        self.processes[index] = process
+
+    async def route(self, data: dict):
+        """Отправляет обновление в шард его пользователя"""
+        index = shard_for(update_user_id(data), self.workers)
+        raw = json.dumps(data, ensure_ascii=False)
+        try:
+            self.inboxes[index].put_nowait(raw)
+        except queue.Full:
+            # Шард не успевает: ждём места, не блокируя цикл событий
+            await asyncio.get_running_loop().run_in_executor(None, self.inboxes[index].put, raw)
+        self.routed[index] += 1
+
+    def report(self) -> List[Dict]:
+        """Состояние шардов и скорость обработки с прошлого отчёта"""
+        now, mono = time.time(), time.monotonic()
+        last_mono, last_processed = self._last_report
+        elapsed = max(mono - last_mono, 1e-6)
+        result = []
+        processed_now = []
+        for index, process in enumerate(self.processes):
+            base = index * _STATS_FIELDS
+            processed = self.stats[base + _PROCESSED]
+            processed_now.append(processed)
+            heartbeat = self.stats[base + _HEARTBEAT]
+            try:
+                depth = self.inboxes[index].qsize()
+            except NotImplementedError:  # macOS
+                depth = None
+            result.append({
+                'shard': index,
+                'pid': process.pid if process else None,
+                'alive': bool(process and process.is_alive()),
+                'heartbeat_age': now - heartbeat if heartbeat else None,
+                'routed': self.routed[index],
+                'received': int(self.stats[base + _RECEIVED]),
+                'processed': int(processed),
+                'rate': (processed - last_processed[index]) / elapsed,
+                'queue_depth': depth,
+                'restarts': self.restarts[index],
+            })
+        self._last_report = (mono, processed_now)
+        return result
+
+    def _log_report(self):
+        for s in self.report():
+            if not s['alive']:
+                state = 'остановлен' if self._stopping else 'не работает'
+            elif s['heartbeat_age'] is None or s['heartbeat_age'] > max(3.0, SHARD_HEALTH_INTERVAL):
+                state = 'не отвечает'
+            else:
+                state = 'ok'
+            logger.info(
+                "Шард %s [%s] pid %s: %.1f обновл./с, обработано %s из %s, в очереди %s, перезапусков %s",
+                s['shard'], state, s['pid'], s['rate'], s['processed'], s['routed'],
+                s['queue_depth'], s['restarts']
+            )
+
+    def restart_dead(self):
+        for index, process in enumerate(self.processes):
+            if self._stopping or process is None or process.is_alive():
+                continue
+            logger.error("Шард %s завершился (код %s), перезапуск", index, process.exitcode)
+            self.restarts[index] += 1
+            self._start_worker(index)
+
+    async def monitor(self):
+        while True:
+            await asyncio.sleep(SHARD_HEALTH_INTERVAL)
+            self.restart_dead()
+            self._log_report()
+
+    def stop(self, timeout: float = 15.0):
+        """Просит шарды остановиться, дожидается их и при необходимости завершает принудительно"""
+        self._stopping = True
+        for inbox in self.inboxes:
+            inbox.put(None)
+        deadline = time.monotonic() + timeout
+        for process in self.processes:
+            if process is None:
+                continue
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                logger.warning("Шард %s не остановился, завершаем принудительно", process.name)
+                process.terminate()
+                process.join()
+        self._log_report()
+
+
+class ShardedWebhookServer(WebhookServer):
+    """Webhook главного процесса: обновления уходят в шарды, а не в Application"""
+
+    def __init__(self, dispatcher: ShardDispatcher, **kwargs):
+        super().__init__(None, **kwargs)
+        self.dispatcher = dispatcher
+
+    async def dispatch(self, data: dict) -> int:
+        if 'update_id' not in data:
+            return 400
+        await self.dispatcher.route(data)
+        return 200
+
+
+async def poll_updates(bot: Bot, dispatcher: ShardDispatcher, allowed_updates=None):
+    """Long polling в главном процессе"""
+    await bot.delete_webhook()
+    offset = 0
+    try:
+        while True:
+            try:
+                updates = await bot.get_updates(offset=offset, timeout=POLL_TIMEOUT,
+                                                allowed_updates=allowed_updates)
+            except TimedOut:
+                continue
+            except NetworkError as e:
+                logger.warning("getUpdates: %s", e)
+                await asyncio.sleep(1)
+                continue
+            for update in updates:
+                await dispatcher.route(update.to_dict())
+                offset = update.update_id + 1
+    finally:
+        if offset:
+            # Подтверждаем полученные обновления, иначе после перезапуска Telegram пришлёт их снова
+            try:
+                await bot.get_updates(offset=offset, timeout=0, limit=1)
+            except NetworkError as e:
+                logger.warning("Не удалось подтвердить обновления: %s", e)
+
+
+async def serve_sharded(factory: Callable, bot: Bot, stop_event: asyncio.Event, mode: str = BOT_MODE,
+                        allowed_updates=None, workers: int = SHARD_WORKERS,
+                        server_kwargs: Optional[dict] = None) -> ShardDispatcher:
+    """Принимает обновления и раздаёт их шардам, пока не установлен stop_event"""
+    check_storage()
+    dispatcher = ShardDispatcher(factory, workers)
+    dispatcher.start()
+    logger.info("Запущено шардов: %s (%s)", workers, mode)
+    monitor = asyncio.create_task(dispatcher.monitor())
+    # Метрики главного процесса (getUpdates / setWebhook) — на METRICS_PORT, шарды слушают следующие
+    metrics_server = MetricsServer(port=METRICS_PORT) if METRICS_PORT else None
+    try:
+        if metrics_server is not None:
+            try:
+                await metrics_server.start()
+            except OSError as e:
+                logger.error(f"Не удалось запустить сервер метрик на порту {METRICS_PORT}: {e}")
+                metrics_server = None
+        async with bot:
+            if mode == 'webhook':
+                server = ShardedWebhookServer(dispatcher, **(server_kwargs or {}))
+                await register_webhook(bot, server.path, server.secret_token, allowed_updates)
+                await server.start()
+                try:
+                    await stop_event.wait()
+                finally:
+                    await server.stop()
+            else:
+                poller = asyncio.create_task(poll_updates(bot, dispatcher, allowed_updates))
+                await stop_event.wait()
+                poller.cancel()
+                await asyncio.gather(poller, return_exceptions=True)
+    finally:
+        monitor.cancel()
+        if metrics_server is not None:
+            await metrics_server.stop()
+        await asyncio.get_running_loop().run_in_executor(None, dispatcher.stop)
+    return dispatcher
+
+
+def run_sharded(factory: Callable, token: str, base_url: Optional[str] = None,
+                mode: str = BOT_MODE, allowed_updates=None):
+    """Блокирующий запуск главного процесса; factory() создаёт Application шарда"""
+    kwargs = {'base_url': base_url} if base_url else {}
+    bot = Bot(token, request=InstrumentedRequest(), get_updates_request=InstrumentedRequest(), **kwargs)
+    run_until_signal(lambda stop_event: serve_sharded(factory, bot, stop_event, mode, allowed_updates))
@@ -0,0 +1,96 @@
+# startup_profile.py
+"""
+Отчёт о времени запуска: `python bot.py --profile-startup`.
+
+install() до остальных импортов подменяет builtins.__import__ и
+записывает время импорта каждого модуля (собственное — без вложенных
+импортов — и суммарное). report() печатает самые медленные модули
+проекта и сторонние пакеты, время создания ленивых хранилищ
+(lazy.init_timings) и этапы запуска бота.
+"""
+import os
+import sys
+import time
+import builtins
+from typing import Dict, List, Tuple
+
+_PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+_original_import = builtins.__import__
+# Модуль -> [собственное время, суммарное время]
+_timings: Dict[str, List[float]] = {}
+# Суммарное время вложенных импортов для модулей, импортируемых сейчас
+_stack: List[List[float]] = []
+
+
+def _resolve(name: str, globals_, level: int) -> str:
+    if level == 0:
+        return name
+    package = (globals_ or {}).get('__package__') or ''
+    base = package.rsplit('.', level - 1)[0] if level > 1 else package
+    return f'{base}.{name}' if name else base
+
+
+def _timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+    full_name = _resolve(name, globals, level)
+    if full_name in sys.modules:
+        return _original_import(name, globals, locals, fromlist, level)
+    _stack.append([0.0])
+    started = time.perf_counter()
+    try:
+        return _original_import(name, globals, locals, fromlist, level)
+    finally:
+        elapsed = time.perf_counter() - started
+        nested = _stack.pop()[0]
+        if _stack:
+            _stack[-1][0] += elapsed
+        _timings[full_name] = [elapsed - nested, elapsed]
+
+
+def install():
+    builtins.__import__ = _timed_import
+
+
+def uninstall():
+    builtins.__import__ = _original_import
+
+
+def _is_project_module(name: str) -> bool:
+    module = sys.modules.get(name)
+    path = getattr(module, '__file__', None) or ''
+    return os.path.abspath(path).startswith(_PROJECT_DIR + os.sep)
+
+
+def _packages(timings: Dict[str, List[float]]) -> List[Tuple[str, float]]:
+    """Собственное время сторонних модулей, сложенное по пакетам верхнего уровня"""
+    totals: Dict[str, float] = {}
+    for name, (own, _) in timings.items():
+        if not _is_project_module(name):
+            package = name.split('.', 1)[0]
+            totals[package] = totals.get(package, 0.0) + own
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)
+
+
+def report(phases: List[Tuple[str, float]], top: int = 15) -> str:
+    """Текст отчёта; phases — этапы запуска (название, секунд)"""
+    from lazy import init_timings
+
+    lines = ['', 'Этапы запуска:']
+    for title, seconds in phases:
+        lines.append(f'  {title:<40}{seconds * 1000:>10.1f} мс')
+    lines.append(f"  {'итого':<40}{sum(s for _, s in phases) * 1000:>10.1f} мс")
+
+    own = sorted(((n, t) for n, t in _timings.items() if _is_project_module(n)),
+                 key=lambda item: item[1][0], reverse=True)
+    lines += ['', "Модули проекта (собственное / с вложенными импортами, мс):"]
+    for name, (self_time, total) in own[:top]:
+        lines.append(f'  {name:<40}{self_time * 1000:>10.1f}{total * 1000:>10.1f}')
+
+    lines += ['', 'Сторонние пакеты (мс):']
+    for name, seconds in _packages(_timings)[:top]:
+        lines.append(f'  {name:<40}{seconds * 1000:>10.1f}')
+
+    lines += ['', 'Создание хранилищ (мс):']
+    for name, seconds in sorted(init_timings.items(), key=lambda item: item[1], reverse=True):
+        lines.append(f'  {name:<40}{seconds * 1000:>10.1f}')
+    return '\n'.join(lines)
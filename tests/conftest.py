@@ -0,0 +1,39 @@
+# tests/conftest.py
+"""
+Общие настройки тестов: корень проекта в sys.path и рабочий каталог во
+временной папке, чтобы хранилища с путями вида data/... не трогали
+настоящие данные бота.
+
+Запуск из корня проекта:
+    python -m pytest -q
+"""
+import os
+import sys
+import asyncio
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+os.environ.setdefault('BOT_TOKEN', '123:abc')
+
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    """Каждый тест работает в своём временном каталоге"""
+    monkeypatch.chdir(tmp_path)
+    yield tmp_path
+    # Пути хранилищ относительные: всё отложенное пишем, пока каталог ещё текущий
+    from db_pool import close_all_pools
+    from write_behind import flusher
+    import id_sequence
+    flusher.flush_all()
+    close_all_pools()
+    id_sequence._sequences.clear()
+
+
+def run(coro):
+    """Выполняет корутину в новом цикле событий (без pytest-asyncio)"""
+    return asyncio.run(coro)
@@ -0,0 +1,87 @@
+# tests/test_async_storage.py
+import time
+import asyncio
+import threading
+
+from async_storage import AsyncStorage
+from lazy import LazyProxy
+from conftest import run
+
+
+class Storage:
+    def __init__(self):
+        self.threads = []
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+        self.name = 'storage'
+
+    def work(self, value):
+        with self._lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        self.threads.append(threading.get_ident())
+        time.sleep(0.02)
+        with self._lock:
+            self.active -= 1
+        return value * 2
+
+    def fail(self):
+        raise ValueError('boom')
+
+
+def test_runs_off_event_loop_thread():
+    storage = Storage()
+
+    async def main():
+        return await AsyncStorage(storage).work(21)
+
+    assert run(main()) == 42
+    assert storage.threads[0] != threading.get_ident()
+
+
+def test_calls_run_in_parallel():
+    storage = Storage()
+    wrapper = AsyncStorage(storage)
+
+    async def main():
+        await asyncio.gather(*(wrapper.work(i) for i in range(4)))
+
+    run(main())
+    assert storage.max_active > 1
+
+
+def test_exception_propagates():
+    wrapper = AsyncStorage(Storage())
+
+    async def main():
+        await wrapper.fail()
+
+    try:
+        run(main())
+    except ValueError as e:
+        assert str(e) == 'boom'
+    else:
+        raise AssertionError('ValueError expected')
+
+
+def test_plain_attribute_returned_as_is():
+    assert AsyncStorage(Storage()).name == 'storage'
+
+
+def test_lazy_target_created_in_io_thread():
+    created = []
+
+    class LazyStorage(Storage):
+        def __init__(self):
+            super().__init__()
+            created.append(threading.get_ident())
+
+    proxy = LazyProxy(LazyStorage, 'test_async_storage_lazy')
+    wrapper = AsyncStorage(proxy)
+    method = wrapper.work
+    assert not proxy.lazy_ready
+
+    run(method(1))
+    assert proxy.lazy_ready
+    assert created[0] != threading.get_ident()
@@ -0,0 +1,125 @@
+# tests/test_broadcast.py
+import asyncio
+
+import pytest
+
+import broadcast
+from async_storage import AsyncStorage
+from broadcast import BroadcastEngine, BroadcastStore
+from conftest import run
+
+USERS = list(range(1, 11))
+
+
+class FakeQueue:
+    """Отправляет сразу; после stop_after сообщений «процесс» останавливается"""
+
+    def __init__(self, stop_after=None):
+        self.sent = []
+        self.stop_after = stop_after
+        self.stopped = asyncio.Event() if stop_after else None
+
+    def enqueue(self, chat_id, text=None, priority=None, **kwargs):
+        future = asyncio.get_running_loop().create_future()
+        self.sent.append(chat_id)
+        if self.stop_after and len(self.sent) >= self.stop_after:
+            self.stopped.set()
+            return future  # недоставленное сообщение незавершённой порции
+        future.set_result(chat_id)
+        return future
+
+
+@pytest.fixture
+def store(workdir, monkeypatch):
+    monkeypatch.setattr(broadcast, 'next_recipients',
+                        lambda b, after_id, limit: [u for u in USERS if u > after_id][:limit])
+    return BroadcastStore(str(workdir / 'storage.db'))
+
+
+def test_resume_after_restart_from_checkpoint(store, monkeypatch):
+    first = FakeQueue(stop_after=5)
+    monkeypatch.setattr(broadcast, 'send_queue', first)
+
+    async def before_restart():
+        engine = BroadcastEngine(AsyncStorage(store), chunk_size=3)
+        b = await engine.start('hello')
+        await first.stopped.wait()
+        await engine.stop()
+        return b['id']
+
+    broadcast_id = run(before_restart())
+    b = store.get(broadcast_id)
+    # Сохранена только первая порция, вторая отправлялась в момент остановки
+    assert (b['status'], b['cursor'], b['sent']) == ('running', 3, 3)
+
+    second = FakeQueue()
+    monkeypatch.setattr(broadcast, 'send_queue', second)
+
+    async def after_restart():
+        engine = BroadcastEngine(AsyncStorage(store), chunk_size=3)
+        await engine.resume(shard=0, workers=1)
+        await asyncio.gather(*engine._tasks.values())
+
+    run(after_restart())
+    assert second.sent == USERS[3:]
+    b = store.get(broadcast_id)
+    assert (b['status'], b['cursor'], b['sent']) == ('done', 10, 10)
+
+
+def test_each_shard_resumes_its_own_broadcasts(store):
+    ids = [store.create('all', 'x', shard=shard)['id'] for shard in (0, 1, 2)]
+    assert [b['id'] for b in store.list_running(1, 3)] == [ids[1]]
+    # Шардов стало меньше: рассылка шарда 2 достаётся шарду 0
+    assert [b['id'] for b in store.list_running(0, 2)] == [ids[0], ids[2]]
+
+
+def test_cancelled_elsewhere_stops_at_checkpoint(store, monkeypatch):
+    queue = FakeQueue()
+    monkeypatch.setattr(broadcast, 'send_queue', queue)
+    b = store.create('all', 'x')
+    store.finish(b['id'], 'cancelled')
+
+    async def scenario():
+        engine = BroadcastEngine(AsyncStorage(store), chunk_size=3)
+        await engine._run(b)
+
+    run(scenario())
+    assert queue.sent == USERS[:3]
+    assert store.get(b['id'])['status'] == 'cancelled'
+
+
+class FakeMessage:
+    def __init__(self):
+        self.replies = []
+
+    async def reply_text(self, text, **kwargs):
+        self.replies.append(text)
+
+
+class FakeUpdate:
+    def __init__(self, user_id):
+        self.effective_user = type('User', (), {'id': user_id})()
+        self.message = FakeMessage()
+
+
+def test_cancel_command(store, monkeypatch):
+    monkeypatch.setattr(broadcast, 'ADMIN_ID', 42)
+    monkeypatch.setattr(broadcast, 'broadcast_engine', BroadcastEngine(AsyncStorage(store)))
+    running = store.create('all', 'x')
+    done = store.create('all', 'y')
+    store.finish(done['id'], 'done')
+
+    def command(user_id, *args):
+        update = FakeUpdate(user_id)
+        context = type('Context', (), {'args': list(args)})()
+        run(broadcast.broadcast_cancel_command(update, context))
+        return update.message.replies[-1]
+
+    assert command(7, str(running['id'])).startswith('⛔')
+    assert store.get(running['id'])['status'] == 'running'
+    assert command(42).startswith('Укажите номер')
+    assert command(42, 'abc').startswith('Укажите номер')
+    assert 'не найдена' in command(42, '999')
+    assert 'уже завершена (done)' in command(42, str(done['id']))
+    assert 'отменена' in command(42, f"#{running['id']}")
+    assert store.get(running['id'])['status'] == 'cancelled'
@@ -0,0 +1,54 @@
+# tests/test_db_bulk.py
+import pytest
+
+from database_utils import DatabaseManager
+
+
+@pytest.fixture
+def manager(workdir):
+    return DatabaseManager(str(workdir / 'data' / 'bot_database.db'))
+
+
+def _count(manager, table):
+    return manager.pool.get_connection().execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+
+
+def test_notifications_bulk_returns_ids_in_order(manager):
+    ids = manager.create_notifications_bulk([
+        (user_id, {'notification_type': 'new_request', 'title': 'Т', 'message': str(user_id),
+                   'data': {'request_id': user_id}})
+        for user_id in range(1, 6)
+    ])
+    assert len(ids) == 5 and ids == sorted(ids)
+    rows = manager.pool.get_connection().execute(
+        'SELECT notification_id, user_id, data FROM notifications ORDER BY notification_id').fetchall()
+    assert [(row[0], row[1]) for row in rows] == list(zip(ids, range(1, 6)))
+    assert rows[0][2] == '{"request_id": 1}'
+
+
+def test_messages_bulk(manager):
+    ids = manager.create_messages_bulk([(1, 2, {'request_id': i, 'message_text': f'm{i}'}) for i in range(4)])
+    assert len(set(ids)) == 4
+    assert _count(manager, 'messages') == 4
+
+
+def test_reviews_bulk_rolls_back_on_duplicate(manager):
+    manager.create_review(1, 2, {'request_id': 10, 'rating': 5, 'comment': 'ok'})
+    with pytest.raises(ValueError):
+        manager.create_reviews_bulk([
+            (1, 3, {'request_id': 11, 'rating': 4, 'comment': 'a'}),
+            (1, 2, {'request_id': 10, 'rating': 4, 'comment': 'повтор'}),
+        ])
+    assert _count(manager, 'reviews') == 1
+
+    with pytest.raises(ValueError):
+        manager.create_reviews_bulk([
+            (4, 5, {'rating': 4, 'comment': 'a'}),
+            (4, 5, {'rating': 3, 'comment': 'повтор внутри пакета'}),
+        ])
+    assert _count(manager, 'reviews') == 1
+
+    ids = manager.create_reviews_bulk([(4, 5, {'rating': 4, 'comment': 'a'}),
+                                       (4, 5, {'request_id': 12, 'rating': 3, 'comment': 'b'})])
+    assert len(ids) == 2
+    assert _count(manager, 'reviews') == 3
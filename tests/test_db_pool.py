@@ -0,0 +1,59 @@
+# tests/test_db_pool.py
+import threading
+
+from db_pool import ConnectionPool, get_pool, close_all_pools
+
+
+def test_connection_reused_within_thread(workdir):
+    pool = ConnectionPool(str(workdir / 'test.db'))
+    assert pool.get_connection() is pool.get_connection()
+
+
+def test_separate_connection_per_thread(workdir):
+    pool = ConnectionPool(str(workdir / 'test.db'))
+    main = pool.get_connection()
+    other = []
+    thread = threading.Thread(target=lambda: other.append(pool.get_connection()))
+    thread.start()
+    thread.join()
+    assert other[0] is not main
+
+
+def test_connection_is_configured(workdir):
+    pool = ConnectionPool(str(workdir / 'sub' / 'test.db'))
+    conn = pool.get_connection()
+    assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+    assert conn.execute('PRAGMA temp_store').fetchone()[0] == 2
+
+
+def test_writes_visible_across_threads(workdir):
+    pool = ConnectionPool(str(workdir / 'test.db'))
+    conn = pool.get_connection()
+    conn.execute('CREATE TABLE t (x INTEGER)')
+    conn.commit()
+
+    def insert():
+        c = pool.get_connection()
+        c.execute('INSERT INTO t VALUES (1)')
+        c.commit()
+
+    threads = [threading.Thread(target=insert) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert conn.execute('SELECT COUNT(*) FROM t').fetchone()[0] == 8
+
+
+def test_close_all_reopens_on_next_use(workdir):
+    pool = ConnectionPool(str(workdir / 'test.db'))
+    first = pool.get_connection()
+    pool.close_all()
+    second = pool.get_connection()
+    assert second is not first
+    second.execute('SELECT 1')
+
+
+def test_get_pool_shared_by_absolute_path(workdir):
+    assert get_pool('data/x.db') is get_pool(str(workdir / 'data' / 'x.db'))
+    close_all_pools()
@@ -0,0 +1,44 @@
+# tests/test_feed.py
+import pytest
+
+import need_help
+from async_storage import AsyncStorage
+from need_help import RequestSystem, get_feed_page
+from request_store import SQLiteRequestStore
+from conftest import run
+
+
+@pytest.fixture
+def system(workdir, monkeypatch):
+    system = RequestSystem(SQLiteRequestStore(str(workdir / 'storage.db')))
+    monkeypatch.setattr(need_help, 'async_request_system', AsyncStorage(system))
+    monkeypatch.setattr(need_help, 'FEED_PAGE_SIZE', 2)
+    return system
+
+
+def _page(**kwargs):
+    page = run(get_feed_page(**kwargs))
+    if page is None:
+        return None
+    text, markup = page
+    buttons = [b.callback_data for row in markup.inline_keyboard for b in row]
+    shown = [c.split('_')[1] for c in buttons if c.endswith('_view')]
+    nav = [c for c in buttons if c.startswith('feed_')]
+    return shown, nav
+
+
+def test_feed_pages_forward_and_back(system):
+    ids = [system.create_request({'user_id': 1, 'category': 'x', 'description': str(i)}) for i in range(5)]
+    newest = ids[::-1]
+
+    assert _page() == (newest[:2], [f'feed_next_{newest[1]}'])
+    assert _page(older_than=newest[1]) == (newest[2:4], [f'feed_prev_{newest[2]}', f'feed_next_{newest[3]}'])
+    assert _page(older_than=newest[3]) == (newest[4:], [f'feed_prev_{newest[4]}'])
+    assert _page(newer_than=newest[2]) == (newest[:2], [f'feed_next_{newest[1]}'])
+
+
+def test_closed_requests_skipped_and_empty_feed(system):
+    assert _page() is None
+    ids = [system.create_request({'user_id': 1, 'category': 'x'}) for _ in range(3)]
+    system.close_request(ids[1])
+    assert _page()[0] == [ids[2], ids[0]]
@@ -0,0 +1,61 @@
+# tests/test_id_sequence.py
+import threading
+import multiprocessing
+
+from id_sequence import IdSequence
+
+
+def _path(workdir, name='seq'):
+    return str(workdir / 'sequences' / f'{name}.json')
+
+
+def test_starts_after_seed_and_survives_restart(workdir):
+    seq = IdSequence('seq', _path(workdir), block_size=4, seed=lambda: 10)
+    assert [seq.next_id() for _ in range(3)] == [11, 12, 13]
+
+    # Остаток блока после перезапуска пропускается, но id не повторяются
+    restarted = IdSequence('seq', _path(workdir), block_size=4, seed=lambda: 0)
+    assert restarted.next_id() > 13
+
+
+def test_unique_across_threads(workdir):
+    seq = IdSequence('seq', _path(workdir), block_size=3)
+    ids = []
+    lock = threading.Lock()
+
+    def worker():
+        for _ in range(100):
+            value = seq.next_id()
+            with lock:
+                ids.append(value)
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(set(ids)) == 800
+
+
+def test_ensure_at_least(workdir):
+    seq = IdSequence('seq', _path(workdir), block_size=4)
+    seq.ensure_at_least(100)
+    assert seq.next_id() == 101
+    assert IdSequence('seq', _path(workdir)).next_id() > 101
+
+
+def _take_ids(path, count, queue):
+    seq = IdSequence('seq', path, block_size=5)
+    queue.put([seq.next_id() for _ in range(count)])
+
+
+def test_unique_across_processes(workdir):
+    ctx = multiprocessing.get_context('spawn')
+    queue = ctx.Queue()
+    processes = [ctx.Process(target=_take_ids, args=(_path(workdir), 50, queue)) for _ in range(3)]
+    for process in processes:
+        process.start()
+    ids = [value for _ in processes for value in queue.get(timeout=30)]
+    for process in processes:
+        process.join()
+    assert len(set(ids)) == 150
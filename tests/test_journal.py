@@ -0,0 +1,71 @@
+# tests/test_journal.py
+import json
+
+import journal
+from journal import JsonlJournal
+
+
+def test_append_and_patch_survive_reload(workdir):
+    path = str(workdir / 'data' / 'j.jsonl')
+    j = JsonlJournal(path)
+    j.append({'id': 1, 'text': 'a'})
+    j.append({'id': 2, 'text': 'b'})
+    j.patch(1, {'read': True})
+    assert j.patch(99, {'read': True}) is None
+    j.close()
+
+    j = JsonlJournal(path)
+    assert j.get(1) == {'id': 1, 'text': 'a', 'read': True}
+    assert len(j) == 2
+    assert j.next_id() == 3
+
+
+def test_torn_last_line_dropped(workdir):
+    path = str(workdir / 'j.jsonl')
+    j = JsonlJournal(path)
+    j.append({'id': 1})
+    j.close()
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('{"op": "put", "rec": {"id": 2')
+
+    j = JsonlJournal(path)
+    assert len(j) == 1
+    j.append({'id': 2})
+    j.close()
+    assert len(JsonlJournal(path)) == 2
+
+
+def test_compaction_keeps_records(workdir, monkeypatch):
+    monkeypatch.setattr(journal, 'COMPACT_MIN_OPS', 10)
+    path = str(workdir / 'j.jsonl')
+    j = JsonlJournal(path)
+    j.append({'id': 1, 'n': 0})
+    for n in range(1, 30):
+        j.patch(1, {'n': n})
+    with open(path, encoding='utf-8') as f:
+        assert len(f.readlines()) < 30
+    j.close()
+    assert JsonlJournal(path).get(1)['n'] == 29
+
+
+def test_legacy_import(workdir):
+    legacy = workdir / 'old.json'
+    legacy.write_text(json.dumps([{'id': 5, 'x': 1}, {'no_id': True}]), encoding='utf-8')
+    j = JsonlJournal(str(workdir / 'j.jsonl'), legacy_json_path=str(legacy))
+    assert [r['id'] for r in j.values()] == [5]
+    assert j.next_id() == 6
+
+
+def test_sync_reads_other_writer(workdir):
+    path = str(workdir / 'j.jsonl')
+    reader = JsonlJournal(path)
+    writer = JsonlJournal(path)
+    writer.append({'id': 1})
+    assert reader.sync()
+    assert reader.get(1) == {'id': 1}
+    assert not reader.sync()
+
+    writer.patch(1, {'x': 1})
+    writer.compact()
+    assert reader.sync()
+    assert reader.get(1) == {'id': 1, 'x': 1}
@@ -0,0 +1,55 @@
+# tests/test_lazy.py
+import os
+import sys
+import subprocess
+import threading
+
+from lazy import LazyProxy, init_timings, is_callable_attr, preload
+from conftest import ROOT
+
+
+class Counted:
+    created = 0
+
+    def __init__(self):
+        Counted.created += 1
+        self.value = 1
+
+    def ping(self):
+        return 'pong'
+
+
+def test_created_once_on_first_access():
+    Counted.created = 0
+    proxy = LazyProxy(Counted, 'test_lazy_counted')
+    assert not proxy.lazy_ready
+    assert is_callable_attr(proxy, 'ping')
+    assert not proxy.lazy_ready
+
+    threads = [threading.Thread(target=lambda: proxy.ping()) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert Counted.created == 1
+    proxy.value = 5
+    assert proxy.lazy_get().value == 5
+    assert 'test_lazy_counted' in init_timings
+
+
+def test_preload_by_name():
+    proxy = LazyProxy(Counted, 'test_lazy_preload')
+    preload('test_lazy_preload')
+    assert proxy.lazy_ready
+
+
+def test_import_bot_creates_no_storages(tmp_path):
+    code = ("import bot, lazy; "
+            "print(','.join(n for n, p in lazy._proxies.items() if p.lazy_ready))")
+    env = dict(os.environ, PYTHONPATH=str(ROOT), BOT_TOKEN='123:abc')
+    result = subprocess.run([sys.executable, '-c', code], cwd=tmp_path, env=env,
+                            capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == ''
+    # Ни одной базы или JSON-файла при импорте
+    assert not (tmp_path / 'data').exists() or not any((tmp_path / 'data').iterdir())
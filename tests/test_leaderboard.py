@@ -0,0 +1,50 @@
+# tests/test_leaderboard.py
+import random
+
+from rating import Leaderboard, RatingSystem, TOP_MIN_REVIEWS
+
+
+def test_leaderboard_orders_by_score():
+    board = Leaderboard()
+    for user_id, score in ((1, 2.0), (2, 3.5), (3, 1.0)):
+        board.upsert({'user_id': user_id, 'total_score': score})
+    board.upsert({'user_id': 3, 'total_score': 4.0})
+    assert [e['user_id'] for e in board.top(10)] == [3, 2, 1]
+    board.remove(2)
+    assert [e['user_id'] for e in board.top(1)] == [3]
+    assert len(board) == 2
+
+
+def test_top_users_match_full_recomputation(workdir):
+    system = RatingSystem()
+    rnd = random.Random(1)
+    for _ in range(200):
+        system.add_review(rnd.randint(1, 50), rnd.randint(1, 20), float(rnd.randint(1, 5)), 'ok')
+
+    expected = []
+    for user_id in range(1, 21):
+        data = system._ratings.get(str(user_id))
+        if data and data['total_reviews'] >= TOP_MIN_REVIEWS:
+            stats = system.get_user_stats(user_id)
+            score = (data['current_rating'] * 0.4 + stats['reliability_score'] / 100 * 4 * 0.4
+                     + min(data['total_reviews'] * 0.1, 2.0) * 0.2)
+            expected.append((-score, user_id))
+    expected.sort()
+    assert [u['user_id'] for u in system.get_top_users(10)] == [u for _, u in expected[:10]]
+
+
+def test_average_rating_and_reload(workdir):
+    system = RatingSystem()
+    assert system.get_average_rating() == (0.0, 0)
+    for reviewer in range(TOP_MIN_REVIEWS):
+        system.add_review(100 + reviewer, 7, 4.0, 'ok')
+    system.add_review(200, 8, 2.0, 'bad')
+    average, count = system.get_average_rating()
+    assert count == 2
+    assert average == round((system.get_user_rating(7)['current_rating'] + 2.0) / 2, 2)
+
+    from write_behind import flusher
+    flusher.flush_all()
+    reloaded = RatingSystem()
+    assert reloaded.get_average_rating() == (average, count)
+    assert [u['user_id'] for u in reloaded.get_top_users()] == [7]
@@ -0,0 +1,49 @@
+# tests/test_logging_setup.py
+import os
+import sys
+import logging
+import subprocess
+
+from logging_setup import BackgroundQueueHandler, SamplingFilter, parse_sampling
+from conftest import ROOT
+
+
+def _record(name, level=logging.INFO, msg='m', args=None):
+    return logging.LogRecord(name, level, __file__, 1, msg, args, None)
+
+
+def test_parse_sampling_skips_bad_parts():
+    assert parse_sampling('bot.updates=0.1, handlers=2,broken,x=abc,=0.5') == {
+        'bot.updates': 0.1, 'handlers': 1.0
+    }
+    assert parse_sampling('') == {}
+
+
+def test_sampling_uses_nearest_configured_logger():
+    sampling = SamplingFilter({'handlers': 0.0, 'handlers.about': 1.0})
+    assert not sampling.filter(_record('handlers.login'))
+    assert sampling.filter(_record('handlers.about.sub'))
+    assert sampling.filter(_record('other'))
+    # WARNING и выше не отбрасываются
+    assert sampling.filter(_record('handlers.login', logging.WARNING))
+    assert sampling.dropped == 1
+
+
+def test_mutable_args_formatted_immediately():
+    handler = BackgroundQueueHandler(None)
+    items = [1]
+    record = handler.prepare(_record('x', msg='items %s', args=(items,)))
+    items.append(2)
+    assert record.getMessage() == 'items [1]'
+    record = handler.prepare(_record('x', msg='id %s', args=(5,)))
+    assert record.args == (5,)
+
+
+def test_shard_writes_own_log_file(tmp_path):
+    code = ("import logging, logging_setup; logging_setup.setup_logging(); "
+            "logging.getLogger('t').info('hello'); logging_setup.stop_logging()")
+    env = dict(os.environ, PYTHONPATH=str(ROOT), LOG_FILE=str(tmp_path / 'bot.log'), SHARD_INDEX='2')
+    result = subprocess.run([sys.executable, '-c', code], env=env, capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    assert 'hello' in (tmp_path / 'bot.shard-2.log').read_text(encoding='utf-8')
+    assert not (tmp_path / 'bot.log').exists()
@@ -0,0 +1,90 @@
+# tests/test_metrics.py
+import os
+import sys
+import json
+import asyncio
+import subprocess
+
+from http_util import read_http_request, write_http_response
+from metrics import MetricsServer, Registry, api_responses, registry
+from conftest import ROOT, run
+
+
+def test_storage_modules_do_not_import_telegram(tmp_path):
+    code = ("import sys, async_storage, request_store, offer_store, database, repository; "
+            "print('telegram' in sys.modules)")
+    env = dict(os.environ, PYTHONPATH=str(ROOT))
+    result = subprocess.run([sys.executable, '-c', code], cwd=tmp_path, env=env,
+                            capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == 'False'
+
+
+def test_collector_counters_exported_as_counter():
+    reg = Registry()
+    reg.add_collector(lambda: [
+        ('x_depth', 'Глубина', (), {(): 3}),
+        ('x_sent_total', 'Отправлено', ('lane',), {('a',): 5}, 'counter'),
+    ])
+    text = reg.render()
+    assert '# TYPE x_depth gauge\nx_depth 3' in text
+    assert '# TYPE x_sent_total counter\nx_sent_total{lane="a"} 5' in text
+
+
+def test_queue_metrics_types():
+    text = registry.render()
+    assert '# TYPE bot_updates_processed_total counter' in text
+    assert '# TYPE bot_rate_limiter_events_total counter' in text
+    assert '# TYPE bot_updates_running gauge' in text
+
+
+def test_get_updates_request_instrumented():
+    import bot
+    from bot_metrics import InstrumentedRequest
+
+    application = bot.build_application()
+    get_updates_request, request = application.bot._request
+    assert isinstance(get_updates_request, InstrumentedRequest)
+    assert isinstance(request, InstrumentedRequest)
+
+    async def fake_api(reader, writer):
+        await read_http_request(reader)
+        write_http_response(writer, 200, json.dumps({'ok': True, 'result': []}).encode(),
+                            content_type='application/json', keep_alive=False)
+        await writer.drain()
+        writer.close()
+
+    async def scenario():
+        server = await asyncio.start_server(fake_api, '127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        request = InstrumentedRequest()
+        await request.initialize()
+        try:
+            await request.post(f'http://127.0.0.1:{port}/bot123:abc/getUpdates')
+        finally:
+            await request.shutdown()
+            server.close()
+            await server.wait_closed()
+
+    before = api_responses._values.get(('getUpdates', '200'), 0)
+    run(scenario())
+    assert api_responses._values[('getUpdates', '200')] == before + 1
+
+
+def test_metrics_endpoint():
+    async def scenario():
+        server = MetricsServer('127.0.0.1', 0)
+        await server.start()
+        try:
+            reader, writer = await asyncio.open_connection('127.0.0.1', server.port)
+            writer.write(b'GET /metrics HTTP/1.1\r\nHost: x\r\n\r\n')
+            await writer.drain()
+            response = await reader.read()
+            writer.close()
+            return response
+        finally:
+            await server.stop()
+
+    response = run(scenario()).decode('utf-8')
+    assert response.startswith('HTTP/1.1 200 OK')
+    assert 'bot_storage_call_duration_seconds' in response
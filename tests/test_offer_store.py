@@ -0,0 +1,75 @@
+# tests/test_offer_store.py
+import os
+import json
+
+import pytest
+
+from offer_store import JsonOfferStore, SQLiteOfferStore
+
+
+def _offer(category, rating, user_id=1):
+    return {'user_id': user_id, 'category': category, 'description': 'помогу', 'rating': rating}
+
+
+@pytest.fixture(params=['json', 'sqlite'])
+def store(request, workdir):
+    if request.param == 'json':
+        return JsonOfferStore(str(workdir / 'offers.json'), legacy_path=None)
+    return SQLiteOfferStore(str(workdir / 'storage.db'))
+
+
+def test_category_ranked_by_rating_over_whole_category(store):
+    best_old = store.insert(_offer('IT', 5))
+    for _ in range(10):
+        store.insert(_offer('IT', 1))
+    newest = store.insert(_offer('IT', 1))
+    store.insert(_offer('Дизайн', 4))
+    offers = store.list_by_category('it', limit=3)
+    assert [o['id'] for o in offers][:2] == [best_old['id'], newest['id']]
+    assert len(offers) == 3
+
+
+def test_inactive_offers_skipped(store):
+    store.insert(dict(_offer('IT', 5), is_active=False))
+    active = store.insert(_offer('IT', 1))
+    assert [o['id'] for o in store.list_by_category('IT')] == [active['id']]
+    assert store.list_user_ids_by_category('IT') == [1]
+
+
+def test_legacy_import_written_before_rename(workdir):
+    legacy = workdir / 'help_offers.json'
+    legacy.write_text(json.dumps([{'id': 7, 'user_id': 3, 'category': 'IT', 'rating': 2}]), encoding='utf-8')
+    path = workdir / 'offers.json'
+    store = JsonOfferStore(str(path), legacy_path=str(legacy))
+
+    assert not legacy.exists()
+    assert os.path.exists(str(legacy) + '.migrated')
+    # Файл записан сразу, без ожидания отложенной записи
+    saved = json.loads(path.read_text(encoding='utf-8'))
+    assert [o['legacy_id'] for o in saved] == [7]
+    assert store.list_by_user(3)[0]['legacy_id'] == 7
+
+
+def test_interrupted_legacy_import_not_duplicated(workdir):
+    legacy = workdir / 'help_offers.json'
+    legacy.write_text(json.dumps([{'id': 7, 'user_id': 3, 'category': 'IT'},
+                                  {'id': 8, 'user_id': 4, 'category': 'IT'}]), encoding='utf-8')
+    # Перенос уже записал первое предложение, но файл не переименован
+    (workdir / 'offers.json').write_text(json.dumps([{'id': 1, 'legacy_id': 7, 'user_id': 3,
+                                                     'category': 'IT'}]), encoding='utf-8')
+    store = JsonOfferStore(str(workdir / 'offers.json'), legacy_path=str(legacy))
+    assert sorted(o['legacy_id'] for o in store.list_by_category('IT')) == [7, 8]
+
+
+def test_sqlite_rating_column_added_to_old_table(workdir):
+    from db_pool import get_pool
+    conn = get_pool(str(workdir / 'storage.db')).get_connection()
+    with conn:
+        conn.execute("CREATE TABLE help_offers (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER, "
+                     "category TEXT, status TEXT NOT NULL DEFAULT 'active', created_at TEXT NOT NULL, "
+                     "data TEXT NOT NULL)")
+        for rating, created in ((5, '2024-01-01'), (1, '2024-02-01')):
+            conn.execute("INSERT INTO help_offers (user_id, category, status, created_at, data) "
+                         "VALUES (1, 'it', 'active', ?, ?)", (created, json.dumps({'rating': rating})))
+    store = SQLiteOfferStore(str(workdir / 'storage.db'))
+    assert [o['rating'] for o in store.list_by_category('IT')] == [5, 1]
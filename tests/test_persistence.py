@@ -0,0 +1,30 @@
+# tests/test_persistence.py
+from database_utils import DatabaseManager
+from persistence import SQLitePersistence, strip_secrets
+from conftest import run
+
+
+def test_strip_secrets_nested():
+    data = {'login_user_id': 1, 'password_hash': 'h',
+            'registration': {'phone': '+1', 'sms_code': '1234', 'password_hash': 'h'}}
+    assert strip_secrets(data) == {'login_user_id': 1, 'registration': {'phone': '+1'}}
+    # Данные в памяти не меняются
+    assert data['registration']['sms_code'] == '1234'
+
+
+def test_secrets_not_persisted(workdir):
+    db = DatabaseManager(str(workdir / 'data' / 'bot_database.db'))
+    data = {'login_attempts': 1, 'password_hash': 'h', 'registration': {'sms_code': '1234', 'phone': '+1'}}
+
+    async def save():
+        persistence = SQLitePersistence(db=db)
+        await persistence.update_user_data(42, data)
+        await persistence.flush()
+
+    async def load():
+        return await SQLitePersistence(db=db).get_user_data()
+
+    run(save())
+    raw = db.load_sessions('user_data')[0]['data']
+    assert 'password_hash' not in raw and '1234' not in raw
+    assert run(load()) == {42: {'login_attempts': 1, 'registration': {'phone': '+1'}}}
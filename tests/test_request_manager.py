@@ -0,0 +1,86 @@
+# tests/test_request_manager.py
+import pytest
+
+from requests import RequestManager
+
+
+@pytest.fixture
+def manager(workdir):
+    return RequestManager()
+
+
+def _notify(manager, user_id, n=1):
+    return [manager.create_notification(user_id, 'Заголовок', 'Текст', 'info') for _ in range(n)]
+
+
+def test_unread_newest_first_with_pages(manager):
+    ids = _notify(manager, 1, 5)
+    _notify(manager, 2)
+    assert manager.get_unread_count(1) == 5
+    assert [n['id'] for n in manager.get_unread_notifications(1)] == ids[::-1]
+    assert [n['id'] for n in manager.get_unread_notifications(1, limit=2)] == [ids[4], ids[3]]
+    assert [n['id'] for n in manager.get_unread_notifications(1, limit=2, offset=4)] == [ids[0]]
+    assert manager.get_unread_notifications(1, limit=2, offset=5) == []
+
+
+def test_mark_read_updates_index_and_count(manager):
+    ids = _notify(manager, 1, 3)
+    manager.mark_notification_read(ids[1])
+    manager.mark_notification_read(ids[1])
+    manager.mark_notification_read(999)
+    assert manager.get_unread_count(1) == 2
+    assert [n['id'] for n in manager.get_unread_notifications(1)] == [ids[2], ids[0]]
+
+
+def test_unread_index_rebuilt_after_restart(manager):
+    ids = _notify(manager, 1, 3)
+    manager.mark_notification_read(ids[0])
+    manager.notifications.close()
+    manager.messages.close()
+
+    restarted = RequestManager()
+    assert restarted.get_unread_count(1) == 2
+    assert [n['id'] for n in restarted.get_unread_notifications(1)] == [ids[2], ids[1]]
+
+
+def test_messages_by_request_in_send_order(manager):
+    first = [manager.save_message(1, 10, 'А', 20, f'сообщение {i}') for i in range(5)]
+    other = manager.save_message(2, 10, 'А', 20, 'другая заявка')
+    assert [m['id'] for m in manager.get_request_messages(1)] == first
+    assert [m['id'] for m in manager.get_request_messages('2')] == [other]
+    # Каждое сообщение создаёт уведомление получателю
+    assert manager.get_unread_count(20) == 6
+
+
+def test_message_pages_before_id(manager):
+    ids = [manager.save_message(1, 10, 'А', 20, str(i)) for i in range(7)]
+    assert [m['id'] for m in manager.get_request_messages(1, limit=3)] == ids[4:]
+    assert [m['id'] for m in manager.get_request_messages(1, limit=3, before_id=ids[4])] == ids[1:4]
+    assert [m['id'] for m in manager.get_request_messages(1, limit=3, before_id=ids[1])] == ids[:1]
+    assert manager.get_request_messages(1, limit=3, before_id=ids[0]) == []
+
+
+def test_request_reviews_indexed_by_both_sides(manager):
+    manager.save_review(1, reviewer_id=10, reviewed_id=20, rating=5, comment='отлично')
+    manager.save_review(2, reviewer_id=11, reviewed_id=20, rating=2, comment='плохо')
+    manager.save_review(3, reviewer_id=10, reviewed_id=21, rating=4, comment='хорошо')
+    about = manager.get_user_reviews(20)
+    assert about['count'] == 2
+    assert about['average_rating'] == 3.5
+    assert [r['request_id'] for r in manager.get_reviews_given(10)] == [1, 3]
+    assert [r['request_id'] for r in manager.get_reviews_given(10, limit=1)] == [3]
+    assert manager.get_user_reviews(99) == {'count': 0, 'average_rating': 0, 'reviews': []}
+    with pytest.raises(ValueError):
+        manager.save_review(4, 10, 20, 6, 'слишком')
+
+
+def test_rating_reviews_indexed_by_both_sides(workdir):
+    from rating import RatingSystem
+    system = RatingSystem()
+    first = system.add_review(10, 20, 5.0, 'a')
+    second = system.add_review(11, 20, 4.0, 'b')
+    third = system.add_review(10, 21, 3.0, 'c')
+    assert [r['id'] for r in system.get_user_reviews(20)] == [second, first]
+    assert [r['id'] for r in system.get_reviews_given(10)] == [third, first]
+    assert system.count_reviews_given(10) == 2
+    assert system.get_reviews_given(10, limit=0) == []
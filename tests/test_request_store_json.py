@@ -0,0 +1,59 @@
+# tests/test_request_store_json.py
+import pytest
+
+from request_store import JsonRequestStore
+
+
+@pytest.fixture
+def store(workdir):
+    return JsonRequestStore(str(workdir / 'help_requests.json'))
+
+
+def _ids(items):
+    return [r['id'] for r in items]
+
+
+def test_update_keeps_position(store):
+    ids = [store.insert({'user_id': 1, 'category': 'Ремонт', 'title': str(i)}) for i in range(4)]
+    store.update(ids[1], {'title': 'изменено'})
+    store.update(ids[0], {'status': 'in_progress'})
+    assert _ids(store.list_by_user(1)) == ids[::-1]
+    assert _ids(store.list_by_category('ремонт')) == ids[::-1]
+    assert _ids(store.list_active(10)) == ids[::-1]
+
+
+def test_close_hides_from_active_lists(store):
+    ids = [store.insert({'user_id': 1, 'category': 'Ремонт'}) for _ in range(3)]
+    store.update(ids[1], {'status': 'closed'})
+    assert _ids(store.list_by_user(1)) == ids[::-1]
+    assert _ids(store.list_by_user(1, active_only=True)) == [ids[2], ids[0]]
+    assert _ids(store.list_by_category('Ремонт')) == [ids[2], ids[0]]
+    assert _ids(store.list_active(10)) == [ids[2], ids[0]]
+    assert [r['id'] for r in store.iter_active()] == [ids[2], ids[0]]
+
+
+def test_moving_between_users_and_categories(store):
+    first = store.insert({'user_id': 1, 'category': 'Ремонт'})
+    second = store.insert({'user_id': 1, 'category': 'Ремонт'})
+    store.update(first, {'user_id': 2, 'category': 'Уборка'})
+    assert _ids(store.list_by_user(1)) == [second]
+    assert _ids(store.list_by_user(2)) == [first]
+    assert _ids(store.list_by_category('уборка')) == [first]
+    assert _ids(store.list_by_category('ремонт')) == [second]
+
+
+def test_keyset_pages(store):
+    ids = [store.insert({'user_id': i, 'category': 'x'}) for i in range(5)]
+    store.update(ids[2], {'status': 'closed'})
+    assert _ids(store.list_active_page(2, older_than=ids[4])) == [ids[3], ids[1]]
+    assert _ids(store.list_active_page(2, newer_than=ids[0])) == [ids[3], ids[1]]
+
+
+def test_indexes_rebuilt_from_file(store, workdir):
+    ids = [store.insert({'user_id': 1, 'category': 'x'}) for _ in range(3)]
+    store.update(ids[0], {'status': 'closed'})
+    from write_behind import flusher
+    flusher.flush_all()
+    reloaded = JsonRequestStore(str(workdir / 'help_requests.json'))
+    assert _ids(reloaded.list_by_user(1)) == ids[::-1]
+    assert _ids(reloaded.list_active(10)) == [ids[2], ids[1]]
@@ -0,0 +1,80 @@
+# tests/test_request_store_sqlite.py
+import json
+
+import pytest
+
+from request_store import SQLiteRequestStore
+
+
+@pytest.fixture
+def store(workdir):
+    return SQLiteRequestStore(str(workdir / 'bot.db'))
+
+
+def _ids(items):
+    return [r['id'] for r in items]
+
+
+def _fill(store, count=6):
+    ids = [store.insert({'user_id': i % 2, 'category': 'Продукты', 'title': f'#{i}'}) for i in range(count)]
+    return ids
+
+
+def test_list_active_newest_first_without_closed(store):
+    ids = _fill(store)
+    store.update(ids[4], {'status': 'closed'})
+    assert _ids(store.list_active(10)) == [ids[5], ids[3], ids[2], ids[1], ids[0]]
+    assert _ids(store.list_active(2)) == [ids[5], ids[3]]
+
+
+def test_keyset_pages(store):
+    ids = _fill(store)
+    store.update(ids[2], {'status': 'closed'})
+    assert _ids(store.list_active_page(2, older_than=ids[5])) == [ids[4], ids[3]]
+    assert _ids(store.list_active_page(2, older_than=ids[3])) == [ids[1], ids[0]]
+    assert _ids(store.list_active_page(2, newer_than=ids[1])) == [ids[4], ids[3]]
+    assert store.list_active_page(2, older_than=ids[0]) == []
+
+
+def test_same_created_at_ordered_by_id(store):
+    conn = store.pool.get_connection()
+    with conn:
+        for i in range(3):
+            conn.execute(f'INSERT INTO {store.TABLE} (user_id, category, status, created_at, data) '
+                         f'VALUES (1, ?, ?, ?, ?)', ('x', 'active', '2024-01-01', json.dumps({'created_at': '2024-01-01'})))
+    assert _ids(store.list_active(3)) == ['3', '2', '1']
+    assert _ids(store.list_active_page(5, older_than='2')) == ['1']
+    assert _ids(store.list_active_page(5, newer_than='2')) == ['3']
+
+
+def test_by_user_and_category(store):
+    ids = _fill(store, 4)
+    store.update(ids[2], {'status': 'closed'})
+    assert _ids(store.list_by_user(0)) == [ids[2], ids[0]]
+    assert _ids(store.list_by_user(0, active_only=True)) == [ids[0]]
+    assert _ids(store.list_by_category(' продукты ', 10)) == [ids[3], ids[1], ids[0]]
+    assert {r['id'] for r in store.iter_active()} == {ids[0], ids[1], ids[3]}
+
+
+@pytest.mark.parametrize('sql, params', [
+    ("SELECT id, data FROM need_help_requests WHERE status != 'closed' "
+     "ORDER BY created_at DESC, id DESC LIMIT ?", (10,)),
+    ("SELECT id, data FROM need_help_requests WHERE status != 'closed' AND (created_at, id) < (?, ?) "
+     "ORDER BY created_at DESC, id DESC LIMIT ?", ('2024', 1, 10)),
+    ("SELECT id, data FROM need_help_requests WHERE category = ? AND status != 'closed' "
+     "ORDER BY created_at DESC, id DESC LIMIT ?", ('x', 10)),
+])
+def test_open_queries_use_partial_indexes(store, sql, params):
+    plan = ' '.join(row[3] for row in store.pool.get_connection().execute('EXPLAIN QUERY PLAN ' + sql, params))
+    assert 'idx_nhr_open_' in plan
+    assert 'TEMP B-TREE' not in plan
+
+
+def test_changes_since_in_commit_order(store):
+    start = store.last_rev()
+    a, b = _fill(store, 2)
+    store.update(a, {'status': 'closed'})
+    changed, rev = store.changes_since(start)
+    assert [(r['id'], r.get('status')) for r in changed] == [(b, None), (a, 'closed')]
+    assert rev == store.last_rev()
+    assert store.changes_since(rev) == ([], rev)
@@ -0,0 +1,65 @@
+# tests/test_search_index.py
+from search_index import SearchIndex, stem, tokenize
+
+
+def test_russian_word_forms_share_a_term():
+    assert stem('программирование') == stem('программированию') == stem('программирования')
+    assert tokenize('Ёлка и ЕЛКИ') == tokenize('елка и елки')
+
+
+def test_relevance_then_newest_first():
+    index = SearchIndex()
+    index.add(1, 'помощь с уборкой квартиры')
+    index.add(2, 'уборка')
+    index.add(3, 'ремонт квартиры и уборка квартиры')
+    ids, total = index.search('уборка квартиры')
+    assert total == 3
+    assert ids[0] == '3'
+    assert ids[-1] == '2'
+
+
+def test_pages_match_full_sort():
+    index = SearchIndex()
+    for i in range(1, 101):
+        index.add(i, 'уборка ' * (i % 7 + 1) + ('квартира' if i % 3 == 0 else ''))
+    full, total = index.search('уборка квартира', limit=1000)
+    assert total == 100
+    pages = []
+    for offset in range(0, 100, 15):
+        page, page_total = index.search('уборка квартира', limit=15, offset=offset)
+        assert page_total == 100
+        pages.extend(page)
+    assert pages == full
+
+
+def test_category_filter_and_remove():
+    index = SearchIndex()
+    index.add(1, 'выгул собаки', category='Животные')
+    index.add(2, 'выгул собаки', category='Другое')
+    assert index.search('собака', category='животные') == (['1'], 1)
+    assert index.search('собака', category='Все')[1] == 2
+    index.remove(1)
+    assert index.search('собака') == (['2'], 1)
+    assert len(index) == 1
+
+
+def test_reindex_replaces_terms():
+    index = SearchIndex()
+    index.add(1, 'ремонт')
+    index.add(1, 'уборка')
+    assert index.search('ремонт') == ([], 0)
+    assert index.search('уборка') == (['1'], 1)
+
+
+def test_request_system_picks_up_other_shard_changes(workdir):
+    from need_help import RequestSystem
+    from request_store import SQLiteRequestStore
+
+    path = str(workdir / 'storage.db')
+    mine = RequestSystem(SQLiteRequestStore(path), sync_index=True)
+    other = RequestSystem(SQLiteRequestStore(path), sync_index=True)
+
+    req_id = other.create_request({'user_id': 1, 'category': 'x', 'description': 'ремонт велосипеда'})
+    assert [r['id'] for r in mine.search_requests('велосипед')] == [req_id]
+    other.close_request(req_id)
+    assert mine.search_requests('велосипед') == []
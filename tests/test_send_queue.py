@@ -0,0 +1,187 @@
+# tests/test_send_queue.py
+import time
+import asyncio
+
+import pytest
+from telegram.error import RetryAfter
+
+from send_queue import (
+    BotRateLimiter, SendQueue, TokenBucket, PRIORITY_INTERACTIVE, PRIORITY_NOTIFICATION
+)
+from conftest import run
+
+
+def test_token_bucket_burst_then_rate():
+    bucket = TokenBucket(rate=10, capacity=2)
+    now = time.monotonic()
+    assert bucket.try_acquire(now) and bucket.try_acquire(now)
+    assert not bucket.try_acquire(now)
+    assert bucket.delay() == pytest.approx(0.1, abs=0.01)
+    assert bucket.try_acquire(now + 0.1)
+
+
+def test_global_rate_limits_all_requests():
+    limiter = BotRateLimiter(rate=20, chat_interval=0)
+
+    async def scenario():
+        started = time.monotonic()
+        for _ in range(30):
+            await limiter.acquire()
+        return time.monotonic() - started
+
+    # 20 запросов из запаса, ещё 10 — по 1/20 с
+    assert run(scenario()) >= 0.45
+
+
+def test_chat_interval_after_burst():
+    limiter = BotRateLimiter(rate=1000, chat_interval=0.2, chat_burst=2)
+
+    async def call(chat_id):
+        return await limiter.process_request(
+            lambda: asyncio.sleep(0, result=chat_id), (), {}, 'sendMessage', {'chat_id': chat_id}, None)
+
+    async def scenario():
+        started = time.monotonic()
+        await call(1)
+        await call(1)
+        await call(2)
+        burst = time.monotonic() - started
+        await call(1)
+        return burst, time.monotonic() - started
+
+    burst, total = run(scenario())
+    assert burst < 0.1
+    assert total >= 0.18
+
+
+def test_retry_after_pauses_and_retries():
+    limiter = BotRateLimiter(rate=1000, chat_interval=0, max_retries=2)
+    calls = []
+
+    async def callback():
+        calls.append(time.monotonic())
+        if len(calls) == 1:
+            raise RetryAfter(0.2)
+        return True
+
+    async def scenario():
+        result = await limiter.process_request(callback, (), {}, 'sendMessage', {'chat_id': 1}, None)
+        # Пауза действует и на другие запросы
+        return result
+
+    assert run(scenario()) is True
+    assert len(calls) == 2
+    assert calls[1] - calls[0] >= 0.19
+    assert limiter.metrics()['retry_after'] == 1
+
+
+def test_retry_after_gives_up_after_max_retries():
+    limiter = BotRateLimiter(rate=1000, chat_interval=0, max_retries=1)
+
+    async def callback():
+        raise RetryAfter(0)
+
+    with pytest.raises(RetryAfter):
+        run(limiter.process_request(callback, (), {}, 'sendMessage', {'chat_id': 1}, None))
+    assert limiter.metrics()['retry_after'] == 2
+
+
+def test_interactive_requests_go_before_notifications():
+    limiter = BotRateLimiter(rate=10, chat_interval=0)
+    order = []
+
+    async def request(name, priority):
+        await limiter.acquire(None, priority)
+        order.append(name)
+
+    async def scenario():
+        while limiter._bucket.try_acquire():
+            pass
+        tasks = [asyncio.create_task(request(f'n{i}', PRIORITY_NOTIFICATION)) for i in range(3)]
+        await asyncio.sleep(0)
+        tasks += [asyncio.create_task(request(f'i{i}', PRIORITY_INTERACTIVE)) for i in range(2)]
+        await asyncio.gather(*tasks)
+
+    run(scenario())
+    assert sorted(order[:2]) == ['i0', 'i1']
+
+
+class FakeBot:
+    def __init__(self, rate_limiter=None):
+        self.rate_limiter = rate_limiter
+        self.sent = []
+
+    async def send_message(self, chat_id, **kwargs):
+        self.sent.append((chat_id, kwargs))
+        return chat_id
+
+
+def test_queue_passes_priority_to_rate_limiter():
+    bot = FakeBot(rate_limiter=BotRateLimiter())
+    queue = SendQueue()
+
+    async def scenario():
+        queue.start(bot)
+        result = await queue.send(5, 'hi', priority=PRIORITY_NOTIFICATION)
+        await queue.stop()
+        return result
+
+    assert run(scenario()) == 5
+    assert bot.sent == [(5, {'text': 'hi', 'rate_limit_args': {'priority': PRIORITY_NOTIFICATION}})]
+
+
+def test_application_uses_rate_limiter():
+    import bot
+    from send_queue import rate_limiter
+
+    assert bot.build_application().bot.rate_limiter is rate_limiter
+
+
+class LimitedBot(FakeBot):
+    """Отправка через process_request лимитера, как у ExtBot"""
+
+    async def send_message(self, chat_id, rate_limit_args=None, **kwargs):
+        async def call():
+            self.sent.append((chat_id, kwargs['text']))
+            return chat_id
+        return await self.rate_limiter.process_request(
+            call, (), {}, 'sendMessage', {'chat_id': chat_id}, rate_limit_args)
+
+
+def test_queue_skips_chat_waiting_for_its_interval():
+    bot = LimitedBot(rate_limiter=BotRateLimiter(rate=1000, chat_interval=0.3, chat_burst=1))
+    queue = SendQueue(concurrency=1)
+
+    async def scenario():
+        queue.start(bot)
+        first = queue.enqueue(1, 'a1')
+        second = queue.enqueue(1, 'a2')
+        other = queue.enqueue(2, 'b1')
+        await asyncio.gather(first, second, other)
+        await queue.stop()
+
+    run(scenario())
+    # Пока чат 1 ждёт интервала, единственный слот отдан чату 2
+    assert [text for _, text in bot.sent] == ['a1', 'b1', 'a2']
+
+
+def _drain(bucket, queue):
+    queue.put(sum(bucket.try_acquire() for _ in range(10)))
+
+
+def test_shared_bucket_is_one_limit_for_all_processes():
+    import multiprocessing
+    from send_queue import SharedTokenBucket
+
+    ctx = multiprocessing.get_context('spawn')
+    bucket = SharedTokenBucket(ctx, rate=0.01, capacity=4)
+    queue = ctx.Queue()
+    process = ctx.Process(target=_drain, args=(bucket, queue))
+    process.start()
+    # Запас израсходован другим процессом целиком
+    assert queue.get(timeout=30) == 4
+    process.join()
+
+    shard = BotRateLimiter(chat_interval=0)
+    shard.share_bucket(bucket)
+    assert not shard._bucket.try_acquire()
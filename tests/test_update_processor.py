@@ -0,0 +1,72 @@
+# tests/test_update_processor.py
+import time
+import asyncio
+
+from telegram import Chat, Message, Update, User
+
+from update_processor import PerUserUpdateProcessor
+from conftest import run
+
+
+def _update(update_id: int, user_id: int) -> Update:
+    user = User(user_id, 'u', False)
+    message = Message(update_id, None, Chat(user_id, 'private'), from_user=user, text='x')
+    return Update(update_id, message=message)
+
+
+def test_parallel_users_ordered_per_user():
+    processor = PerUserUpdateProcessor(max_concurrent_updates=8, pending_limit=100)
+    done = {}
+
+    async def handle(user_id, n):
+        await asyncio.sleep(0.1)
+        done.setdefault(user_id, []).append(n)
+
+    async def scenario():
+        await processor.initialize()
+        started = time.monotonic()
+        await asyncio.gather(*(
+            processor.process_update(_update(user_id * 10 + n, user_id), handle(user_id, n))
+            for n in range(5) for user_id in range(1, 11)
+        ))
+        return time.monotonic() - started
+
+    elapsed = run(scenario())
+    # 10 пользователей × 5 обновлений по 100 мс: последовательно было бы 5 с
+    assert elapsed < 2.5
+    assert done == {user_id: list(range(5)) for user_id in range(1, 11)}
+    assert processor.metrics()['processed'] == 50
+    assert processor.metrics()['active_keys'] == 0
+
+
+def test_cancelled_while_waiting_closes_coroutine():
+    processor = PerUserUpdateProcessor(max_concurrent_updates=4, pending_limit=10)
+    started = []
+
+    async def handle(n, gate=None):
+        started.append(n)
+        if gate is not None:
+            await gate.wait()
+
+    async def scenario():
+        await processor.initialize()
+        gate = asyncio.Event()
+        first = asyncio.create_task(processor.process_update(_update(1, 7), handle(1, gate)))
+        await asyncio.sleep(0.01)
+        pending = handle(2)
+        second = asyncio.create_task(processor.process_update(_update(2, 7), pending))
+        await asyncio.sleep(0.01)
+        assert processor.metrics()['waiting'] == 1
+
+        second.cancel()
+        await asyncio.gather(second, return_exceptions=True)
+        gate.set()
+        await first
+        return pending
+
+    pending = run(scenario())
+    # Отменённое обновление не выполнялось, его корутина закрыта (без "never awaited")
+    assert started == [1]
+    assert pending.cr_frame is None
+    metrics = processor.metrics()
+    assert (metrics['waiting'], metrics['running'], metrics['active_keys']) == (0, 0, 0)
@@ -0,0 +1,140 @@
+# tests/test_user_cache.py
+import os
+import json
+import sqlite3
+import threading
+
+import pytest
+
+from database import Database
+from repository import UserRepository
+from request_store import SQLiteRequestStore, STORAGE_DB_PATH
+
+
+@pytest.fixture
+def database(workdir):
+    database = Database('data/bot.db')
+    database.create_user(100, 'Иван', '+700', 'a@b.c', 'hash')
+    return database
+
+
+def _lookup_twice(database):
+    database.get_user_by_telegram_id(100)
+    hits = database.user_cache.hits
+    database.get_user_by_telegram_id(100)
+    return database.user_cache.hits - hits
+
+
+def test_repeated_lookup_is_cached(database):
+    assert database.get_user_by_telegram_id(100)['full_name'] == 'Иван'
+    assert _lookup_twice(database) == 1
+    assert database.get_user_by_telegram_id(5) is None
+    assert database.get_user_by_telegram_id(5) is None
+    assert database.user_cache.hits >= 2
+
+
+def test_request_writes_keep_user_cache(database):
+    assert os.path.abspath(STORAGE_DB_PATH) != os.path.abspath('data/bot.db')
+    store = SQLiteRequestStore(STORAGE_DB_PATH)
+    database.get_user_by_telegram_id(100)
+
+    def insert():
+        store.insert({'user_id': 1, 'category': 'x'})
+
+    thread = threading.Thread(target=insert)
+    thread.start()
+    thread.join()
+    assert _lookup_twice(database) == 1
+    assert database.user_cache.misses == 1
+
+
+def test_external_user_write_invalidates(database):
+    assert database.get_user_by_telegram_id(100)['phone'] == '+700'
+    conn = sqlite3.connect('data/bot.db')
+    with conn:
+        conn.execute("UPDATE users SET phone = '+711' WHERE telegram_id = 100")
+    conn.close()
+    assert database.get_user_by_telegram_id(100)['phone'] == '+711'
+
+
+def test_own_update_refreshes_cache(database):
+    user = database.get_user_by_telegram_id(100)
+    database.update_user(user['id'], phone='+722')
+    assert database.get_user_by_telegram_id(100)['phone'] == '+722'
+
+
+def test_first_lookup_in_new_thread_sees_earlier_external_write(database):
+    assert database.get_user_by_telegram_id(100)['phone'] == '+700'
+    conn = sqlite3.connect('data/bot.db')
+    with conn:
+        conn.execute("UPDATE users SET phone = '+733' WHERE telegram_id = 100")
+    conn.close()
+
+    found = []
+    thread = threading.Thread(target=lambda: found.append(database.get_user_by_telegram_id(100)))
+    thread.start()
+    thread.join()
+    assert found[0]['phone'] == '+733'
+
+
+def test_cached_and_uncached_reads_agree_after_update(database):
+    user_id = database.get_user_by_telegram_id(100)['id']
+    database.update_user(user_id, phone='+744')
+    cached = database.get_user_by_telegram_id(100)
+    database.user_cache.clear()
+    assert cached == database.get_user_by_telegram_id(100)
+
+
+def test_login_moves_user_to_new_telegram_id(database):
+    user_id = database.get_user_by_telegram_id(100)['id']
+    assert database.get_user_by_telegram_id(300) is None
+    assert database.update_user(user_id, telegram_id=300)
+    assert database.get_user_by_telegram_id(100) is None
+    assert database.get_user_by_telegram_id(300)['full_name'] == 'Иван'
+
+
+def test_saved_profile_keeps_extra_fields(database):
+    assert database.create_or_update_user({
+        'telegram_id': '200', 'full_name': 'Пётр', 'email': 'P@Q.R ', 'password_hash': 'h',
+        'username': 'petr', 'phone_verified': True,
+    })
+    user = database.get_user_by_telegram_id(200)
+    assert (user['full_name'], user['email'], user['username'], user['phone_verified']) == \
+        ('Пётр', 'p@q.r', 'petr', True)
+    assert database.get_user_by_email('p@q.r')['telegram_id'] == 200
+
+    assert database.create_or_update_user({'telegram_id': 200, 'age': '30'})
+    user = database.get_user_by_telegram_id(200)
+    assert (user['full_name'], user['username'], user['age']) == ('Пётр', 'petr', '30')
+
+
+def test_profile_edit_is_visible_to_login(database):
+    repo = UserRepository(database)
+    assert repo.update_fields('100', email='new@b.c', phone='+755')
+    assert repo.get_by_email('new@b.c')['phone'] == '+755'
+    assert repo.get_by_email('a@b.c') is None
+    assert repo.list_ids() == [100]
+
+
+def test_duplicate_email_is_rejected(database):
+    assert not database.create_or_update_user({'telegram_id': 200, 'email': 'a@b.c'})
+    assert database.get_user_by_telegram_id(200) is None
+
+
+def test_users_json_is_imported_once(workdir):
+    existing = Database('data/bot.db')
+    existing.create_user(100, 'Иван', '+700', 'a@b.c', 'hash')
+    with open('data/users.json', 'w', encoding='utf-8') as f:
+        json.dump({
+            '100': {'telegram_id': '100', 'full_name': 'Иван Иванов', 'phone': '+799'},
+            '200': {'telegram_id': '200', 'full_name': 'Пётр', 'email': 'p@q.r',
+                    'password_hash': 'h', 'username': 'petr'},
+        }, f)
+
+    database = Database('data/bot.db')
+    assert not os.path.exists('data/users.json')
+    assert os.path.exists('data/users.json.imported')
+    assert database.list_telegram_ids() == [100, 200]
+    user = database.get_user_by_telegram_id(100)
+    assert (user['full_name'], user['phone'], user['password_hash']) == ('Иван Иванов', '+799', 'hash')
+    assert database.get_user_by_email('p@q.r')['username'] == 'petr'
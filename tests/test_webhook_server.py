@@ -0,0 +1,61 @@
+# tests/test_webhook_server.py
+import asyncio
+import json
+
+import pytest
+
+from http_util import HttpError, read_http_request
+from webhook_server import WebhookServer, webhook_secret
+from conftest import run
+
+
+class RecordingServer(WebhookServer):
+    def __init__(self, **kwargs):
+        super().__init__(None, **kwargs)
+        self.updates = []
+
+    async def dispatch(self, data: dict) -> int:
+        self.updates.append(data)
+        return 200
+
+
+def test_secret_required_without_webhook_url():
+    assert webhook_secret('s3cret', '') == 's3cret'
+    with pytest.raises(RuntimeError):
+        webhook_secret('', '')
+    generated = webhook_secret('', 'https://example.com')
+    assert len(generated) >= 32 and generated != webhook_secret('', 'https://example.com')
+
+
+def test_requests_without_valid_secret_rejected():
+    server = RecordingServer(path='/telegram', secret_token='s3cret')
+    body = json.dumps({'update_id': 1}).encode()
+
+    async def post(headers):
+        return await server._handle_request('POST', '/telegram', headers, body)
+
+    assert run(post({})) == 403
+    assert run(post({'x-telegram-bot-api-secret-token': 'wrong'})) == 403
+    assert run(post({'x-telegram-bot-api-secret-token': 's3cret'})) == 200
+    assert server.updates == [{'update_id': 1}] and server.rejected == 2
+
+
+def _read(raw: bytes):
+    async def scenario():
+        reader = asyncio.StreamReader()
+        reader.feed_data(raw)
+        reader.feed_eof()
+        return await read_http_request(reader, max_body=100)
+    return run(scenario())
+
+
+@pytest.mark.parametrize('length, status', [('-1', 400), ('abc', 400), ('101', 413)])
+def test_bad_content_length(length, status):
+    with pytest.raises(HttpError) as e:
+        _read(f'POST /telegram HTTP/1.1\r\nContent-Length: {length}\r\n\r\n'.encode())
+    assert e.value.status == status
+
+
+def test_reads_body():
+    method, path, headers, body = _read(b'POST /telegram HTTP/1.1\r\nContent-Length: 2\r\n\r\n{}')
+    assert (method, path, body) == ('POST', '/telegram', b'{}')
@@ -0,0 +1,74 @@
+# tests/test_write_behind.py
+import os
+import json
+import threading
+
+from write_behind import WriteBehindFlusher, atomic_write_text, dump_json
+
+
+def _read(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def test_changes_coalesced_into_one_write(workdir):
+    flusher = WriteBehindFlusher(interval_ms=60000)
+    path = str(workdir / 'data.json')
+    data = {}
+    for i in range(50):
+        data[str(i)] = i
+        flusher.mark_dirty(path, lambda: dump_json(data))
+    assert not os.path.exists(path)
+    assert flusher.is_pending(path)
+
+    flusher.flush_all()
+    assert flusher.writes == 1
+    assert len(_read(path)) == 50
+    assert not flusher.is_pending(path)
+
+
+def test_background_thread_flushes(workdir):
+    flusher = WriteBehindFlusher(interval_ms=10)
+    path = str(workdir / 'data.json')
+    flusher.mark_dirty(path, lambda: dump_json({'a': 1}))
+    for _ in range(200):
+        if os.path.exists(path):
+            break
+        threading.Event().wait(0.01)
+    assert _read(path) == {'a': 1}
+    flusher.stop()
+
+
+def test_failed_write_stays_pending(workdir):
+    flusher = WriteBehindFlusher(interval_ms=60000)
+    path = str(workdir / 'data.json')
+    calls = []
+
+    def serializer():
+        calls.append(1)
+        if len(calls) == 1:
+            raise OSError('disk full')
+        return dump_json({'ok': True})
+
+    flusher.mark_dirty(path, serializer)
+    flusher.flush_all()
+    assert flusher.is_pending(path)
+    flusher.flush_all()
+    assert _read(path) == {'ok': True}
+
+
+def test_stop_flushes_and_later_writes_are_immediate(workdir):
+    flusher = WriteBehindFlusher(interval_ms=60000)
+    path = str(workdir / 'data.json')
+    flusher.mark_dirty(path, lambda: dump_json([1]))
+    flusher.stop()
+    assert _read(path) == [1]
+    flusher.mark_dirty(path, lambda: dump_json([2]))
+    assert _read(path) == [2]
+
+
+def test_atomic_write_leaves_no_temp_files(workdir):
+    path = str(workdir / 'sub' / 'x.json')
+    atomic_write_text(path, '{}')
+    atomic_write_text(path, '[]')
+    assert os.listdir(workdir / 'sub') == ['x.json']
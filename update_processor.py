@@ -0,0 +1,165 @@
+# update_processor.py
+"""
+Параллельная обработка обновлений с сохранением порядка для пользователя.
+
+По умолчанию PTB обрабатывает обновления по одному: медленный обработчик
+одного пользователя задерживает всех. PerUserUpdateProcessor запускает
+обновления разных пользователей параллельно (не больше UPDATE_CONCURRENCY
+одновременно), а обновления одного пользователя или чата — строго по
+очереди, в порядке поступления. Поэтому состояние ConversationHandler
+и user_data меняются так же последовательно, как и раньше.
+
+    Application.builder().concurrent_updates(update_processor)
+
+metrics() — сколько обновлений выполняется и ждёт, время ожидания своей
+очереди (среднее, p95) и пользователи/чаты с наибольшим ожиданием.
+
+Приём обновлений это не замедляет: PTB забирает каждое обновление из
+update_queue и сразу создаёт для него задачу, поэтому при перегрузке
+растёт число задач в памяти. UPDATE_PENDING_LIMIT ограничивает только
+число обновлений, ожидающих очереди своего пользователя; остальные задачи
+ждут семафора PTB и в metrics()['waiting'] не видны.
+"""
+import os
+import time
+import asyncio
+import logging
+from collections import OrderedDict, deque
+from typing import Any, Awaitable, Dict, List, Tuple
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+logger = logging.getLogger(__name__)
+
+UPDATE_CONCURRENCY = int(os.getenv('UPDATE_CONCURRENCY', '16'))
+# Сколько обновлений может ждать очереди своего пользователя; следующие ждут семафора PTB
+# (задачи для них уже созданы — приём обновлений не приостанавливается)
+UPDATE_PENDING_LIMIT = int(os.getenv('UPDATE_PENDING_LIMIT', '1000'))
+# Ожидание дольше порога пишется в лог
+UPDATE_WAIT_WARN_MS = int(os.getenv('UPDATE_WAIT_WARN_MS', '2000'))
+
+# Сколько последних ожиданий хранить для метрик и сколько ключей со статистикой
+_WAIT_WINDOW = 1000
+_MAX_TRACKED_KEYS = 1000
+
+
+def update_keys(update: object) -> Tuple[int, ...]:
+    """Ключи очереди обновления: пользователь и чат (в личном чате совпадают)"""
+    if not isinstance(update, Update):
+        return ()
+    keys = set()
+    if update.effective_user is not None:
+        keys.add(update.effective_user.id)
+    if update.effective_chat is not None:
+        keys.add(update.effective_chat.id)
+    # Блокировки берутся в одном порядке, чтобы не было взаимной блокировки
+    return tuple(sorted(keys))
+
+
+class _KeyLock:
+    __slots__ = ('lock', 'users')
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.users = 0
+
+
+class PerUserUpdateProcessor(BaseUpdateProcessor):
+    """Обновления разных пользователей — параллельно, одного пользователя — по очереди"""
+
+    def __init__(self, max_concurrent_updates: int = UPDATE_CONCURRENCY,
+                 pending_limit: int = UPDATE_PENDING_LIMIT):
+        # Семафор PTB удерживается и во время ожидания очереди пользователя, поэтому
+        # он ограничивает только число ожидающих, а параллельность — собственный семафор
+        super().__init__(max(pending_limit, max_concurrent_updates))
+        self.concurrency = max_concurrent_updates
+        self._slots = None
+        self._locks: Dict[int, _KeyLock] = {}
+        self._running = 0
+        self._waiting = 0
+        self._waits = deque(maxlen=_WAIT_WINDOW)
+        self._key_waits: "OrderedDict[int, List[float]]" = OrderedDict()
+        self.processed = 0
+
+    async def initialize(self) -> None:
+        # Примитивы asyncio создаются в цикле событий приложения (Python 3.9 привязывает их к циклу)
+        self._slots = asyncio.Semaphore(self.concurrency)
+
+    async def shutdown(self) -> None:
+        pass
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        keys = update_keys(update)
+        started = time.monotonic()
+        entries = []
+        held = []
+        waiting = True
+        self._waiting += 1
+        try:
+            for key in keys:
+                entry = self._locks.get(key)
+                if entry is None:
+                    entry = self._locks[key] = _KeyLock()
+                entry.users += 1
+                entries.append((key, entry))
+            # Lock в asyncio честный: обновления одного ключа выполняются в порядке поступления
+            for _, entry in entries:
+                await entry.lock.acquire()
+                held.append(entry)
+
+            async with self._slots:
+                self._waiting -= 1
+                waiting = False
+                self._record_wait(keys, time.monotonic() - started)
+                self._running += 1
+                try:
+                    await coroutine
+                finally:
+                    self._running -= 1
+                    self.processed += 1
+        finally:
+            if waiting:
+                # Отменено в ожидании очереди
+                self._waiting -= 1
+                coroutine.close()
+            for entry in held:
+                entry.lock.release()
+            for key, entry in entries:
+                entry.users -= 1
+                if entry.users == 0:
+                    del self._locks[key]
+
+    def _record_wait(self, keys: Tuple[int, ...], waited: float):
+        self._waits.append(waited)
+        if waited * 1000 >= UPDATE_WAIT_WARN_MS:
+            logger.warning("Обновление %s ждало очереди %.0f мс", keys, waited * 1000)
+        for key in keys:
+            stats = self._key_waits.pop(key, None) or [0, 0.0, 0.0]
+            stats[0] += 1
+            stats[1] += waited
+            stats[2] = max(stats[2], waited)
+            self._key_waits[key] = stats
+            if len(self._key_waits) > _MAX_TRACKED_KEYS:
+                self._key_waits.popitem(last=False)
+
+    def metrics(self, top: int = 5) -> Dict[str, Any]:
+        """Выполняются / ждут, ожидание своей очереди и ключи с наибольшим суммарным ожиданием"""
+        waits = sorted(self._waits)
+        slowest = sorted(self._key_waits.items(), key=lambda item: item[1][1], reverse=True)[:top]
+        return {
+            'running': self._running,
+            'waiting': self._waiting,
+            'processed': self.processed,
+            'concurrency': self.concurrency,
+            'active_keys': len(self._locks),
+            'wait_avg': sum(waits) / len(waits) if waits else 0.0,
+            'wait_p95': waits[int(len(waits) * 0.95) - 1] if waits else 0.0,
+            'key_waits': [
+                {'key': key, 'count': count, 'total': total, 'max': worst}
+                for key, (count, total, worst) in slowest
+            ],
+        }
+
+
+update_processor = PerUserUpdateProcessor()
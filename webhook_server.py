@@ -0,0 +1,210 @@
+# webhook_server.py
+"""
+Приём обновлений через webhook вместо long polling.
+
+Telegram сам присылает каждое обновление POST-запросом на WEBHOOK_URL;
+локальный HTTP-сервер (asyncio, без дополнительных зависимостей) проверяет
+заголовок X-Telegram-Bot-Api-Secret-Token и кладёт Update в
+Application.update_queue — дальше обработка та же, что и при polling.
+Сервер без TLS и по умолчанию слушает 127.0.0.1: снаружи его открывает
+nginx / балансировщик с TLS.
+
+Без секрета обновления мог бы прислать кто угодно (в том числе от имени
+администратора), поэтому секрет обязателен: WEBHOOK_SECRET или, если бот
+сам вызывает setWebhook (задан WEBHOOK_URL), случайный на каждый запуск.
+
+Режим выбирается настройкой BOT_MODE=webhook (по умолчанию polling):
+
+    run_webhook(app)        # вместо app.run_polling(...)
+"""
+import os
+import hmac
+import json
+import secrets
+import signal
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, Dict, Optional
+
+from telegram import Update
+
+from http_util import HttpError, read_http_request, write_http_response
+
+logger = logging.getLogger(__name__)
+
+BOT_MODE = os.getenv('BOT_MODE', 'polling').lower()
+WEBHOOK_LISTEN = os.getenv('WEBHOOK_LISTEN', '127.0.0.1')
+WEBHOOK_PORT = int(os.getenv('WEBHOOK_PORT', '8443'))
+WEBHOOK_PATH = os.getenv('WEBHOOK_PATH', '/telegram')
+# Публичный адрес; если задан, при запуске вызывается setWebhook
+WEBHOOK_URL = os.getenv('WEBHOOK_URL', '')
+WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET', '')
+WEBHOOK_MAX_BODY = int(os.getenv('WEBHOOK_MAX_BODY', str(1024 * 1024)))
+
+SECRET_HEADER = 'x-telegram-bot-api-secret-token'
+
+def webhook_secret(secret: str = WEBHOOK_SECRET, url: str = WEBHOOK_URL) -> str:
+    """Секрет для X-Telegram-Bot-Api-Secret-Token: заданный или случайный, если setWebhook вызывает бот"""
+    if secret:
+        return secret
+    if not url:
+        raise RuntimeError("Для webhook нужен WEBHOOK_SECRET (или WEBHOOK_URL, чтобы бот сам вызвал setWebhook)")
+    logger.info("WEBHOOK_SECRET не задан, используется случайный секрет")
+    return secrets.token_urlsafe(32)
+
+
+class WebhookServer:
+    """HTTP-сервер, передающий обновления Telegram в очередь Application"""
+
+    def __init__(self, application, listen: str = WEBHOOK_LISTEN, port: int = WEBHOOK_PORT,
+                 path: str = WEBHOOK_PATH, secret_token: Optional[str] = None):
+        self.application = application
+        self.listen = listen
+        self.port = port
+        self.path = path
+        # Тот же секрет передаётся в setWebhook (register_webhook)
+        self.secret_token = secret_token or webhook_secret()
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._writers = set()
+        self.received = 0
+        self.rejected = 0
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle_connection, self.listen, self.port)
+        if not self.port:
+            # port=0: порт выбирает система (бенчмарки)
+            self.port = self._server.sockets[0].getsockname()[1]
+        logger.info("Webhook-сервер слушает %s:%s%s", self.listen, self.port, self.path)
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            # Telegram держит соединения открытыми; закрываем их, чтобы обработчики завершились
+            for writer in list(self._writers):
+                writer.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._writers.add(writer)
+        try:
+            while True:
+                try:
+                    request = await read_http_request(reader, WEBHOOK_MAX_BODY)
+                except HttpError as e:
+                    write_http_response(writer, e.status, keep_alive=False)
+                    break
+                if request is None:
+                    break
+                method, path, headers, body = request
+                status = await self._handle_request(method, path, headers, body)
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                write_http_response(writer, status, keep_alive=keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except Exception as e:
+            logger.error(f"Ошибка webhook-соединения: {e}", exc_info=True)
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+
+    async def _handle_request(self, method: str, path: str, headers: Dict[str, str], body: bytes) -> int:
+        if path.split('?', 1)[0] != self.path:
+            return 404
+        if method != 'POST':
+            return 405
+        if not hmac.compare_digest(
+                headers.get(SECRET_HEADER, '').encode(), self.secret_token.encode()):
+            self.rejected += 1
+            logger.warning("Webhook: неверный секретный токен")
+            return 403
+        try:
+            data = json.loads(body)
+            status = await self.dispatch(data) if isinstance(data, dict) else 400
+        except (ValueError, TypeError, KeyError) as e:
+            logger.warning("Webhook: не удалось разобрать обновление: %s", e)
+            return 400
+        if status == 200:
+            self.received += 1
+        return status
+
+    async def dispatch(self, data: dict) -> int:
+        """Передаёт обновление дальше; возвращает HTTP-статус ответа Telegram"""
+        update = Update.de_json(data, self.application.bot)
+        if update is None:
+            return 400
+        if not self.application.running:
+            return 503
+        # Telegram повторит запрос, если ответ не 200, поэтому отвечаем сразу
+        await self.application.update_queue.put(update)
+        return 200
+
+
+@asynccontextmanager
+async def running_application(application):
+    """Запуск и остановка Application с хуками post_* (как в Application.run_polling)"""
+    await application.initialize()
+    try:
+        if application.post_init:
+            await application.post_init(application)
+        await application.start()
+        yield application
+    finally:
+        if application.running:
+            await application.stop()
+        if application.post_stop:
+            await application.post_stop(application)
+        await application.shutdown()
+        if application.post_shutdown:
+            await application.post_shutdown(application)
+
+
+async def register_webhook(bot, path: str, secret_token: str, allowed_updates=None):
+    """setWebhook на WEBHOOK_URL + path с секретом сервера, если публичный адрес задан"""
+    if not WEBHOOK_URL:
+        return
+    url = WEBHOOK_URL.rstrip('/') + path
+    await bot.set_webhook(url=url, secret_token=secret_token, allowed_updates=allowed_updates)
+    logger.info("Webhook зарегистрирован: %s", url)
+
+
+async def serve_webhook(application, stop_event: asyncio.Event,
+                        allowed_updates=None, server: Optional[WebhookServer] = None) -> WebhookServer:
+    """Обрабатывает обновления из webhook, пока не установлен stop_event"""
+    server = server or WebhookServer(application)
+    async with running_application(application):
+        await register_webhook(application.bot, server.path, server.secret_token, allowed_updates)
+        await server.start()
+        try:
+            await stop_event.wait()
+        finally:
+            await server.stop()
+    return server
+
+
+def run_until_signal(main: Callable[[asyncio.Event], Awaitable], signals=(signal.SIGINT, signal.SIGTERM)):
+    """Блокирующий запуск main(stop_event); stop_event ставится по сигналам (SIGINT/SIGTERM)"""
+    async def runner():
+        stop_event = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in signals:
+            try:
+                loop.add_signal_handler(sig, stop_event.set)
+            except (NotImplementedError, RuntimeError):
+                # Windows: остановка через KeyboardInterrupt
+                pass
+        await main(stop_event)
+
+    try:
+        asyncio.run(runner())
+    except KeyboardInterrupt:
+        pass
+
+
+def run_webhook(application, allowed_updates=None):
+    """Блокирующий запуск в режиме webhook; завершается по SIGINT/SIGTERM"""
+    run_until_signal(lambda stop_event: serve_webhook(application, stop_event, allowed_updates))
@@ -0,0 +1,157 @@
+# write_behind.py
+"""
+Отложенная запись JSON-хранилищ.
+
+Хранилища держат данные в памяти и после изменения только помечают файл
+как «грязный», передавая функцию сериализации. Фоновый поток раз в
+WRITE_BEHIND_INTERVAL_MS записывает все помеченные файлы — серия изменений
+одного файла превращается в одну запись. Файл пишется во временный файл
+рядом и атомарно переименовывается, поэтому на диске никогда не остаётся
+наполовину записанного JSON. При остановке бота (post_shutdown) и выходе
+из процесса (atexit) всё несохранённое сбрасывается принудительно.
+
+В многопроцессном режиме (SHARD_WORKERS > 1) файл пишется сразу: другие
+процессы перечитывают его по изменению (interprocess.SharedFiles).
+"""
+import os
+import json
+import atexit
+import tempfile
+import threading
+import functools
+import logging
+from typing import Any, Callable, Dict, Optional
+
+from interprocess import MULTI_PROCESS
+
+logger = logging.getLogger(__name__)
+
+WRITE_BEHIND_INTERVAL_MS = int(os.getenv('WRITE_BEHIND_INTERVAL_MS', '500'))
+
+
+def atomic_write_text(path: str, text: str):
+    """Записывает файл через временный файл и os.replace"""
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix='.' + os.path.basename(path) + '.', suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def dump_json(data: Any) -> str:
+    """Сериализация в формате, которым хранилища писали файлы раньше"""
+    return json.dumps(data, ensure_ascii=False, indent=2)
+
+
+def synchronized(method):
+    """Выполняет метод хранилища под его блокировкой self._lock"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+class WriteBehindFlusher:
+    """Фоновый сброс помеченных файлов не чаще одного раза за интервал"""
+
+    def __init__(self, interval_ms: int = WRITE_BEHIND_INTERVAL_MS):
+        self.interval = interval_ms / 1000
+        self._pending: Dict[str, Callable[[], str]] = {}
+        self._lock = threading.Lock()
+        # Не даёт фоновому потоку и flush_all писать одновременно
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = False
+        self._thread: Optional[threading.Thread] = None
+        self.writes = 0
+
+    def _ensure_thread(self):
+        if self._thread is None and not self._stopped:
+            self._thread = threading.Thread(target=self._run, name='write-behind', daemon=True)
+            self._thread.start()
+
+    def mark_dirty(self, path: str, serializer: Callable[[], str]):
+        """
+        Помечает файл для записи. serializer вызывается в момент сброса
+        и должен вернуть актуальное содержимое файла.
+        """
+        with self._lock:
+            if not self._stopped and not MULTI_PROCESS:
+                self._pending[path] = serializer
+                self._ensure_thread()
+                return
+        # После остановки (и при нескольких процессах) пишем сразу, чтобы ничего не потерять.
+        # flush_all здесь не вызываем: вызывающий может держать блокировку хранилища.
+        try:
+            atomic_write_text(path, serializer())
+            self.writes += 1
+        except Exception:
+            logger.exception("Не удалось записать %s", path)
+
+    def is_pending(self, path: str) -> bool:
+        with self._lock:
+            return path in self._pending
+
+    def _run(self):
+        while not self._stopped:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            self.flush_all()
+
+    def flush_all(self):
+        """Записывает все помеченные файлы"""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            for path, serializer in pending.items():
+                try:
+                    atomic_write_text(path, serializer())
+                    self.writes += 1
+                except Exception:
+                    logger.exception("Не удалось записать %s", path)
+                    # Вернём файл в очередь, если его не пометили заново
+                    with self._lock:
+                        self._pending.setdefault(path, serializer)
+
+    def stop(self):
+        """Останавливает фоновый поток и сбрасывает всё несохранённое"""
+        self._stopped = True
+        self._wakeup.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=max(self.interval * 2, 5))
+        self.flush_all()
+
+
+flusher = WriteBehindFlusher()
+atexit.register(flusher.stop)
+
+
+def mark_dirty(path: str, serializer: Callable[[], str]):
+    """Помечает файл для отложенной записи общим флашером"""
+    flusher.mark_dirty(path, serializer)
+
+
+def mark_dirty_json(path: str, data: Any, lock):
+    """Помечает JSON-файл; снимок данных делается под блокировкой хранилища"""
+    def serialize():
+        with lock:
+            return dump_json(data)
+    flusher.mark_dirty(path, serialize)
+
+
+async def flush_on_shutdown(application) -> None:
+    """Хук post_shutdown для PTB: сбрасывает несохранённые данные"""
+    flusher.stop()
+    logger.info("Отложенные записи сброшены на диск")